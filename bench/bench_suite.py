@@ -0,0 +1,324 @@
+# モデル・保存処理・表示のベンチマーク
+# 実行: python -m bench.bench_suite [--quick] [--output results.json] [--compare baseline.json]
+# 結果はJSONに書き出し、--compare で前回の結果と比べて遅くなった項目を報告する
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import date, timedelta
+from bench.synthetic import make_conf, write_conf
+from model.task_model import TaskModel
+from model.task_strategy import UniqueAddStrategy
+from model.task_search import TaskSearchIndex
+from controller.conf_persistence import ConfPersistence
+from controller.conf_journal import ConfJournal, SNAPSHOT_FORMATS, read_snapshot, write_snapshot
+from controller.conf_archive import ColdArchive, ArchivePager
+from controller.rpc_server import RpcServerThread
+from controller.rpc_client import RpcClient
+
+# 規模(--quick は動作確認用)
+FULL = {"years": 10, "tasks_per_day": 50, "master_size": 10000, "ops": 20000}
+QUICK = {"years": 1, "tasks_per_day": 20, "master_size": 1000, "ops": 2000}
+UNIQUE_DAY_SIZES = [10, 100, 1000, 10000]
+# 各計測を繰り返して最良の値を使う(ばらつき対策)
+REPEAT = 3
+# --compare でこれ以上悪化したら回帰とみなす(割合)
+DEFAULT_TOLERANCE = 0.25
+
+
+class Results:
+    def __init__(self):
+        self.items = {}
+
+    def add(self, name, value, unit, higher_is_better=False):
+        self.items[name] = {"value": round(value, 6), "unit": unit, "higher_is_better": higher_is_better}
+        print(f"{name:<40} {value:>14,.3f} {unit}", file=sys.stderr)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def best_time(fn, repeat=REPEAT, setup=None):
+    # setup()の戻り値をfnに渡し、repeat回のうち最短の時間を返す
+    best = None
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        _, elapsed = timed(lambda: fn(arg))
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def bench_persistence(results, work_dir, conf):
+    conf_path = os.path.join(work_dir, "init.conf")
+    _, elapsed = timed(lambda: write_conf(conf_path, conf))
+    results.add("conf.file_size", os.path.getsize(conf_path) / 1e6, "MB")
+
+    model = TaskModel()
+    persistence = ConfPersistence(model, conf_path, background=False)
+    tracemalloc.start()
+    _, elapsed = timed(persistence.load_into_model)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.add("conf.load_latency", elapsed * 1000, "ms")
+    results.add("conf.load_peak_memory", peak / 1e6, "MB")
+    model.add_event_listener(persistence)
+
+    _, elapsed = timed(persistence.save_conf)
+    results.add("conf.save_latency", elapsed * 1000, "ms")
+
+    # 1件の変更をジャーナルに追記する時間
+    date_str = next(iter(conf["calendar_tasks"]))
+    n = 200
+    _, elapsed = timed(lambda: [model.set_task_state(date_str, i % 10, "Closed") for i in range(n)])
+    results.add("conf.journal_append_latency", elapsed / n * 1e6, "us")
+    persistence.close()
+    return model
+
+
+def bench_snapshot_formats(results, work_dir, conf):
+    # init.confの形式ごとのサイズ・書き込み・全体の読み込み・最初の1日を表示できるまでの時間
+    date_str = sorted(conf["calendar_tasks"])[len(conf["calendar_tasks"]) // 2]
+    for fmt in SNAPSHOT_FORMATS:
+        path = os.path.join(work_dir, f"snapshot.{fmt}")
+        elapsed = best_time(lambda _: write_snapshot(path, conf, fmt))
+        results.add(f"snapshot.{fmt}.file_size", os.path.getsize(path) / 1e6, "MB")
+        results.add(f"snapshot.{fmt}.write_latency", elapsed * 1000, "ms")
+        elapsed = best_time(lambda _: read_snapshot(path)["calendar_tasks"][date_str])
+        results.add(f"snapshot.{fmt}.first_day_latency", elapsed * 1000, "ms")
+
+        def load(_):
+            model = TaskModel()
+            ConfPersistence(model, path, journal_enabled=False, background=False,
+                            snapshot_format=fmt).load_into_model()
+        elapsed = best_time(load)
+        results.add(f"snapshot.{fmt}.load_latency", elapsed * 1000, "ms")
+
+
+def bench_archive(results, work_dir, conf, hot_days=90):
+    # 直近hot_days日だけをinit.confに残した場合の読み込み・コンパクションと、アーカイブから1か月を読み込む時間
+    dates = sorted(conf["calendar_tasks"])
+    today = date.fromisoformat(dates[-1]) + timedelta(days=1)
+    path = os.path.join(work_dir, "archived.conf")
+    write_snapshot(path, conf)
+    archive = ColdArchive(path + ".archive", hot_days, None)
+    _, elapsed = timed(lambda: archive.archive_from(ConfJournal(path), today))
+    results.add("archive.archive_latency", elapsed * 1000, "ms")
+    results.add("archive.hot_file_size", os.path.getsize(path) / 1e6, "MB")
+    results.add("archive.archive_file_size", os.path.getsize(archive.path) / 1e6, "MB")
+
+    def load(_):
+        model = TaskModel()
+        ConfPersistence(model, path, journal_enabled=False, background=False).load_into_model()
+    results.add("archive.hot_load_latency", best_time(load) * 1000, "ms")
+    results.add("archive.hot_compact_latency", best_time(lambda _: ConfJournal(path).compact()) * 1000, "ms")
+    month = dates[len(dates) // 2][:7]
+    elapsed = best_time(lambda pager: pager.ensure_month(month), setup=lambda: ArchivePager(TaskModel(), archive))
+    results.add("archive.page_in_month_latency", elapsed * 1000, "ms")
+
+
+def bench_model_ops(results, ops):
+    # 保存処理なしのModel単体(毎回新しいModelで add → set_state → remove の順に測る)
+    start = date(2030, 1, 1)
+    dates = [(start + timedelta(days=i % 365)).isoformat() for i in range(ops)]
+    best = {}
+    for _ in range(REPEAT):
+        model = TaskModel()
+        for name, fn in (
+                ("model.add_task", lambda: [model.add_task(d, f"Op task {i}", 50.0) for i, d in enumerate(dates)]),
+                ("model.set_task_state", lambda: [model.set_task_state(d, 0, "Working") for d in dates]),
+                ("model.remove_task", lambda: [model.remove_task(d, 0) for d in dates])):
+            _, elapsed = timed(fn)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    for name, elapsed in best.items():
+        results.add(name, ops / elapsed, "ops/s", True)
+
+    # batch() でまとめた場合
+    def batched_adds(model):
+        with model.batch():
+            for i, d in enumerate(dates):
+                model.add_task(d, f"Batch task {i}", None)
+    elapsed = best_time(batched_adds, setup=TaskModel)
+    results.add("model.add_task_batched", ops / elapsed, "ops/s", True)
+
+
+def bench_unique_strategy(results):
+    # 1日のタスク数が増えても重複判定の時間が変わらないこと
+    n = 20000
+    for size in UNIQUE_DAY_SIZES:
+        model = TaskModel(strategy=UniqueAddStrategy())
+        model.add_tasks("2030-01-01", [(f"Existing {i}", None) for i in range(size)])
+        elapsed = best_time(lambda _: [model.add_task("2030-01-01", f"Existing {i % size}") for i in range(n)])
+        results.add(f"unique.duplicate_check.day_{size}", elapsed / n * 1e6, "us")
+
+
+def bench_search(results, model):
+    # 転置インデックスの構築と、語・前方一致・状態での検索
+    index = TaskSearchIndex(model)
+    _, elapsed = timed(index.build)
+    results.add("search.build", elapsed * 1000, "ms")
+    queries = [("task 12", None), ("task 4", "Closed"), ("task 49", "Working")]
+    elapsed = best_time(lambda _: [index.search(q, state) for q, state in queries])
+    results.add("search.query_latency", elapsed / len(queries) * 1000, "ms")
+
+
+def bench_ranges(results, model):
+    # 週・月の範囲の取り出し(全履歴の大きさによらないこと)
+    dates = [d for d, _ in model.iter_days()]
+    samples = dates[::max(1, len(dates) // 50)]
+    for name, fn in (("model.get_week", model.get_week), ("model.get_month", model.get_month)):
+        elapsed = best_time(lambda _: [fn(d) for d in samples])
+        results.add(f"{name}_latency", elapsed / len(samples) * 1e6, "us")
+
+
+def bench_rpc(results, ops):
+    # JSON-RPCサーバーのスループット(1件ずつ応答を待つ / パイプライン / JSON-RPCのバッチ)
+    # サーバーは別スレッドのイベントループでModelを直接操作する(GUIなしの場合と同じ)
+    model = TaskModel()
+    server = RpcServerThread(model, port=0)
+    address = server.start_and_wait()
+    start = date(2030, 1, 1)
+    calls = [("add_task", {"date": (start + timedelta(days=i % 365)).isoformat(), "text": f"Rpc task {i}",
+                           "attr_ratio": 50.0}) for i in range(ops)]
+    n = min(ops, 1000)
+    try:
+        with RpcClient(*address) as client:
+            _, elapsed = timed(lambda: [client.call(m, **p) for m, p in calls[:n]])
+            results.add("rpc.sequential", n / elapsed, "ops/s", True)
+            batches = server.server.batches
+            _, elapsed = timed(lambda: client.pipeline(calls))
+            results.add("rpc.pipelined", ops / elapsed, "ops/s", True)
+            results.add("rpc.pipelined_requests_per_commit", ops / max(1, server.server.batches - batches), "req")
+            size = 100
+            _, elapsed = timed(lambda: [client.batch(calls[i:i + size]) for i in range(0, ops, size)])
+            results.add("rpc.json_batch", ops / elapsed, "ops/s", True)
+    finally:
+        server.stop()
+
+
+def bench_view(results, model, conf):
+    # Qtのoffscreenで表示の更新時間を測る
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from view.pyqt_builder import PyQtTaskView
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    view = PyQtTaskView()
+    view.show()
+    app.processEvents()
+
+    _, elapsed = timed(lambda: view.set_task_master_list(model.get_master_list()))
+    results.add("view.set_task_master_list", elapsed * 1000, "ms")
+
+    dates = sorted(conf["calendar_tasks"])[:365]
+
+    def switch_days(_):
+        for d in dates:
+            view.task_list_model.set_tasks(model.get_tasks(d))
+            app.processEvents()
+    elapsed = best_time(switch_days)
+    results.add("view.update_task_list", elapsed / len(dates) * 1000, "ms/day")
+
+    def switch_filters(_):
+        for d in dates:
+            view._current_date = d
+            view.update_task_combo_filter()
+            app.processEvents()
+    elapsed = best_time(switch_filters)
+    results.add("view.update_task_combo_filter", elapsed / len(dates) * 1000, "ms/day")
+    view.close()
+
+
+def compare(results, baseline_path, tolerance):
+    # 前回の結果と比べて tolerance 以上悪化した項目を返す
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, item in results.items.items():
+        old = baseline.get(name)
+        if not old or not old["value"]:
+            continue
+        ratio = item["value"] / old["value"]
+        worse = ratio < 1 - tolerance if item["higher_is_better"] else ratio > 1 + tolerance
+        if worse:
+            regressions.append((name, old["value"], item["value"], item["unit"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for model, persistence and view hot paths")
+    parser.add_argument("--quick", action="store_true", help="small data set (smoke run)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--no-view", action="store_true", help="skip the Qt benchmarks")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    params = dict(QUICK if args.quick else FULL)
+    results = Results()
+    work_dir = tempfile.mkdtemp(prefix="schedule-bench-")
+    try:
+        conf, elapsed = timed(lambda: make_conf(params["years"], params["tasks_per_day"],
+                                                params["master_size"], seed=args.seed))
+        print(f"generated {sum(len(t) for t in conf['calendar_tasks'].values())} tasks "
+              f"in {elapsed:.1f} s", file=sys.stderr)
+        model = bench_persistence(results, work_dir, conf)
+        bench_search(results, model)
+        bench_ranges(results, model)
+        bench_snapshot_formats(results, work_dir, conf)
+        bench_archive(results, work_dir, conf)
+        bench_model_ops(results, params["ops"])
+        bench_unique_strategy(results)
+        bench_rpc(results, params["ops"])
+        if not args.no_view:
+            bench_view(results, model, conf)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    try:
+        import resource
+        # LinuxはkB単位
+        results.add("process.max_rss", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "MB")
+    except ImportError:
+        pass
+
+    output = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+            "seed": args.seed,
+        },
+        "results": results.items,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for name, old, new, unit in regressions:
+            print(f"REGRESSION {name}: {old:,.3f} -> {new:,.3f} {unit}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# タスク1件あたりのメモリ使用量の比較(dict と Task)
+# 実行: python -m bench.bench_task_memory [日数] [1日あたりのタスク数]
+import sys
+import json
+import tracemalloc
+from datetime import date, timedelta
+from model.task_storage import MemoryTaskStorage
+
+
+def make_calendar(days, tasks_per_day, distinct_texts=200):
+    start = date(2020, 1, 1)
+    states = ["Planned", "Working", "Closed"]
+    calendar = {}
+    for d in range(days):
+        date_str = (start + timedelta(days=d)).isoformat()
+        calendar[date_str] = [
+            {"text": f"Task {(d + i) % distinct_texts}", "state": states[(d + i) % 3],
+             "attr_ratio": float((d * i) % 100)}
+            for i in range(tasks_per_day)
+        ]
+    # init.confから読んだ時と同じく、文字列を共有しない状態にする
+    return json.dumps({"calendar_tasks": calendar})
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    raw = make_calendar(days, per_day)
+    n = days * per_day
+
+    _, dict_bytes = measure(lambda: json.loads(raw)["calendar_tasks"])
+
+    def build_tasks():
+        storage = MemoryTaskStorage()
+        storage.load_data(json.loads(raw)["calendar_tasks"], {})
+        return storage
+    # 変換元のdictは変換後に解放されるので、残ったTaskだけが計測される
+    _, task_bytes = measure(build_tasks)
+
+    print(f"tasks: {n} ({days} days x {per_day})")
+    print(f"dict : {dict_bytes / n:8.1f} bytes/task")
+    print(f"Task : {task_bytes / n:8.1f} bytes/task")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import json
+import random
+from datetime import date, timedelta
+
+# ベンチマーク用の合成データ(init.confと同じ形)
+# 同じseedなら毎回同じ内容になる
+DEFAULT_START = date(2015, 1, 1)
+ATTRS = ["Free", "Mon", "Tue", "Wed", "Thu", "Fri"]
+STATES = ["Planned", "Working", "Closed"]
+
+
+def make_master_list(size, seed=0):
+    rng = random.Random(seed)
+    return [{"text": f"Master task {i:05d}", "attr": rng.choice(ATTRS)} for i in range(size)]
+
+
+def make_conf(years=10, tasks_per_day=50, master_size=10000, distinct_texts=500, seed=0, start=DEFAULT_START):
+    # years年分・1日tasks_per_day件のタスクと、平日の勤務時間
+    rng = random.Random(seed)
+    calendar_tasks = {}
+    work_hours = {}
+    days = int(years * 365.25)
+    for n in range(days):
+        d = start + timedelta(days=n)
+        date_str = d.isoformat()
+        calendar_tasks[date_str] = [
+            {"text": f"Task {rng.randrange(distinct_texts)} #{i}", "state": rng.choice(STATES),
+             "attr_ratio": round(rng.uniform(0, 100), 2) if rng.random() < 0.8 else None}
+            for i in range(tasks_per_day)
+        ]
+        if d.weekday() < 5:
+            work_hours[date_str] = rng.choice([6.0, 7.5, 8.0, 9.5])
+    return {
+        "task_master_list": make_master_list(master_size, seed),
+        "calendar_tasks": calendar_tasks,
+        "work_hours": work_hours,
+    }
+
+
+def write_conf(path, conf):
+    # init.confと同じ書式(indent=2)で書き出す
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(conf, f, ensure_ascii=False, indent=2)
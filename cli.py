@@ -0,0 +1,241 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from controller.task_controller import (
+    open_task_model, STORAGE_BACKEND, INIT_CONF_PATH, SNAPSHOT_FORMAT, ARCHIVE_AFTER_DAYS, ARCHIVE_CLOSED_AFTER_DAYS
+)
+from controller.bulk_io import (
+    DEFAULT_BATCH_ROWS, read_csv_rows, read_ics_rows, import_rows,
+    iter_export_rows, write_csv_rows, write_ics_rows
+)
+from controller.report import REPORT_FORMATS, ReportJob, ReportCanceled, check_report_path, write_report
+from controller.conf_journal import ConfJournal, SNAPSHOT_FORMATS, SNAPSHOT_BINARY, SNAPSHOT_JSON, convert_snapshot
+from controller.conf_archive import ColdArchive, ArchivePager, ARCHIVE_SUFFIX
+from controller.conf_persistence import ConfPersistence
+from controller.conf_binary import is_binary_snapshot
+from controller.rpc_server import DEFAULT_HOST, DEFAULT_PORT, RpcServer
+
+# GUIなしでスケジュールデータを一括入出力する(PyQtは不要)
+# 例) python cli.py import tasks.csv
+#     python cli.py export 2025.ics --start 2025-01-01 --end 2025-12-31
+#     python cli.py --backend sqlite export - > all.csv
+#     python cli.py report 2025.html --start 2025-01-01 --end 2025-12-31
+#     python cli.py convert init.conf init.conf.bin --to binary
+#     python cli.py serve --port 8765
+#     python cli.py archive --after-days 180
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return "ics" if path.lower().endswith((".ics", ".ical")) else "csv"
+
+
+def open_text(path, mode):
+    # "-" は標準入出力
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def report(action, rows, started, extra=""):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"{action} {rows} rows in {elapsed:.2f} s ({rate:,.0f} rows/sec){extra}", file=sys.stderr)
+
+
+def page_in_archive(model, persistence, path, start=None, end=None):
+    # アーカイブ(init.conf.archive)にある日もModelに読み込む: 読み込んだ日数(json保存のみ)
+    # 読み込むだけでinit.confには書かない
+    if not isinstance(persistence, ConfPersistence):
+        return 0
+    archive = persistence.archive
+    if archive is None:
+        archive_path = (path or INIT_CONF_PATH) + ARCHIVE_SUFFIX
+        if not os.path.exists(archive_path):
+            return 0
+        archive = ColdArchive(archive_path)
+    persistence.pager = ArchivePager(model, archive)
+    return len(persistence.pager.ensure_range(start, end))
+
+
+def cmd_import(args):
+    # ジャーナルへの書き込みはこのプロセスの中で同期的に行う
+    model, persistence = open_task_model(args.backend, args.path, background=False)
+    if hasattr(persistence, "auto_compact"):
+        # init.confの全体保存は取り込みの最後に1回だけ行う
+        persistence.auto_compact = False
+    f = open_text(args.file, "r")
+    started = time.perf_counter()
+
+    def on_batch(count):
+        if args.progress:
+            report("read", count, started)
+
+    try:
+        reader = read_ics_rows(f) if detect_format(args.file, args.format) == "ics" else read_csv_rows(f)
+        count, added, skipped = import_rows(model, reader, args.batch, on_batch)
+        report("imported", count, started, f": {added} tasks added, {skipped} rows skipped")
+        if persistence is not None:
+            persistence.save_conf()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        if persistence is not None:
+            persistence.close()
+        model.storage.close()
+    report("saved", count, started)
+
+
+def cmd_export(args):
+    model, persistence = open_task_model(args.backend, args.path, background=False)
+    f = open_text(args.file, "w")
+    started = time.perf_counter()
+    try:
+        archived = page_in_archive(model, persistence, args.path, args.start, args.end)
+        rows = iter_export_rows(model, args.start, args.end)
+        if detect_format(args.file, args.format) == "ics":
+            count = write_ics_rows(f, rows)
+        else:
+            count = write_csv_rows(f, rows)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+        if persistence is not None:
+            persistence.close()
+        model.storage.close()
+    report("exported", count, started, f" ({archived} days from the archive)" if archived else "")
+
+
+def cmd_report(args):
+    # 集計は月ごとに別プロセスで行う
+    try:
+        check_report_path(args.file, args.format)
+    except ValueError as e:
+        sys.exit(f"report: {e}")
+    model, persistence = open_task_model(args.backend, args.path, background=False)
+    started = time.perf_counter()
+
+    def on_progress(done, total):
+        if args.progress:
+            print(f"\r{done}/{total} months", end="", file=sys.stderr)
+    try:
+        page_in_archive(model, persistence, args.path, args.start, args.end)
+        job = ReportJob(model, args.start, args.end, args.workers)
+        report_data = job.run(on_progress)
+        fmt = write_report(args.file, report_data, args.format)
+    except (KeyboardInterrupt, ReportCanceled):
+        job.cancel()
+        print("canceled", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if persistence is not None:
+            persistence.close()
+        model.storage.close()
+    if args.progress:
+        print(file=sys.stderr)
+    print(f"report ({fmt}) of {job.total} months in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+
+
+def cmd_convert(args):
+    # init.confのJSON形式 ⇔ バイナリ形式(--toを省略すると今と逆の形式)
+    fmt = args.to or (SNAPSHOT_JSON if is_binary_snapshot(args.src) else SNAPSHOT_BINARY)
+    dst = args.dst or args.src
+    started = time.perf_counter()
+    convert_snapshot(args.src, dst, fmt)
+    print(f"converted {args.src} -> {dst} ({fmt}, {os.path.getsize(dst):,} bytes) "
+          f"in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+
+
+def cmd_serve(args):
+    # GUIなしでJSON-RPCサーバーを動かす(Ctrl+Cで終了)
+    model, persistence = open_task_model(args.backend, args.path)
+    server = RpcServer(model, args.host, args.port, args.socket)
+
+    async def serve():
+        await server.start()
+        print(f"listening on {server.address}", file=sys.stderr)
+        await server.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if persistence is not None:
+            persistence.close()
+        model.storage.close()
+    print(f"served {server.requests} requests in {server.batches} batches", file=sys.stderr)
+
+
+def cmd_archive(args):
+    # 古い日・すべてClosedの日をinit.conf.archiveへ移す(json保存のみ)
+    if args.backend != "json":
+        sys.exit("archive: only the json backend keeps an init.conf to archive from")
+    path = args.path or INIT_CONF_PATH
+    archive = ColdArchive(path + ARCHIVE_SUFFIX, args.after_days,
+                          None if args.keep_closed else args.closed_after_days)
+    started = time.perf_counter()
+    archive.archive_from(ConfJournal(path, snapshot_format=SNAPSHOT_FORMAT))
+    size = os.path.getsize(archive.path) if os.path.exists(archive.path) else 0
+    print(f"archived {archive.archived_days} days to {archive.path} "
+          f"({len(archive.dates())} days, {size:,} bytes) in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bulk import/export of schedule data without the GUI")
+    parser.add_argument("--backend", choices=["json", "sqlite", "sharded"], default=STORAGE_BACKEND)
+    parser.add_argument("--path", help="init.conf / init.db / shard directory (default: the backend's default)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="add tasks and work hours from CSV or iCalendar")
+    p.add_argument("file", help="input file ('-' for stdin)")
+    p.add_argument("--format", choices=["csv", "ics"])
+    p.add_argument("--batch", type=int, default=DEFAULT_BATCH_ROWS, help="rows per batched insert")
+    p.add_argument("--progress", action="store_true", help="report throughput after every batch")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="write tasks and work hours to CSV or iCalendar")
+    p.add_argument("file", help="output file ('-' for stdout)")
+    p.add_argument("--format", choices=["csv", "ics"])
+    p.add_argument("--start", help="first date (yyyy-MM-dd)")
+    p.add_argument("--end", help="last date (yyyy-MM-dd)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("report", help="timesheet report (hours per week, time per task, states)")
+    p.add_argument("file", help="output file (.csv / .html / .columns.json / .parquet)")
+    p.add_argument("--format", choices=REPORT_FORMATS)
+    p.add_argument("--start", required=True, help="first date (yyyy-MM-dd)")
+    p.add_argument("--end", required=True, help="last date (yyyy-MM-dd)")
+    p.add_argument("--workers", type=int, help="worker processes")
+    p.add_argument("--progress", action="store_true")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("convert", help="convert init.conf between the JSON and binary snapshot formats")
+    p.add_argument("src", help="init.conf (JSON or binary; its journal is folded in)")
+    p.add_argument("dst", nargs="?", help="output file (default: convert in place)")
+    p.add_argument("--to", choices=SNAPSHOT_FORMATS, help="target format (default: the other one)")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("serve", help="serve the task model over JSON-RPC (newline-delimited, localhost)")
+    p.add_argument("--host", default=DEFAULT_HOST)
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--socket", help="listen on a Unix domain socket instead of TCP")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("archive", help="move old and fully closed days from init.conf to a compressed archive")
+    p.add_argument("--after-days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive every day older than this")
+    p.add_argument("--closed-after-days", type=int, default=ARCHIVE_CLOSED_AFTER_DAYS,
+                   help="archive days whose tasks are all Closed once they are this old")
+    p.add_argument("--keep-closed", action="store_true", help="only archive by age")
+    p.set_defaults(func=cmd_archive)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
-from controller.task_controller import TaskController
+from PyQt5.QtCore import QObject, QEvent, QTimer
 from view.pyqt_builder import PyQtSchedulerUIBuilder
 from view.director import SchedulerUIDirector
+from controller.instrumentation import TRACER
+
+# 起動を速くするモード: メインウィンドウを先に表示し、
+# TaskController(データ読み込み)と補助ウィジェットは表示後・初回使用時に作る
+FAST_START = True
+FIRST_PAINT_FALLBACK_MS = 200
 
 class FunctionManager:
     def __init__(self):
         self._main_window = None
 
-    def create_main_window(self):
+    def create_main_window(self, lazy_secondary=False):
         if self._main_window is None:
-            builder = PyQtSchedulerUIBuilder()
+            builder = PyQtSchedulerUIBuilder(lazy_secondary=lazy_secondary)
             director = SchedulerUIDirector(builder)
             self._main_window = director.construct()
         return self._main_window
@@ -16,20 +22,92 @@ class FunctionManager:
     def get_state(self):
         return "main"
 
+# 最初の描画を検出してコールバックを呼ぶ
+class FirstPaintFilter(QObject):
+    def __init__(self, on_first_paint, parent=None):
+        super().__init__(parent)
+        self.on_first_paint = on_first_paint
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            self.on_first_paint()
+        return False
+
 class AppController:
-    def __init__(self, app):
+    def __init__(self, app, startup_timer=None, fast_start=FAST_START):
         self.app = app
         self.function_manager = FunctionManager()
         self.main_window = None
         self.task_controller = None
+        self.startup_timer = startup_timer
+        self.fast_start = fast_start
+        # 起動完了時に呼ばれる(起動時間レポートの出力など)
+        self.on_startup_finished = None
+
+    def _mark(self, name):
+        if self.startup_timer is not None:
+            self.startup_timer.mark(name)
 
     def show_main_window(self):
         if self.main_window is None:
-            self.main_window = self.function_manager.create_main_window()
-            if hasattr(self.main_window, "task_view"):
-                self.task_controller = TaskController(self.main_window.task_view)
+            self.main_window = self.function_manager.create_main_window(lazy_secondary=self.fast_start)
+            self._mark("window_built")
+            self._paint_filter = FirstPaintFilter(self._on_first_paint, self.main_window)
+            self.main_window.installEventFilter(self._paint_filter)
+            if self.fast_start:
+                # 初回描画の後にデータを読み込む(描画されない環境向けに時間でも起動する)
+                QTimer.singleShot(FIRST_PAINT_FALLBACK_MS, self.create_task_controller)
+            else:
+                self.create_task_controller()
         self.main_window.show()
 
+    def _on_first_paint(self):
+        self._mark("first_paint")
+        if self.fast_start:
+            QTimer.singleShot(0, self.create_task_controller)
+
+    def create_task_controller(self):
+        if self.task_controller is not None or not hasattr(self.main_window, "task_view"):
+            return
+        # 読み込み・保存まわりのモジュールはここで初めてimportする
+        from controller.task_controller import TaskController
+        self.task_controller = TaskController(
+            self.main_window.task_view, getattr(self.main_window, "stats_panel", None),
+            getattr(self.main_window, "calendar_view", None))
+        if hasattr(self.main_window, "stats_panel_created"):
+            self.main_window.stats_panel_created.connect(self.task_controller.set_stats_panel)
+        if TRACER.enabled:
+            self.install_diagnostics()
+        self._mark("controller_ready")
+        if self.on_startup_finished is not None:
+            self.on_startup_finished()
+
+    def install_diagnostics(self):
+        # 計測が有効な場合: 再描画までの時間の計測と、診断ダイアログ(Ctrl+Shift+D)
+        from PyQt5.QtWidgets import QShortcut, QTableView
+        from PyQt5.QtGui import QKeySequence
+        from view.diagnostics_dialog import PaintLatencyProbe
+        self._paint_probe = PaintLatencyProbe(TRACER, self.main_window)
+        task_view = self.main_window.task_view
+        self._paint_probe.watch(task_view.task_list.viewport())
+        self._paint_probe.watch(task_view.work_hours_display)
+        calendar_view = getattr(self.main_window, "calendar_view", None)
+        if calendar_view is not None:
+            cells = calendar_view.calendar.findChild(QTableView)
+            if cells is not None:
+                self._paint_probe.watch(cells.viewport())
+        self._diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self.main_window)
+        self._diagnostics_shortcut.activated.connect(self.open_diagnostics)
+        self._diagnostics_dialog = None
+
+    def open_diagnostics(self):
+        from view.diagnostics_dialog import DiagnosticsDialog
+        if self._diagnostics_dialog is None:
+            self._diagnostics_dialog = DiagnosticsDialog(TRACER, self.main_window)
+        self._diagnostics_dialog.refresh()
+        self._diagnostics_dialog.show()
+
     def handle_state(self, state):
         if state == "main":
             self.show_main_window()
@@ -37,4 +115,9 @@ class AppController:
     def run(self):
         state = self.function_manager.get_state()
         self.handle_state(state)
-        self.app.exec_()
\ No newline at end of file
+        self.app.exec_()
+        # 終了時に保存待ちの変更を書き出す
+        if self.task_controller is not None:
+            self.task_controller.close()
+        if TRACER.enabled:
+            TRACER.dump()
@@ -0,0 +1,234 @@
+import csv
+from datetime import date, datetime, timezone
+from model.task_record import TaskState
+
+# CSV / iCalendar との一括入出力(GUIなしで使う。PyQtはimportしない)
+# どの形式も1行(1件)ずつ読み書きし、ファイル全体をメモリに載せない
+
+# CSVの列: record は "task"(タスク) または "work_hours"(勤務時間)
+CSV_FIELDS = ["date", "record", "text", "state", "attr_ratio", "hours"]
+RECORD_TASK = "task"
+RECORD_WORK_HOURS = "work_hours"
+# この行数ごとに model.batch() でまとめて追加する
+DEFAULT_BATCH_ROWS = 5000
+
+# TaskState ↔ iCalendarのSTATUS
+ICS_STATUS = {TaskState.Planned: "NEEDS-ACTION", TaskState.Working: "IN-PROCESS", TaskState.Closed: "COMPLETED"}
+ICS_STATE = {"NEEDS-ACTION": "Planned", "IN-PROCESS": "Working", "COMPLETED": "Closed", "CANCELLED": "Closed"}
+ICS_ATTR_RATIO = "X-SCHEDULE-ATTR-RATIO"
+ICS_WORK_HOURS = "X-SCHEDULE-WORK-HOURS"
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _to_date_str(value):
+    # "yyyy-MM-dd" / "yyyy-MM-ddTHH:MM..." / "yyyyMMdd" → "yyyy-MM-dd" (不正ならNone)
+    value = (value or "").strip()
+    try:
+        if len(value) >= 10 and value[4] == "-":
+            return date.fromisoformat(value[:10]).isoformat()
+        return datetime.strptime(value[:8], "%Y%m%d").date().isoformat()
+    except (ValueError, IndexError):
+        return None
+
+
+# 読み込み: どの形式も CSV_FIELDS をキーにしたdictを1件ずつ返す
+def read_csv_rows(f):
+    for row in csv.DictReader(f):
+        record = (row.get("record") or "").strip()
+        if not record:
+            # record列がなければ、タスク名が空で勤務時間だけの行を勤務時間とみなす
+            record = RECORD_WORK_HOURS if not row.get("text") and row.get("hours") else RECORD_TASK
+        yield {
+            "date": row.get("date"), "record": record, "text": row.get("text"),
+            "state": row.get("state") or TaskState.Planned.name,
+            "attr_ratio": row.get("attr_ratio"), "hours": row.get("hours"),
+        }
+
+
+def _unfold_ics_lines(f):
+    # 折り返された行(空白で始まる行)を前の行につなげる
+    current = None
+    for line in f:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _ics_unescape(value):
+    result = []
+    chars = iter(value)
+    for c in chars:
+        if c == "\\":
+            n = next(chars, "")
+            result.append("\n" if n in ("n", "N") else n)
+        else:
+            result.append(c)
+    return "".join(result)
+
+
+def read_ics_rows(f):
+    # VTODO / VEVENT を1件ずつタスクとして読む(X-SCHEDULE-WORK-HOURSのあるものは勤務時間)
+    props = None
+    for line in _unfold_ics_lines(f):
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.upper() in ("VTODO", "VEVENT"):
+            props = {}
+        elif name == "END" and value.upper() in ("VTODO", "VEVENT") and props is not None:
+            start = props.get("DTSTART") or props.get("DUE")
+            if ICS_WORK_HOURS in props:
+                yield {"date": start, "record": RECORD_WORK_HOURS, "text": None, "state": None,
+                       "attr_ratio": None, "hours": props[ICS_WORK_HOURS]}
+            else:
+                yield {"date": start, "record": RECORD_TASK, "text": _ics_unescape(props.get("SUMMARY", "")),
+                       "state": ICS_STATE.get(props.get("STATUS", "").upper(), TaskState.Planned.name),
+                       "attr_ratio": props.get(ICS_ATTR_RATIO), "hours": None}
+            props = None
+        elif props is not None:
+            props[name] = value
+
+
+def import_rows(model, rows, batch_size=DEFAULT_BATCH_ROWS, on_batch=None):
+    # rowsをbatch_size件ずつまとめてModelに追加する(通知・保存はまとまりごとに1回)
+    # 戻り値: (読んだ行数, 追加したタスク数, 読み飛ばした行数)
+    count = added = skipped = 0
+    tasks = {}  # {date_str: [(text, attr_ratio, state), ...]}
+    hours = {}
+    pending = 0
+
+    def flush():
+        nonlocal added
+        with model.batch():
+            for date_str, entries in tasks.items():
+                added += len(model.add_tasks(date_str, entries))
+            for date_str, h in hours.items():
+                model.set_work_hours(date_str, h)
+        tasks.clear()
+        hours.clear()
+        if on_batch is not None:
+            on_batch(count)
+
+    for row in rows:
+        count += 1
+        date_str = _to_date_str(row.get("date"))
+        if date_str is None:
+            skipped += 1
+            continue
+        if row.get("record") == RECORD_WORK_HOURS:
+            h = _to_float(row.get("hours"))
+            if h is None:
+                skipped += 1
+                continue
+            hours[date_str] = h
+        else:
+            text = (row.get("text") or "").strip()
+            if not text:
+                skipped += 1
+                continue
+            tasks.setdefault(date_str, []).append((text, _to_float(row.get("attr_ratio")), row.get("state")))
+        pending += 1
+        if pending >= batch_size:
+            flush()
+            pending = 0
+    if pending:
+        flush()
+    return count, added, skipped
+
+
+# 書き出し: 日付順にタスク行、続けてその日の勤務時間行を返す
+def iter_export_rows(model, start=None, end=None):
+    hours = dict(model.storage.iter_work_hours(start, end))
+    hour_dates = iter(hours)
+    next_hours = next(hour_dates, None)
+
+    def hours_row(date_str):
+        return {"date": date_str, "record": RECORD_WORK_HOURS, "text": "", "state": "",
+                "attr_ratio": "", "hours": hours[date_str]}
+
+    for date_str, day in model.storage.iter_days(start, end):
+        # タスクのない日の勤務時間を先に出す
+        while next_hours is not None and next_hours < date_str:
+            yield hours_row(next_hours)
+            next_hours = next(hour_dates, None)
+        for t in day:
+            yield {"date": date_str, "record": RECORD_TASK, "text": t.text, "state": t.state,
+                   "attr_ratio": "" if t.attr_ratio is None else t.attr_ratio, "hours": ""}
+        if next_hours == date_str:
+            yield hours_row(next_hours)
+            next_hours = next(hour_dates, None)
+    while next_hours is not None:
+        yield hours_row(next_hours)
+        next_hours = next(hour_dates, None)
+
+
+def write_csv_rows(f, rows):
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def _ics_escape(value):
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _ics_fold(line):
+    # 75オクテットを超える行は折り返す(RFC 5545)
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    limit = 75
+    for c in line:
+        if len((current + c).encode("utf-8")) > limit:
+            parts.append(current)
+            current = " "
+            limit = 75
+        current += c
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def write_ics_rows(f, rows):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//schedule//bulk export//EN\r\n")
+    count = 0
+    last_date, n = None, 0  # UID用の日付ごとの連番(行は日付順に来る)
+    for row in rows:
+        date_str = row["date"]
+        n = n + 1 if date_str == last_date else 0
+        last_date = date_str
+        day = date_str.replace("-", "")
+        if row["record"] == RECORD_WORK_HOURS:
+            lines = ["BEGIN:VEVENT", f"UID:{day}-hours@schedule", f"DTSTAMP:{stamp}",
+                     f"DTSTART;VALUE=DATE:{day}", "SUMMARY:Work hours",
+                     f"{ICS_WORK_HOURS}:{row['hours']}", "END:VEVENT"]
+        else:
+            lines = ["BEGIN:VTODO", f"UID:{day}-{n}@schedule", f"DTSTAMP:{stamp}",
+                     f"DTSTART;VALUE=DATE:{day}", f"SUMMARY:{_ics_escape(row['text'])}",
+                     f"STATUS:{ICS_STATUS[TaskState[row['state']]]}"]
+            if row["attr_ratio"] != "":
+                lines.append(f"{ICS_ATTR_RATIO}:{row['attr_ratio']}")
+            lines.append("END:VTODO")
+        f.write("".join(_ics_fold(line) for line in lines))
+        count += 1
+    f.write("END:VCALENDAR\r\n")
+    return count
@@ -0,0 +1,320 @@
+import os
+import json
+import logging
+import zipfile
+import threading
+from datetime import date, timedelta
+from collections import OrderedDict
+from model.task_record import Task
+from model.task_index import TextIndexedList
+from model.task_events import TaskModelListener
+from model.date_keys import month_key, to_ordinal
+from controller.file_lock import FileLock
+
+# 古い日のコールドアーカイブ(init.conf.archive)
+# 期限より古い日と、すべてClosedのまま日の経った日を月ごとのJSONにしてzip(deflate)へ移し、
+# init.confとジャーナルには直近の日だけを残す(起動時の読み込み・コンパクション・メモリは直近の分で済む)
+# アーカイブは読み取り専用: 表示する月になったらModelに読み込むだけで保存はしない
+# 読み込んだ日を編集するとその日はinit.confに書かれ、アーカイブ側のその日は「復元済み」として以降使わない
+ARCHIVE_SUFFIX = ".archive"
+# 復元済みの日付のリスト(アーカイブの横に置くJSON。アーカイブを書き直すときに消す)
+RESTORED_SUFFIX = ".restored"
+# この日数より古い日はすべて移す
+ARCHIVE_AFTER_DAYS = 365
+# タスクがすべてClosedの日はこの日数が経てば移す(Noneなら移さない)
+ARCHIVE_CLOSED_AFTER_DAYS = 30
+# 同時にModelへ読み込んでおく月数(超えたら最も前に使った月から外す)
+MAX_PAGED_MONTHS = 12
+
+INDEX_NAME = "index.json"  # {"yyyy-MM": [date_str, ...]} アーカイブにある日付
+MONTH_DIR = "months/"      # months/yyyy-MM.json: {"calendar_tasks": {...}, "work_hours": {...}}
+
+logger = logging.getLogger(__name__)
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _replace_file(path, write):
+    # 一時ファイルに書いてfsyncしてから置き換える(途中で落ちても元のファイルはそのまま)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def select_archivable(data, after_days=ARCHIVE_AFTER_DAYS, closed_after_days=ARCHIVE_CLOSED_AFTER_DAYS, today=None):
+    # init.conf形式のdictから移す日を選ぶ: ({date_str: [task dict]}, {date_str: hours})
+    # 勤務時間はタスクと一緒に移す(その日の内容はすべてどちらか一方にある)
+    today = today or date.today()
+    horizon = (today - timedelta(days=after_days)).isoformat() if after_days is not None else ""
+    closed_horizon = (today - timedelta(days=closed_after_days)).isoformat() if closed_after_days is not None else ""
+    days = {}
+    for date_str, tasks in data.get("calendar_tasks", {}).items():
+        if date_str < horizon or (date_str < closed_horizon and tasks
+                                  and all(t.get("state") == "Closed" for t in tasks)):
+            days[date_str] = tasks
+    hours = {d: h for d, h in data.get("work_hours", {}).items() if d < horizon or d in days}
+    return days, hours
+
+
+class ColdArchive:
+    def __init__(self, path, after_days=ARCHIVE_AFTER_DAYS, closed_after_days=ARCHIVE_CLOSED_AFTER_DAYS):
+        self.path = path
+        self.restored_path = path + RESTORED_SUFFIX
+        self.after_days = after_days
+        self.closed_after_days = closed_after_days
+        self.lock = FileLock(path + ".lock")
+        # ローダーのスレッドとGUIスレッドの両方から使う
+        self._mutex = threading.RLock()
+        self._signature = None
+        self._index = {}
+        self._restored = set()
+        # 読めなかった場合の例外(壊れたアーカイブを書き直して日付を失わないよう、addはしない)
+        self.error = None
+        self.months_read = 0
+        self.archived_days = 0  # 直近のarchive_from()で移した日数
+
+    def _refresh(self):
+        # ファイルが置き換わっていれば目次と復元済みの日付を読み直す
+        signature = (_signature(self.path), _signature(self.restored_path))
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._index = {}
+        self._restored = set()
+        self.error = None
+        if signature[0] is not None:
+            try:
+                with zipfile.ZipFile(self.path) as z:
+                    self._index = json.loads(z.read(INDEX_NAME))
+            except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+                self.error = e
+                logger.error("cannot read archive %s: %s", self.path, e)
+        if signature[1] is not None:
+            try:
+                with open(self.restored_path, encoding="utf-8") as f:
+                    self._restored = set(json.load(f))
+            except (OSError, ValueError) as e:
+                # 復元済みが分からなければアーカイブ側の古い内容を出さない
+                self.error = e
+                self._index = {}
+                logger.error("cannot read restored dates %s: %s", self.restored_path, e)
+
+    def months(self):
+        with self._mutex:
+            self._refresh()
+            return sorted(self._index)
+
+    def has_month(self, month):
+        with self._mutex:
+            self._refresh()
+            return any(d not in self._restored for d in self._index.get(month, ()))
+
+    def contains(self, date_str):
+        # その日がアーカイブにある(復元済みでない)か
+        with self._mutex:
+            self._refresh()
+            return date_str in self._index.get(month_key(date_str), ()) and date_str not in self._restored
+
+    def dates(self):
+        with self._mutex:
+            self._refresh()
+            return sorted(d for dates in self._index.values() for d in dates if d not in self._restored)
+
+    def read_month(self, month):
+        # その月の ({date_str: [task dict]}, {date_str: hours})  復元済みの日は除く
+        with self._mutex:
+            self._refresh()
+            if month not in self._index:
+                return {}, {}
+            with zipfile.ZipFile(self.path) as z:
+                data = json.loads(z.read(f"{MONTH_DIR}{month}.json"))
+            self.months_read += 1
+            restored = self._restored
+        tasks = {d: t for d, t in data.get("calendar_tasks", {}).items() if d not in restored}
+        hours = {d: h for d, h in data.get("work_hours", {}).items() if d not in restored}
+        return tasks, hours
+
+    def add(self, days, hours):
+        # 日付を加えてアーカイブ全体を書き直す(一時ファイルに書いてから置き換える)
+        # 復元済みの日は捨て、復元済みのリストも消す(同じ日を再び移した場合は新しい内容になる)
+        with self._mutex, self.lock:
+            self._refresh()
+            if self.error is not None:
+                raise ValueError(f"archive is unreadable: {self.path}: {self.error}")
+            months = {month_key(d) for d in set(days) | set(hours)}
+
+            def write(f):
+                with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as out:
+                    index = {}
+                    for month in sorted(set(self._index) | months):
+                        tasks, month_hours = self.read_month(month) if month in self._index else ({}, {})
+                        tasks.update((d, t) for d, t in days.items() if month_key(d) == month)
+                        month_hours.update((d, h) for d, h in hours.items() if month_key(d) == month)
+                        dates = sorted(set(tasks) | set(month_hours), key=to_ordinal)
+                        if not dates:
+                            continue
+                        index[month] = dates
+                        out.writestr(f"{MONTH_DIR}{month}.json", json.dumps(
+                            {"calendar_tasks": tasks, "work_hours": month_hours},
+                            ensure_ascii=False, separators=(",", ":")))
+                    out.writestr(INDEX_NAME, json.dumps(index, separators=(",", ":")))
+            _replace_file(self.path, write)
+            # ここで落ちても、リストに残った日はinit.confにもある(init.confはこの後で書き直す)
+            try:
+                os.remove(self.restored_path)
+            except FileNotFoundError:
+                pass
+            self._signature = None
+
+    def mark_restored(self, date_strs):
+        # 編集されてinit.confに書かれた日: 以降アーカイブの内容は使わない
+        # アーカイブ本体には触らず、復元済みのリストを書き直す(一時ファイルから置き換え)
+        if not date_strs:
+            return
+        with self._mutex, self.lock:
+            self._refresh()
+            if self.error is not None:
+                # 読めなかったリストを上書きすると、復元済みの日の古い内容が戻ってしまう
+                raise ValueError(f"archive is unreadable: {self.path}: {self.error}")
+            restored = sorted(self._restored | set(date_strs), key=to_ordinal)
+            _replace_file(self.restored_path, lambda f: f.write(json.dumps(restored).encode("utf-8")))
+            self._signature = None
+
+    def archive_from(self, journal, today=None):
+        # init.conf(スナップショット + ジャーナル)から古い日を移し、残った内容を返す(journal.load()の代わり)
+        # 先にアーカイブへ書いてからinit.confを書き直す(途中で落ちても両方にある日はinit.conf側が使われる)
+        self.archived_days = 0
+
+        def move(data):
+            days, hours = select_archivable(data, self.after_days, self.closed_after_days, today)
+            if not days and not hours:
+                return None
+            try:
+                self.add(days, hours)
+            except (OSError, ValueError, zipfile.BadZipFile) as e:
+                # アーカイブに書けなければ移さずにそのまま読み込む
+                logger.error("cannot archive %d days to %s: %s", len(set(days) | set(hours)), self.path, e)
+                return None
+            rest = dict(data)
+            rest["calendar_tasks"] = {d: t for d, t in data.get("calendar_tasks", {}).items() if d not in days}
+            rest["work_hours"] = {d: h for d, h in data.get("work_hours", {}).items() if d not in hours}
+            self.archived_days = len(set(days) | set(hours))
+            return rest
+
+        return journal.compact_with(move)
+
+
+class ArchivePager(TaskModelListener):
+    # 表示する月のアーカイブをModelに読み込む(merge_loaded: 保存されない)
+    # 読み込んだ日が編集されたら、その日の内容をinit.confに書いてからアーカイブ側を復元済みにする
+    # save_days(date_strs, on_written): 指定日のタスク・勤務時間をinit.confに書き、
+    #   書き終えたらon_written()を呼ぶ関数(ConfPersistence.save_days  書き込みスレッドから呼ばれてもよい)
+    def __init__(self, model, archive, save_days=None, max_months=MAX_PAGED_MONTHS):
+        self.model = model
+        self.archive = archive
+        self.save_days = save_days
+        self.max_months = max_months
+        self._paged = OrderedDict()  # {month: set(date_str)} 読み込んで未編集の日(LRU順)
+        self.pages_in = 0
+        self.evictions = 0
+        self.restored = 0
+
+    def paged_dates(self):
+        return {d for dates in self._paged.values() for d in dates}
+
+    def is_paged(self, date_str):
+        return date_str in self._paged.get(month_key(date_str), ())
+
+    def ensure_range(self, start=None, end=None):
+        # start〜endの月を読み込む: 読み込んだ日付のリスト(省略した端はアーカイブの最初・最後の月)
+        # 範囲の月は上限を超えても外さない(レポート・検索で範囲全体が要るため。次に月を読み込むときに外す)
+        months = [m for m in self.archive.months()
+                  if (start is None or m >= start[:7]) and (end is None or m <= end[:7])]
+        loaded = []
+        for month in months:
+            loaded += self._page_in(month)
+        self._evict(set(months))
+        return loaded
+
+    def ensure_month(self, month):
+        loaded = self._page_in(month)
+        self._evict({month})
+        return loaded
+
+    def _page_in(self, month):
+        if month in self._paged:
+            self._paged.move_to_end(month)
+            return []
+        if not self.archive.has_month(month):
+            return []
+        tasks, hours = self.archive.read_month(month)
+        # init.confにもある日(アーカイブ後に書かれた日)はinit.conf側を使う
+        storage = self.model.storage
+        hot = {d for d in set(tasks) | set(hours) if storage.get_day(d) or storage.get_work_hours(d) is not None}
+        tasks = {d: TextIndexedList(Task.from_dict(t) for t in day) for d, day in tasks.items() if d not in hot}
+        hours = {d: h for d, h in hours.items() if d not in hot}
+        self._paged[month] = set(tasks) | set(hours)
+        self.pages_in += 1
+        if tasks or hours:
+            self.model.merge_loaded(tasks, hours)
+        return sorted(self._paged[month])
+
+    def _evict(self, keep=()):
+        # 上限を超えた分を最も前に使った月から外す(keepの月は外さない)
+        excess = len(self._paged) - self.max_months
+        for month in [m for m in self._paged if m not in keep][:max(excess, 0)]:
+            dates = self._paged.pop(month)
+            # 他のプロセスで復元された日は残す(init.confの内容を取り込んでいる)
+            dates = [d for d in dates if self.archive.contains(d)]
+            if dates:
+                self.model.replace_days({d: [] for d in dates}, {d: None for d in dates})
+            self.evictions += 1
+
+    def _edited(self, date_strs):
+        edited = [d for d in date_strs if self.is_paged(d)]
+        if not edited:
+            return
+        for date_str in edited:
+            self._paged[month_key(date_str)].discard(date_str)
+        if self.save_days is not None:
+            self.save_days(edited, lambda: self._mark_restored(edited))
+        else:
+            self._mark_restored(edited)
+
+    def _mark_restored(self, date_strs):
+        # init.confに書き終えてから呼ばれる
+        try:
+            self.archive.mark_restored(date_strs)
+        except (OSError, ValueError) as e:
+            # init.confには書けているので、読み込むときはinit.conf側が使われる
+            logger.error("cannot mark %s as restored in %s: %s", ", ".join(date_strs), self.archive.path, e)
+            return
+        self.restored += len(date_strs)
+
+    def task_added(self, date_str, index, task):
+        self._edited([date_str])
+
+    def task_removed(self, date_str, index, task):
+        self._edited([date_str])
+
+    def task_updated(self, date_str, index, fields):
+        self._edited([date_str])
+
+    def work_hours_changed(self, date_str, hours):
+        self._edited([date_str])
+
+    def batch_committed(self, changes):
+        self._edited(changes.dates())
+
+    def stats(self):
+        return {"paged_months": len(self._paged), "pages_in": self.pages_in, "evictions": self.evictions,
+                "restored": self.restored, "months_read": self.archive.months_read}
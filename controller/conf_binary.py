@@ -0,0 +1,277 @@
+import sys
+import json
+import mmap
+import math
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from model.task_record import TaskState, to_state_code
+from model.date_keys import to_ordinal, from_ordinal
+
+# init.confのバイナリ形式(列指向のスナップショット)
+# JSONと同じ内容(calendar_tasks / work_hours / その他のキー)を固定長の配列で持ち、
+# mmapで開いて日付ごとに必要になったときだけデコードする
+#
+# ヘッダ: magic, version, 予約, 文字列数, 日数, タスク数, 勤務時間の日数, メタ情報のバイト数, 文字列のバイト数
+# 続けて以下の配列(それぞれ8バイト境界から、リトルエンディアン)
+#   文字列の開始位置 u32[文字列数+1] / 文字列(UTF-8を連結)
+#   日付の序数 i32[日数](昇順) / 日ごとのタスクの開始位置 u32[日数+1]
+#   タスク名の文字列番号 u32[タスク数] / attr_ratio f64[タスク数](NaNはNone) / 状態 u8[タスク数]
+#   勤務時間の日付の序数 i32[勤務時間の日数] / 勤務時間 f64[勤務時間の日数]
+#   メタ情報(マスターリスト・繰り返しタスクなど、calendar_tasks・work_hours以外のキー)のJSON
+MAGIC = b"SCHB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIII")
+ALIGN = 8
+STATE_NAMES = [s.name for s in TaskState]
+
+
+def is_binary_snapshot(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _pad(n):
+    return -n % ALIGN
+
+
+def _to_bytes(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _optional_float(value):
+    return math.nan if value is None else float(value)
+
+
+def encode_snapshot(data):
+    # init.conf形式のdict → バイナリ
+    # タスクはdictでもTaskでもよい(t["text"] / t.get(...) で読む)
+    calendar_tasks = data.get("calendar_tasks", {})
+    work_hours = data.get("work_hours", {})
+    strings = {}
+    day_ordinals = array("i")
+    day_starts = array("I", [0])
+    text_ids = array("I")
+    ratios = array("d")
+    states = array("B")
+    for date_str in sorted(calendar_tasks, key=to_ordinal):
+        day_ordinals.append(to_ordinal(date_str))
+        for t in calendar_tasks[date_str]:
+            text_ids.append(strings.setdefault(t["text"], len(strings)))
+            ratios.append(_optional_float(t.get("attr_ratio")))
+            states.append(int(to_state_code(t.get("state", "Planned"))))
+        day_starts.append(len(text_ids))
+    hour_dates = sorted(work_hours, key=to_ordinal)
+    hour_ordinals = array("i", (to_ordinal(d) for d in hour_dates))
+    hours = array("d", (_optional_float(work_hours[d]) for d in hour_dates))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    string_offsets = array("I", [0])
+    for s in encoded:
+        string_offsets.append(string_offsets[-1] + len(s))
+    blob = b"".join(encoded)
+    meta = json.dumps({k: v for k, v in data.items() if k not in ("calendar_tasks", "work_hours")},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(encoded), len(day_ordinals), len(text_ids),
+                         len(hour_ordinals), len(meta), len(blob))]
+    size = HEADER.size
+    for chunk in (_to_bytes(string_offsets), blob, _to_bytes(day_ordinals), _to_bytes(day_starts),
+                  _to_bytes(text_ids), _to_bytes(ratios), _to_bytes(states),
+                  _to_bytes(hour_ordinals), _to_bytes(hours), meta):
+        padding = b"\0" * _pad(size)
+        parts.append(padding)
+        parts.append(chunk)
+        size += len(padding) + len(chunk)
+    return b"".join(parts)
+
+
+def write_binary_snapshot(path, data):
+    with open(path, "wb") as f:
+        f.write(encode_snapshot(data))
+
+
+class BinarySnapshot:
+    # mmapで開いたバイナリのスナップショット
+    # 配列はmemoryviewのままコピーせずに参照し、日付ごとのタスクは取り出すときにデコードする
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except (struct.error, TypeError, ValueError) as e:
+            self.close()
+            raise ValueError(f"invalid binary snapshot: {path}: {e}") from None
+
+    def _parse(self):
+        buf = memoryview(self._mmap)
+        magic, version, _, n_strings, n_days, n_tasks, n_hours, meta_len, blob_len = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("unsupported format")
+        self._pos = HEADER.size
+        self._buf = buf
+        self._string_offsets = self._take("I", n_strings + 1)
+        self._blob = self._take_bytes(blob_len)
+        self._day_ordinals = self._take("i", n_days)
+        self._day_starts = self._take("I", n_days + 1)
+        self._text_ids = self._take("I", n_tasks)
+        self._ratios = self._take("d", n_tasks)
+        self._states = self._take("B", n_tasks)
+        hour_ordinals = self._take("i", n_hours)
+        hours = self._take("d", n_hours)
+        self.meta = json.loads(bytes(self._take_bytes(meta_len)).decode("utf-8"))
+        # 勤務時間は小さいのでまとめてデコードする
+        self.work_hours = {from_ordinal(o): (None if math.isnan(h) else h) for o, h in zip(hour_ordinals, hours)}
+        self._strings = [None] * n_strings
+
+    def _take_bytes(self, n):
+        self._pos += _pad(self._pos)
+        chunk = self._buf[self._pos:self._pos + n]
+        if len(chunk) != n:
+            raise ValueError("truncated")
+        self._pos += n
+        return chunk
+
+    def _take(self, typecode, count):
+        chunk = self._take_bytes(count * array(typecode).itemsize)
+        if sys.byteorder == "little":
+            return chunk.cast(typecode)
+        values = array(typecode, bytes(chunk))
+        values.byteswap()
+        return values
+
+    def close(self):
+        # memoryviewを解放してからでないとmmapを閉じられない
+        for name in ("_string_offsets", "_blob", "_day_ordinals", "_day_starts", "_text_ids", "_ratios",
+                     "_states", "_buf"):
+            view = self.__dict__.pop(name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 取り出し途中の参照が残っていれば、参照がなくなったときに閉じられる
+                pass
+            self._mmap = None
+
+    def _string(self, i):
+        s = self._strings[i]
+        if s is None:
+            s = sys.intern(bytes(self._blob[self._string_offsets[i]:self._string_offsets[i + 1]]).decode("utf-8"))
+            self._strings[i] = s
+        return s
+
+    def _day_index(self, date_str):
+        ordinal = to_ordinal(date_str)
+        i = bisect_left(self._day_ordinals, ordinal)
+        if i < len(self._day_ordinals) and self._day_ordinals[i] == ordinal:
+            return i
+        return None
+
+    def __len__(self):
+        return len(self._day_ordinals)
+
+    def dates(self):
+        return [from_ordinal(o) for o in self._day_ordinals]
+
+    def iter_days(self):
+        # (date_str, tasks) を日付順に(全体の読み込み用: 日付の検索をしない)
+        for i, ordinal in enumerate(self._day_ordinals.tolist()):
+            yield from_ordinal(ordinal), self._tasks_at(i)
+
+    def has_day(self, date_str):
+        return self._day_index(date_str) is not None
+
+    def day_tasks(self, date_str):
+        # その日のタスク(init.confと同じdictのリスト)  データがなければNone
+        i = self._day_index(date_str)
+        if i is None:
+            return None
+        return self._tasks_at(i)
+
+    def _tasks_at(self, i):
+        start, end = self._day_starts[i], self._day_starts[i + 1]
+        string = self._string
+        return [{"text": string(text_id), "state": STATE_NAMES[state], "attr_ratio": None if ratio != ratio else ratio}
+                for text_id, state, ratio in zip(self._text_ids[start:end].tolist(), self._states[start:end].tolist(),
+                                                 self._ratios[start:end].tolist())]
+
+    def to_conf(self):
+        # init.conf形式のdict(calendar_tasksは取り出したときにデコードする)
+        data = dict(self.meta)
+        data["calendar_tasks"] = LazyCalendarTasks(self)
+        data["work_hours"] = dict(self.work_hours)
+        return data
+
+
+class LazyCalendarTasks(MutableMapping):
+    # {date_str: [task dict, ...]} として使えるビュー
+    # 書き込み(ジャーナルの再生)はメモリ上に重ね、スナップショットは変更しない
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._overlay = {}
+        self._deleted = set()
+
+    def __getitem__(self, date_str):
+        if date_str in self._overlay:
+            return self._overlay[date_str]
+        if date_str not in self._deleted:
+            tasks = self.snapshot.day_tasks(date_str)
+            if tasks is not None:
+                return tasks
+        raise KeyError(date_str)
+
+    def __contains__(self, date_str):
+        return date_str in self._overlay or (date_str not in self._deleted and self.snapshot.has_day(date_str))
+
+    def __setitem__(self, date_str, tasks):
+        self._overlay[date_str] = tasks
+
+    def __delitem__(self, date_str):
+        if date_str not in self:
+            raise KeyError(date_str)
+        self._overlay.pop(date_str, None)
+        self._deleted.add(date_str)
+
+    def __iter__(self):
+        for date_str in self.snapshot.dates():
+            if date_str not in self._overlay and date_str not in self._deleted:
+                yield date_str
+        yield from self._overlay
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def items(self):
+        # 全日付を順に取り出す場合は日付ごとの検索をせずに先頭からデコードする
+        for date_str, tasks in self.snapshot.iter_days():
+            if date_str not in self._overlay and date_str not in self._deleted:
+                yield date_str, tasks
+        yield from self._overlay.items()
+
+
+def read_binary_snapshot(path):
+    # すべてデコードしてinit.conf形式のdictで返す(mmapは閉じる)
+    snapshot = BinarySnapshot(path)
+    try:
+        return materialize(snapshot.to_conf())
+    finally:
+        snapshot.close()
+
+
+def materialize(data):
+    # LazyCalendarTasksを通常のdictに置き換える(json.dumpや書き換えの前に使う)
+    tasks = data.get("calendar_tasks")
+    if isinstance(tasks, LazyCalendarTasks):
+        data = dict(data)
+        data["calendar_tasks"] = dict(tasks)
+        tasks.snapshot.close()
+    return data
@@ -0,0 +1,274 @@
+import os
+import json
+import threading
+from controller.file_lock import FileLock
+from controller.conf_binary import (
+    MAGIC as BINARY_MAGIC, BinarySnapshot, write_binary_snapshot, materialize
+)
+
+# 追記型ジャーナル: 変更ごとに1行のレコードを追記し、
+# スナップショット(init.conf)の全書き換えはコンパクション時のみ行う
+JOURNAL_SUFFIX = ".journal"
+# 複数のプロセスで共有する場合の排他用ファイル
+LOCK_SUFFIX = ".lock"
+# コンパクションの閾値(レコード数・バイト数のどちらかを超えたら実施)
+COMPACT_MAX_RECORDS = 500
+COMPACT_MAX_BYTES = 1024 * 1024
+
+# レコード種別
+OP_DAY = "day"        # {"op": "day", "date": ..., "tasks": [...]} 指定日のタスク一覧を置き換え
+OP_WORK_HOURS = "wh"  # {"op": "wh", "date": ..., "hours": float | None}
+OP_MASTER = "master"  # {"op": "master", "list": [...]}
+OP_RULES = "rules"    # {"op": "rules", "list": [...]} 繰り返しタスクのルール
+OP_OCCURRENCE = "occ"  # {"op": "occ", "date": ..., "overrides": {rule_id: {...}}} 繰り返しタスクのその日の上書き
+# スナップショットの形式: "json"(indent付きのJSON) / "binary"(conf_binary.py の列指向形式)
+SNAPSHOT_JSON = "json"
+SNAPSHOT_BINARY = "binary"
+SNAPSHOT_FORMATS = (SNAPSHOT_JSON, SNAPSHOT_BINARY)
+
+
+def apply_record(data, record):
+    # スナップショット(dict)にレコードを1件適用する
+    op = record.get("op")
+    if op == OP_DAY:
+        calendar = data.setdefault("calendar_tasks", {})
+        if record.get("tasks"):
+            calendar[record["date"]] = record["tasks"]
+        else:
+            calendar.pop(record["date"], None)
+    elif op == OP_WORK_HOURS:
+        work_hours = data.setdefault("work_hours", {})
+        if record.get("hours") is None:
+            work_hours.pop(record["date"], None)
+        else:
+            work_hours[record["date"]] = record["hours"]
+    elif op == OP_MASTER:
+        data["task_master_list"] = record.get("list", [])
+    elif op == OP_RULES:
+        data["recurring_rules"] = record.get("list", [])
+        # 削除されたルールの上書きは捨てる
+        ids = {r["id"] for r in data["recurring_rules"]}
+        overrides = data.get("recurring_overrides", {})
+        for date_str in list(overrides):
+            kept = {rule_id: o for rule_id, o in overrides[date_str].items() if rule_id in ids}
+            if kept:
+                overrides[date_str] = kept
+            else:
+                del overrides[date_str]
+    elif op == OP_OCCURRENCE:
+        overrides = data.setdefault("recurring_overrides", {})
+        if record.get("overrides"):
+            overrides[record["date"]] = record["overrides"]
+        else:
+            overrides.pop(record["date"], None)
+
+
+def write_snapshot(path, data, snapshot_format=SNAPSHOT_JSON):
+    # 一時ファイルに書いてから置き換え(書き込み途中で落ちても壊れない)
+    tmp_path = path + ".tmp"
+    if snapshot_format == SNAPSHOT_BINARY:
+        write_binary_snapshot(tmp_path, data)
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(materialize(data), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    # スナップショットを読む(形式は先頭のバイトで判定するので、どちらの形式でも読める)
+    # バイナリ形式のcalendar_tasksは日付ごとに取り出したときにデコードする
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+            return BinarySnapshot(path).to_conf()
+        f.seek(0)
+        return json.loads(f.read().decode("utf-8"))
+
+
+def convert_snapshot(src_path, dst_path, snapshot_format):
+    # init.conf(スナップショット + ジャーナル)を指定の形式で書き出す
+    # 同じパスならその場で変換してジャーナルを畳み込む
+    if os.path.abspath(src_path) == os.path.abspath(dst_path):
+        ConfJournal(src_path, snapshot_format=snapshot_format).compact()
+        return
+    data = materialize(ConfJournal(src_path).load())
+    write_snapshot(dst_path, data, snapshot_format)
+
+
+class ConfJournal:
+    def __init__(self, conf_path, max_records=COMPACT_MAX_RECORDS, max_bytes=COMPACT_MAX_BYTES,
+                 snapshot_format=SNAPSHOT_JSON):
+        self.conf_path = conf_path
+        # コンパクションで書く形式(読み込みはどちらの形式でもよい)
+        self.snapshot_format = snapshot_format
+        self.journal_path = conf_path + JOURNAL_SUFFIX
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._records = 0
+        self._bytes = 0
+        # 読み書きはプロセス間ではロックファイル、プロセス内ではスレッドのロックで排他する
+        self._file_lock = FileLock(conf_path + LOCK_SUFFIX)
+        self._thread_lock = threading.Lock()
+        # 最後にload()した時点の (ジャーナルの位置, スナップショットの識別情報)
+        self.last_load = (0, None)
+
+    def _locked(self):
+        return _JournalLock(self)
+
+    def load(self):
+        # スナップショット + ジャーナル末尾を再生して返す
+        with self._locked():
+            data, offset = self._load()
+            self.last_load = (offset, self.snapshot_signature())
+            return data
+
+    def load_with_offset(self):
+        # load() と同じ内容と、読み終えたジャーナルの位置(続きはread_records_fromで読む)
+        with self._locked():
+            data, offset = self._load()
+            self.last_load = (offset, self.snapshot_signature())
+            return (data,) + self.last_load
+
+    def snapshot_signature(self):
+        # スナップショットが置き換えられたかの判定用
+        try:
+            st = os.stat(self.conf_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def read_records_from(self, offset):
+        # ジャーナルのoffset以降に追記された完結した行だけを読む
+        # 戻り値: (レコードのリスト, 新しいoffset)  ジャーナルが消えた・縮んだ場合は None
+        with self._locked():
+            try:
+                with open(self.journal_path, "rb") as f:
+                    f.seek(0, os.SEEK_END)
+                    size = f.tell()
+                    if size < offset:
+                        return None
+                    f.seek(offset)
+                    chunk = f.read()
+            except FileNotFoundError:
+                return None if offset else ([], 0)
+        end = chunk.rfind(b"\n") + 1
+        records = []
+        for line in chunk[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                records.append(record)
+        return records, offset + end
+
+    def _load(self):
+        data = {}
+        try:
+            loaded = read_snapshot(self.conf_path)
+            if isinstance(loaded, dict):
+                data = loaded
+        except (OSError, ValueError):
+            pass
+        self._records = 0
+        self._bytes = 0
+        offset = 0
+        try:
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    self._bytes += len(line)
+                    if line.endswith(b"\n"):
+                        offset = self._bytes
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 書き込み途中で途切れた行は無視
+                        continue
+                    if isinstance(record, dict):
+                        apply_record(data, record)
+                        self._records += 1
+        except OSError:
+            pass
+        return data, offset
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        # 複数レコードを1回の書き込みでまとめて追記
+        if not records:
+            return
+        chunk = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+        chunk = chunk.encode("utf-8")
+        with self._locked():
+            with open(self.journal_path, "ab+") as f:
+                # 前回の書き込みが途中で失敗していれば、途切れた行を閉じてから書く(再試行したレコードを同じ行にしない)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        chunk = b"\n" + chunk
+                f.write(chunk)
+        self._records += len(records)
+        self._bytes += len(chunk)
+
+    def needs_compaction(self):
+        return self._records >= self.max_records or self._bytes >= self.max_bytes
+
+    def compact(self, data=None):
+        # スナップショットを書き直してからジャーナルを破棄
+        # dataを省略した場合はディスク上のスナップショット + ジャーナルから畳み込む
+        # (他のプロセスが追記した変更も含まれる)
+        with self._locked():
+            if data is None:
+                # バイナリ形式はmmapを閉じてから置き換える
+                data = materialize(self._load()[0])
+            write_snapshot(self.conf_path, data, self.snapshot_format)
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+        self._records = 0
+        self._bytes = 0
+
+    def compact_with(self, transform):
+        # ディスク上の内容をtransform(data)で書き換えてコンパクションし、書き換え後の内容を返す
+        # (読んでから書き直すまでロックを持つので、他のプロセスの追記が失われない)
+        # transformがNoneを返したら書き直さない(load()と同じ)
+        with self._locked():
+            data, offset = self._load()
+            data = materialize(data)
+            changed = transform(data)
+            if changed is None:
+                self.last_load = (offset, self.snapshot_signature())
+                return data
+            write_snapshot(self.conf_path, changed, self.snapshot_format)
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+            self._records = 0
+            self._bytes = 0
+            self.last_load = (0, self.snapshot_signature())
+            return changed
+
+    def record_count(self):
+        return self._records
+
+
+class _JournalLock:
+    def __init__(self, journal):
+        self.journal = journal
+
+    def __enter__(self):
+        self.journal._thread_lock.acquire()
+        try:
+            self.journal._file_lock.acquire()
+        except Exception:
+            self.journal._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.journal._file_lock.release()
+        finally:
+            self.journal._thread_lock.release()
@@ -0,0 +1,59 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from model.task_record import Task
+from model.task_index import TextIndexedList
+from model.date_keys import to_ordinal, valid_date_keys
+from controller.conf_persistence import DEFAULT_TASK_MASTER_LIST
+
+# 1回に画面へ渡す日数
+LOAD_CHUNK_DAYS = 200
+
+
+# init.conf(スナップショット + ジャーナル)を別スレッドで読み込み、
+# 選択中の日付から近い順に少しずつGUIスレッドへ渡す
+class ConfLoader(QThread):
+    master_loaded = pyqtSignal(object)
+    # (recurring_rules, recurring_overrides)
+    recurrence_loaded = pyqtSignal(object, object)
+    # (calendar_tasks {date_str: [Task, ...]}, work_hours, 読み込み済み日数, 全日数)
+    chunk_loaded = pyqtSignal(object, object, int, int)
+
+    # archive: conf_archive.ColdArchive(指定すれば読み込む前に古い日をアーカイブへ移す)
+    def __init__(self, journal, first_date, chunk_days=LOAD_CHUNK_DAYS, archive=None, parent=None):
+        super().__init__(parent)
+        self.journal = journal
+        self.archive = archive
+        self.first_date = first_date
+        self.chunk_days = chunk_days
+
+    def run(self):
+        try:
+            if self.archive is not None:
+                conf = self.archive.archive_from(self.journal)
+            else:
+                conf = self.journal.load()
+        except Exception:
+            conf = {}
+        self.master_loaded.emit(conf.get("task_master_list", [dict(t) for t in DEFAULT_TASK_MASTER_LIST]))
+        if conf.get("recurring_rules"):
+            self.recurrence_loaded.emit(conf["recurring_rules"], conf.get("recurring_overrides", {}))
+        # 日付として読めないキーは無視する(読み込みのスレッドを止めない)
+        calendar_tasks = valid_date_keys(conf.get("calendar_tasks", {}))
+        work_hours = valid_date_keys(conf.get("work_hours", {}))
+        first = to_ordinal(self.first_date)
+        dates = sorted(set(calendar_tasks) | set(work_hours), key=lambda d: (abs(to_ordinal(d) - first), d))
+        total = len(dates)
+        # 選択中の日付は単独で最初に渡す
+        start = 0
+        size = 1
+        while start < total:
+            if self.isInterruptionRequested():
+                return
+            chunk = dates[start:start + size]
+            tasks = {d: TextIndexedList(Task.from_dict(t) for t in calendar_tasks[d])
+                     for d in chunk if d in calendar_tasks}
+            hours = {d: work_hours[d] for d in chunk if d in work_hours}
+            start += len(chunk)
+            self.chunk_loaded.emit(tasks, hours, start, total)
+            size = self.chunk_days
+            # GUIスレッドに処理を譲る
+            self.yieldCurrentThread()
@@ -0,0 +1,297 @@
+from model.task_events import TaskModelListener
+from model.task_record import tasks_to_json
+from model.task_recurrence import RecurringTask
+from controller.conf_journal import (
+    ConfJournal, OP_DAY, OP_WORK_HOURS, OP_MASTER, OP_RULES, OP_OCCURRENCE, SNAPSHOT_JSON
+)
+from controller.persist_worker import PersistWorker, DEFAULT_DEBOUNCE_SEC
+
+DEFAULT_TASK_MASTER_LIST = [
+    {"text": "Sample Task 1", "attr": "Free"},
+    {"text": "Sample Task 2", "attr": "Mon"}
+]
+
+
+# init.conf(スナップショット + ジャーナル)への保存を担当
+# Modelのリスナーとして登録し、変更のあった日付・項目だけを書き込む
+class ConfPersistence(TaskModelListener):
+    def __init__(self, model, conf_path, journal_enabled=True, background=True,
+                 debounce=DEFAULT_DEBOUNCE_SEC, snapshot_format=SNAPSHOT_JSON):
+        self.model = model
+        self.journal = ConfJournal(conf_path, snapshot_format=snapshot_format)
+        self.journal_enabled = journal_enabled
+        self.persist_worker = None
+        # バックグラウンド読み込み中は書き込みを保留する(未読み込みの日を上書きしないため)
+        self.loading = False
+        self._pending_keys = {}  # {key: None} 変更のあったキー(順序付き)
+        self._compaction_pending = False
+        self._written_callbacks = []  # 読み込み中に頼まれたsave_daysのon_written
+        # Falseにするとジャーナルが溜まっても自動でコンパクションしない(一括取り込み用)
+        self.auto_compact = True
+        # 古い日のアーカイブ(conf_archive.ColdArchive)  設定されていれば読み込み時に古い日を移す
+        self.archive = None
+        # アーカイブから読み込んだ日(conf_archive.ArchivePager)  Modelから全体保存するときは除く
+        self.pager = None
+        if journal_enabled and background:
+            self.persist_worker = PersistWorker(self.journal, debounce)
+            self.persist_worker.start()
+
+    def load_conf(self):
+        # 設定ファイル(スナップショット + ジャーナル)を読み込み
+        try:
+            if self.archive is not None:
+                return self.archive.archive_from(self.journal)
+            return self.journal.load()
+        except Exception:
+            pass
+        # デフォルト
+        return {}
+
+    def load_into_model(self):
+        conf = self.load_conf()
+        self.model.load_data(conf.get("calendar_tasks", {}), conf.get("work_hours", {}))
+        self.model.load_master_list(conf.get("task_master_list", [dict(t) for t in DEFAULT_TASK_MASTER_LIST]))
+        self.model.load_recurrence(conf.get("recurring_rules", []), conf.get("recurring_overrides", {}))
+        # 起動時点でジャーナルが溜まっていればまとめておく
+        if self.journal_enabled and self.journal.needs_compaction():
+            self.save_conf()
+
+    def begin_loading(self):
+        self.loading = True
+
+    def finish_loading(self):
+        # 読み込み完了: 保留していた日付・項目を現在の内容で書き込み、必要ならコンパクション
+        self.loading = False
+        pending, self._pending_keys = self._pending_keys, {}
+        for key in pending:
+            if key[0] == OP_DAY:
+                self.save_day(key[1])
+            elif key[0] == OP_WORK_HOURS:
+                self.save_work_hours(key[1])
+            elif key[0] == OP_OCCURRENCE:
+                self.save_occurrences(key[1])
+            elif key[0] == OP_RULES:
+                self.save_recurring_rules()
+            else:
+                self.save_master_list()
+        callbacks, self._written_callbacks = self._written_callbacks, []
+        for on_written in callbacks:
+            self._notify_written(on_written)
+        compaction, self._compaction_pending = self._compaction_pending, False
+        if compaction or (self.journal_enabled and self.journal.needs_compaction()):
+            self.save_conf()
+
+    def save_conf(self, from_model=False):
+        # 設定ファイルに全体を保存(ジャーナルはここでコンパクション)
+        # from_model: ディスクではなくModelの内容で書き直す(ジャーナルに書けなかった場合)
+        if self.loading:
+            # 読み込み中のModelは全データを持っていないので、完了後に行う
+            self._compaction_pending = True
+            return
+        if self.persist_worker is not None:
+            # 書き込みスレッドがディスク上のスナップショット + ジャーナルから畳み込む
+            self.persist_worker.request_compaction()
+            return
+        data = None
+        if from_model or not self.journal_enabled:
+            paged = self.pager.paged_dates() if self.pager is not None else set()
+            data = {
+                "task_master_list": self.model.get_master_list(),
+                "calendar_tasks": {d: t for d, t in tasks_to_json(self.model.tasks).items() if d not in paged},
+                "work_hours": {d: h for d, h in self.model.work_hours.items() if d not in paged},
+                "recurring_rules": self.model.recurrence.rules_data(),
+                "recurring_overrides": self.model.recurrence.overrides_data()
+            }
+        try:
+            # dataがNoneならディスク上の内容(他のプロセスの変更を含む)から畳み込む
+            self.journal.compact(data)
+        except Exception:
+            pass
+
+    def append_journal(self, key, record):
+        self.append_journal_many([(key, record)])
+
+    def append_journal_many(self, entries):
+        # entries: [(key, record), ...] 同期書き込みの場合は1回の追記にまとめる
+        if self.loading:
+            for key, record in entries:
+                self._pending_keys[key] = None
+            return
+        if not self.journal_enabled:
+            self.save_conf()
+            return
+        if self.persist_worker is not None:
+            # 同じキーの未書き込みレコードは最新のものに置き換わる
+            for key, record in entries:
+                self.persist_worker.submit(key, record)
+            return
+        try:
+            self.journal.append_many([record for key, record in entries])
+        except Exception:
+            # 追記できなければ全体保存に切り替え
+            self.save_conf(from_model=True)
+            return
+        if self.auto_compact and self.journal.needs_compaction():
+            self.save_conf()
+
+    def _day_entry(self, date_str):
+        # 書き込みスレッドに渡すのでこの時点の内容をコピーしておく
+        # 繰り返しタスクは含めない(ルールと上書きは別のレコード)
+        tasks = [t.to_dict() for t in self.model.storage.get_day(date_str)]
+        return (OP_DAY, date_str), {"op": OP_DAY, "date": date_str, "tasks": tasks}
+
+    def _work_hours_entry(self, date_str):
+        hours = self.model.get_work_hours(date_str)
+        return (OP_WORK_HOURS, date_str), {"op": OP_WORK_HOURS, "date": date_str, "hours": hours}
+
+    def _master_entry(self):
+        master = [dict(t) for t in self.model.get_master_list()]
+        return (OP_MASTER,), {"op": OP_MASTER, "list": master}
+
+    def _rules_entry(self):
+        return (OP_RULES,), {"op": OP_RULES, "list": self.model.recurrence.rules_data()}
+
+    def _occurrence_entry(self, date_str):
+        overrides = self.model.recurrence.overrides_data(date_str)
+        return (OP_OCCURRENCE, date_str), {"op": OP_OCCURRENCE, "date": date_str, "overrides": overrides}
+
+    def save_day(self, date_str):
+        self.append_journal(*self._day_entry(date_str))
+
+    def save_days(self, date_strs, on_written=None):
+        # 指定日のタスクと勤務時間を書き込み、書き終えたらon_written()を呼ぶ(アーカイブから戻した日)
+        # 書き込みスレッドがあれば、GUIスレッドは待たずに書き込みスレッドから呼ばれる
+        self.append_journal_many([entry for d in date_strs
+                                  for entry in (self._day_entry(d), self._work_hours_entry(d))])
+        if on_written is None:
+            return
+        if self.loading:
+            self._written_callbacks.append(on_written)
+        else:
+            self._notify_written(on_written)
+
+    def _notify_written(self, on_written):
+        if self.persist_worker is not None:
+            self.persist_worker.notify_written(on_written)
+        else:
+            on_written()
+
+    def save_work_hours(self, date_str):
+        self.append_journal(*self._work_hours_entry(date_str))
+
+    def save_master_list(self):
+        self.append_journal(*self._master_entry())
+
+    def save_recurring_rules(self):
+        self.append_journal(*self._rules_entry())
+
+    def save_occurrences(self, date_str):
+        self.append_journal(*self._occurrence_entry(date_str))
+
+    # TaskModelListener
+    def task_added(self, date_str, index, task):
+        self.save_day(date_str)
+
+    def task_removed(self, date_str, index, task):
+        # 繰り返しタスクはoccurrence_changedで保存する
+        if not isinstance(task, RecurringTask):
+            self.save_day(date_str)
+
+    def task_updated(self, date_str, index, fields):
+        if not self.model.is_occurrence(date_str, index):
+            self.save_day(date_str)
+
+    def work_hours_changed(self, date_str, hours):
+        self.save_work_hours(date_str)
+
+    def master_list_changed(self, task_master_list):
+        self.save_master_list()
+
+    def recurring_rules_changed(self, rules):
+        self.save_recurring_rules()
+
+    def occurrence_changed(self, date_str, rule_id):
+        self.save_occurrences(date_str)
+
+    def batch_committed(self, changes):
+        # まとめた変更は日付・項目ごとに1レコードずつ、1回で書き込む
+        entries = [self._day_entry(d) for d in sorted(changes.task_dates)]
+        entries += [self._work_hours_entry(d) for d in sorted(changes.work_hours_dates)]
+        if changes.master_list_changed:
+            entries.append(self._master_entry())
+        if changes.recurring_rules_changed:
+            entries.append(self._rules_entry())
+        entries += [self._occurrence_entry(d) for d in sorted(changes.occurrence_dates)]
+        self.append_journal_many(entries)
+
+    def pending_keys(self):
+        # まだジャーナルに書き終えていない日付・項目のキー(ConfSyncが自分の変更を巻き戻さないように)
+        keys = set(self._pending_keys)
+        if self.persist_worker is not None:
+            keys |= self.persist_worker.pending_keys()
+        return keys
+
+    def stats(self):
+        # 書き込み回数・レイテンシの確認用
+        if self.persist_worker is None:
+            return {}
+        return self.persist_worker.stats()
+
+    def close(self):
+        # 終了時: 未書き込みの変更をすべて書き出してからスレッドを止める
+        if self.persist_worker is not None:
+            flushed = self.persist_worker.flush()
+            self.persist_worker.stop()
+            self.persist_worker = None
+            if not flushed:
+                # 書き込みスレッドが書けなかった変更: Modelの内容で全体を書き直す
+                self.save_conf(from_model=True)
+
+    def last_error(self):
+        # 書き込みスレッドで直近に起きた書き込みエラー(なければNone)
+        if self.persist_worker is None:
+            return None
+        return self.persist_worker.last_error
+
+
+# 月分割ストレージ(ShardedTaskStorage)用: 変更のたびに変更のあった月だけを書き出す
+class ShardPersistence(TaskModelListener):
+    def __init__(self, storage):
+        self.storage = storage
+
+    def save_conf(self):
+        try:
+            self.storage.save()
+        except Exception:
+            pass
+
+    def task_added(self, date_str, index, task):
+        self.save_conf()
+
+    def task_removed(self, date_str, index, task):
+        self.save_conf()
+
+    def task_updated(self, date_str, index, fields):
+        self.save_conf()
+
+    def work_hours_changed(self, date_str, hours):
+        self.save_conf()
+
+    def master_list_changed(self, task_master_list):
+        self.save_conf()
+
+    def recurring_rules_changed(self, rules):
+        self.save_conf()
+
+    def occurrence_changed(self, date_str, rule_id):
+        self.save_conf()
+
+    def batch_committed(self, changes):
+        self.save_conf()
+
+    def stats(self):
+        return {"shard_loads": self.storage.loads, "writes": self.storage.writes,
+                "loaded_months": self.storage.loaded_months()}
+
+    def close(self):
+        self.save_conf()
@@ -0,0 +1,168 @@
+import json
+from model.task_record import Task, to_state_code
+from controller.conf_journal import OP_DAY, OP_WORK_HOURS, OP_MASTER, OP_RULES, OP_OCCURRENCE, apply_record
+
+# 他のプロセスがinit.confを変更した場合に、変更のあった日だけをModelへ取り込む
+# ディスク上の内容を日付ごとのハッシュで覚えておき、
+#  - ディスク上で変わっていない日は(未書き込みの自分の変更があっても)触らない
+#  - ディスク上で変わった日でも、Modelと同じ内容(自分の書き込み)なら何もしない
+#  - 自分の変更がまだジャーナルに書き終わっていない日・項目は、ディスク上の古い内容で巻き戻さない
+# ジャーナルへの追記は増えた分だけを読み、スナップショットが置き換えられた場合だけ全体を読む
+EMPTY_DAY = hash(())
+
+
+def day_hash(tasks):
+    # Taskのリスト
+    return hash(tuple((t.text, t.state_code, t.attr_ratio) for t in tasks))
+
+
+def day_hash_from_dicts(tasks):
+    # init.conf / ジャーナルのdictのリスト
+    return hash(tuple((t["text"], to_state_code(t.get("state", "Planned")), t.get("attr_ratio"))
+                      for t in tasks or ()))
+
+
+def master_hash(task_master_list):
+    return hash(tuple((t["text"], t["attr"]) for t in task_master_list or ()))
+
+
+def recurrence_hash(data):
+    # {"recurring_rules": [...], "recurring_overrides": {...}}
+    return hash(json.dumps([data.get("recurring_rules") or [], data.get("recurring_overrides") or {}],
+                           sort_keys=True))
+
+
+def model_recurrence(model):
+    return {"recurring_rules": model.recurrence.rules_data(),
+            "recurring_overrides": model.recurrence.overrides_data()}
+
+
+class ConfSync:
+    # archive: conf_archive.ColdArchive(アーカイブへ移されてディスクから消えた日は削除とみなさない)
+    # pending_keys: 未書き込みのレコードのキーの集合を返す関数(ConfPersistence.pending_keys)
+    def __init__(self, model, journal, archive=None, pending_keys=None):
+        self.model = model
+        self.journal = journal
+        self.archive = archive
+        self.pending_keys = pending_keys
+        self._day_hashes = {}  # {date_str: ハッシュ} ディスク上の内容
+        self._work_hours = {}  # {date_str: hours} ディスク上の内容
+        self._master_hash = None
+        self._recurrence = {}  # ディスク上の繰り返しタスク(ルールと上書きは小さいので内容を持つ)
+        self._offset = 0
+        self._signature = None
+        # 統計
+        self.full_reloads = 0
+        self.records_read = 0
+        self.days_merged = 0
+
+    def prime(self):
+        # 読み込み直後に呼ぶ: Modelの内容をディスク上の内容とみなし、
+        # 読み込んだ時点のジャーナルの位置から続きを読む
+        # (読み込み中の編集は自分で書き込むので、次のpollでModelと同じ内容として読み飛ばされる)
+        self._day_hashes = {d: day_hash(tasks) for d, tasks in self.model.storage.iter_days() if tasks}
+        self._work_hours = dict(self.model.work_hours)
+        self._master_hash = master_hash(self.model.get_master_list())
+        self._recurrence = model_recurrence(self.model)
+        self._offset, self._signature = self.journal.last_load
+
+    def poll(self):
+        # ディスクの変更を取り込み、Modelを更新した日付のリストを返す
+        # 未書き込みのキーはディスクを読む前に取る(読んだ後に書き終えた変更は読んだ内容に含まれないため)
+        pending = self.pending_keys() if self.pending_keys is not None else set()
+        if self.journal.snapshot_signature() != self._signature:
+            return self._full_reload(pending)
+        result = self.journal.read_records_from(self._offset)
+        if result is None:
+            # ジャーナルが消えた・縮んだ(コンパクションされた)
+            return self._full_reload(pending)
+        records, self._offset = result
+        return self._apply_records(records, pending)
+
+    def _apply_records(self, records, pending=()):
+        self.records_read += len(records)
+        days = {}
+        hours = {}
+        master = None
+        recurrence = None
+        for record in records:
+            op = record.get("op")
+            if op == OP_DAY:
+                days[record["date"]] = record.get("tasks") or []
+            elif op == OP_WORK_HOURS:
+                hours[record["date"]] = record.get("hours")
+            elif op == OP_MASTER:
+                master = record.get("list", [])
+            elif op in (OP_RULES, OP_OCCURRENCE):
+                if recurrence is None:
+                    recurrence = json.loads(json.dumps(self._recurrence))
+                apply_record(recurrence, record)
+        return self._merge(days, hours, master, recurrence, pending)
+
+    def _full_reload(self, pending=()):
+        self.full_reloads += 1
+        data, self._offset, self._signature = self.journal.load_with_offset()
+        calendar_tasks = data.get("calendar_tasks", {})
+        work_hours = data.get("work_hours", {})
+        # 消えた日付も変更として扱う(アーカイブへ移された日を除く)
+        days = {d: calendar_tasks.get(d, []) for d in set(calendar_tasks) | set(self._day_hashes)}
+        hours = {d: work_hours.get(d) for d in set(work_hours) | set(self._work_hours)}
+        if self.archive is not None:
+            archived = {d for d in (set(days) - set(calendar_tasks)) | (set(hours) - set(work_hours))
+                        if self.archive.contains(d)}
+            for date_str in archived:
+                days.pop(date_str, None)
+                hours.pop(date_str, None)
+                self._day_hashes.pop(date_str, None)
+                self._work_hours.pop(date_str, None)
+        recurrence = {"recurring_rules": data.get("recurring_rules", []),
+                      "recurring_overrides": data.get("recurring_overrides", {})}
+        return self._merge(days, hours, data.get("task_master_list"), recurrence, pending)
+
+    def _merge(self, days, hours, master, recurrence=None, pending=()):
+        # ディスク上の内容は覚えておくが、pendingのキーはModelを置き換えない
+        # (書き込みが済めば、次のpollでModelと同じ内容として読み飛ばされる)
+        changed_days = {}
+        for date_str, tasks in days.items():
+            new_hash = day_hash_from_dicts(tasks)
+            if new_hash == self._day_hashes.get(date_str, EMPTY_DAY):
+                continue
+            if new_hash == EMPTY_DAY:
+                self._day_hashes.pop(date_str, None)
+            else:
+                self._day_hashes[date_str] = new_hash
+            if (OP_DAY, date_str) in pending:
+                continue
+            if new_hash != day_hash(self.model.storage.get_day(date_str)):
+                changed_days[date_str] = [Task.from_dict(t) for t in tasks]
+        changed_hours = {}
+        for date_str, h in hours.items():
+            if h == self._work_hours.get(date_str):
+                continue
+            if h is None:
+                self._work_hours.pop(date_str, None)
+            else:
+                self._work_hours[date_str] = h
+            if (OP_WORK_HOURS, date_str) in pending:
+                continue
+            if h != self.model.get_work_hours(date_str):
+                changed_hours[date_str] = h
+        if changed_days or changed_hours:
+            self.model.replace_days(changed_days, changed_hours)
+            self.days_merged += len(set(changed_days) | set(changed_hours))
+        if master is not None:
+            new_hash = master_hash(master)
+            if new_hash != self._master_hash:
+                self._master_hash = new_hash
+                if (OP_MASTER,) not in pending and new_hash != master_hash(self.model.get_master_list()):
+                    self.model.replace_master_list(master)
+        if recurrence is not None and recurrence_hash(recurrence) != recurrence_hash(self._recurrence):
+            self._recurrence = recurrence
+            same = recurrence_hash(recurrence) == recurrence_hash(model_recurrence(self.model))
+            if not same and not any(key[0] in (OP_RULES, OP_OCCURRENCE) for key in pending):
+                self.model.replace_recurrence(recurrence["recurring_rules"], recurrence["recurring_overrides"])
+        return sorted(set(changed_days) | set(changed_hours))
+
+    def stats(self):
+        return {"full_reloads": self.full_reloads, "records_read": self.records_read,
+                "days_merged": self.days_merged}
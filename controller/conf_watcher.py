@@ -0,0 +1,51 @@
+import os
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+# 他のプロセスによるinit.conf・ジャーナルの変更を監視し、まとめてConfSyncで取り込む
+# 連続した書き込みは待ち時間の間にまとめて1回だけ読む
+WATCH_DEBOUNCE_MS = 200
+
+
+class ConfWatcher(QObject):
+    # 取り込んだ日付のリスト
+    synced = pyqtSignal(object)
+
+    def __init__(self, sync, debounce_ms=WATCH_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.sync = sync
+        self.journal = sync.journal
+        self.watcher = QFileSystemWatcher(self)
+        # ファイルは置き換え・削除で監視が外れるので、ディレクトリも監視して作り直されたら再登録する
+        self.watcher.addPath(os.path.dirname(os.path.abspath(self.journal.conf_path)))
+        self._watch_files()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.poll)
+        self.watcher.fileChanged.connect(self._on_changed)
+        self.watcher.directoryChanged.connect(self._on_changed)
+
+    def _watch_files(self):
+        watched = set(self.watcher.files())
+        for path in (self.journal.conf_path, self.journal.journal_path):
+            if path not in watched and os.path.exists(path):
+                self.watcher.addPath(path)
+
+    def _on_changed(self, path):
+        self._watch_files()
+        self.timer.start()
+
+    def poll(self):
+        try:
+            changed = self.sync.poll()
+        except Exception:
+            # 書き込み途中などで読めなければ次の変更時に再度読む
+            return
+        if changed:
+            self.synced.emit(changed)
+
+    def stop(self):
+        self.timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
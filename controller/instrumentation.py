@@ -0,0 +1,174 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+# 処理時間の計測(オプトイン)
+# 有効にしたときだけ、対象のメソッドをインスタンス単位で計測用の関数に差し替える
+# (無効なら何も差し替えないので、通常の実行には影響しない)
+# 例) python main.py --trace trace.json  → 終了時にヒストグラムとChromeトレースを書き出す
+#     chrome://tracing や https://ui.perfetto.dev で trace.json を開ける
+
+# 環境変数で有効にする場合(値は書き出し先のパス)
+TRACE_ENV = "SCHEDULE_TRACE"
+# 保持するトレースイベントの上限(古いものから捨てる)
+MAX_TRACE_EVENTS = 100000
+# ヒストグラムの分解能: 2倍ごとの区間をいくつに分けるか
+BUCKETS_PER_OCTAVE = 8
+
+
+class LatencyHistogram:
+    # 対数スケールのバケットで件数だけを数える(メモリは一定、誤差は約9%)
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        us = max(seconds * 1e6, 1e-3)
+        b = math.floor(math.log2(us) * BUCKETS_PER_OCTAVE)
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        # ミリ秒(バケットの上限値)
+        if not self.count:
+            return 0.0
+        target = p / 100 * self.count
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= target:
+                return min(2 ** ((b + 1) / BUCKETS_PER_OCTAVE) / 1000, self.max * 1000)
+        return self.max * 1000
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 4) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 4),
+            "p95_ms": round(self.percentile(95), 4),
+            "p99_ms": round(self.percentile(99), 4),
+            "max_ms": round(self.max * 1000, 4),
+        }
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.output_path = None
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.histograms = {}
+        self.events = deque(maxlen=MAX_TRACE_EVENTS)
+        # シグナルを受けてから再描画されるまでの計測用(ハンドラ名, 開始時刻)
+        self.pending_paint = None
+
+    def enable(self, output_path=None):
+        self.enabled = True
+        self.output_path = output_path
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.events.clear()
+            self.pending_paint = None
+
+    def record(self, name, start, end, category="app"):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = LatencyHistogram()
+            hist.add(end - start)
+            self.events.append((name, category, start, end, threading.get_ident()))
+
+    def wrap(self, fn, name, category="app", on_start=None):
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            if on_start is not None:
+                on_start(name, start)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter(), category)
+        return timed
+
+    def summary(self):
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def chrome_trace_events(self):
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        return [{"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                 "ts": round((start - self._origin) * 1e6, 3), "dur": round((end - start) * 1e6, 3)}
+                for name, category, start, end, tid in events]
+
+    def dump(self, path=None):
+        # ヒストグラムとChromeトレース(traceEvents)を1つのJSONに書き出す
+        path = path or self.output_path
+        if not path:
+            return None
+        data = {"histograms": self.summary(), "traceEvents": self.chrome_trace_events(),
+                "displayTimeUnit": "ms"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return path
+
+
+TRACER = Tracer()
+
+
+def enable(output_path=None):
+    TRACER.enable(output_path)
+
+
+def instrument(obj, names, prefix, category="app", on_start=None, tracer=TRACER):
+    # objのメソッドをインスタンス属性として計測付きのものに置き換える
+    # (シグナルに接続する前に呼ぶこと)
+    if not tracer.enabled:
+        return
+    for name in names:
+        fn = getattr(obj, name, None)
+        if fn is not None:
+            setattr(obj, name, tracer.wrap(fn, prefix + name, category, on_start))
+
+
+def instrument_model(model, tracer=TRACER):
+    # 通知のファンアウト(全リスナーの処理時間)をイベントの種類ごとに計測
+    if not tracer.enabled:
+        return
+    emit = model._emit
+
+    def timed_emit(event, *args):
+        start = time.perf_counter()
+        try:
+            emit(event, *args)
+        finally:
+            tracer.record("model.notify." + event, start, time.perf_counter(), "model")
+    model._emit = timed_emit
+
+
+def instrument_persistence(persistence, tracer=TRACER):
+    if persistence is None or not tracer.enabled:
+        return
+    instrument(persistence, ["load_conf", "save_conf"], "persistence.", "io", tracer=tracer)
+    journal = getattr(persistence, "journal", None)
+    if journal is not None:
+        # ジャーナルは書き込みスレッド・読み込みスレッドからも呼ばれる
+        instrument(journal, ["load", "append_many", "compact"], "journal.", "io", tracer=tracer)
+
+
+def mark_pending_paint(name, start, tracer=TRACER):
+    # ハンドラの開始時刻を覚えておき、次の再描画で経過時間を記録する
+    # (再描画までに複数のハンドラが動いた場合は最初のものから測る)
+    if tracer.pending_paint is None:
+        tracer.pending_paint = (name, start)
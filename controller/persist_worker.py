@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import deque
+
+# 連続した変更をまとめる待ち時間(秒)
+DEFAULT_DEBOUNCE_SEC = 0.5
+# 統計用に保持するレイテンシの件数
+LATENCY_HISTORY = 1000
+# 書き込みに失敗した場合に再試行するまでの待ち時間(秒)
+RETRY_DELAY_SEC = 1.0
+
+
+# 書き込み専用スレッド: GUIスレッドからはsubmitでレコードを渡すだけで、
+# ファイルI/Oはすべてこのスレッドで行う(ジャーナルへの書き込みはここだけ)
+# 書き込みに失敗したレコードはキューに戻し、少し待ってから再試行する
+class PersistWorker:
+    def __init__(self, journal, debounce=DEFAULT_DEBOUNCE_SEC, retry_delay=RETRY_DELAY_SEC):
+        self.journal = journal
+        self.debounce = debounce
+        self.retry_delay = retry_delay
+        self._cond = threading.Condition()
+        self._pending = {}  # {key: record} 同じキーは最新のレコードだけ残す
+        self._inflight = ()  # 書き込み中のレコードのキー
+        self._callbacks = []  # 書き終えたら呼ぶ関数(notify_written)
+        self._compact_requested = False
+        self._flush_requested = False
+        self._stopping = False
+        self._busy = False
+        # 直近の書き込みが失敗したか(成功すれば戻る)
+        self._failing = False
+        self._thread = threading.Thread(target=self._run, name="PersistWorker", daemon=True)
+        # 統計
+        self.records_submitted = 0
+        self.records_written = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.compactions = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_write_thread = None
+        self._write_latencies = deque(maxlen=LATENCY_HISTORY)
+        self._submit_latencies = deque(maxlen=LATENCY_HISTORY)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, key, record):
+        # GUIスレッドから呼ばれる: ロックを取ってdictに入れるだけ
+        start = time.perf_counter()
+        with self._cond:
+            if key in self._pending:
+                # 末尾に付け直して順序を保つ
+                del self._pending[key]
+                self.coalesced += 1
+            self._pending[key] = record
+            self.records_submitted += 1
+            self._cond.notify_all()
+        self._submit_latencies.append(time.perf_counter() - start)
+
+    def notify_written(self, callback):
+        # それまでにsubmitしたレコードを書き終えたら、このスレッドからcallback()を呼ぶ
+        # 失敗した場合は再試行して書けた後に呼ぶ(書けないまま停止すれば呼ばない)
+        with self._cond:
+            if self._pending or self._inflight:
+                self._callbacks.append(callback)
+                self._cond.notify_all()
+                return
+        callback()
+
+    def request_compaction(self):
+        with self._cond:
+            self._compact_requested = True
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        # 溜まっている書き込みが終わるまで待つ(終了時など)
+        # 書き込めずに残っている場合はFalse(レコードはpending_records()で取り出せる)
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            self._cond.wait_for(
+                lambda: (not self._pending and not self._compact_requested or self._failing) and not self._busy,
+                timeout)
+            self._flush_requested = False
+            return not self._pending and not self._compact_requested and not self._busy
+
+    def pending_records(self):
+        # まだ書き込めていないレコード(停止後に別の方法で保存する場合)
+        with self._cond:
+            return list(self._pending.values())
+
+    def pending_keys(self):
+        # まだディスクに書き終えていないレコードのキー(書き込み中を含む)
+        with self._cond:
+            return set(self._pending) | set(self._inflight)
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _has_work(self):
+        return bool(self._pending) or self._compact_requested or bool(self._callbacks)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._has_work() or self._stopping)
+                if not self._has_work() or (self._stopping and self._failing):
+                    # 停止要求かつ書き込むものがない(書き込めないまま停止する場合は残りを呼び出し元に任せる)
+                    break
+                # デバウンス: 一定時間内の連続した変更を1回の書き込みにまとめる
+                # 失敗した後は再試行まで待つ
+                if self._failing:
+                    self._cond.wait_for(lambda: self._stopping, self.retry_delay)
+                else:
+                    self._cond.wait_for(lambda: self._stopping or self._flush_requested, self.debounce)
+                items = list(self._pending.items())
+                self._pending.clear()
+                self._inflight = [key for key, record in items]
+                callbacks, self._callbacks = self._callbacks, []
+                compact = self._compact_requested
+                self._compact_requested = False
+                self._busy = True
+            ok = False
+            try:
+                ok = self._write(items, compact)
+                if ok:
+                    # flush()が呼び出し側の処理まで待てるよう、busyのうちに呼ぶ
+                    self._run_callbacks(callbacks)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._inflight = ()
+                    self._failing = not ok
+                    if not ok:
+                        self._callbacks[:0] = callbacks
+                    self._cond.notify_all()
+
+    def _run_callbacks(self, callbacks):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+
+    def _write(self, items, compact):
+        start = time.perf_counter()
+        records = [record for key, record in items]
+        written = False
+        try:
+            if records:
+                self.journal.append_many(records)
+                written = True
+                self.records_written += len(records)
+                self.writes += 1
+            if compact or self.journal.needs_compaction():
+                self.journal.compact()
+                self.compactions += 1
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            with self._cond:
+                # 書けなかったレコードを戻す(その間に同じキーで新しいレコードが来ていればそちらを残す)
+                if not written:
+                    newer = self._pending
+                    self._pending = {key: record for key, record in items if key not in newer}
+                    self._pending.update(newer)
+                self._compact_requested = self._compact_requested or compact
+            return False
+        finally:
+            self.last_write_thread = threading.current_thread().name
+            self._write_latencies.append(time.perf_counter() - start)
+        return True
+
+    def stats(self):
+        write_lat = list(self._write_latencies)
+        submit_lat = list(self._submit_latencies)
+        return {
+            "records_submitted": self.records_submitted,
+            "records_written": self.records_written,
+            "coalesced": self.coalesced,
+            "writes": self.writes,
+            "compactions": self.compactions,
+            "errors": self.errors,
+            "last_error": repr(self.last_error) if self.last_error is not None else None,
+            "pending": len(self._pending),
+            "write_latency_avg": sum(write_lat) / len(write_lat) if write_lat else 0.0,
+            "write_latency_max": max(write_lat, default=0.0),
+            "submit_latency_max": max(submit_lat, default=0.0),
+            "last_write_thread": self.last_write_thread,
+        }
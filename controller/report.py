@@ -0,0 +1,270 @@
+import os
+import csv
+import json
+import html
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from model.task_record import TaskState
+from model.date_keys import week_start, month_key
+
+# 期間のレポート(週ごとの勤務時間・タスクごとの時間・状態の内訳)
+# Modelのスナップショットを月ごとに分け、別プロセスで集計してから結合する(GUIを止めない)
+# このモジュールはPyQtをimportしない(cli.pyのレポートはPyQtなしで動く)
+# ただしspawnのワーカープロセスは起動元の__main__も読み込み直すので、GUI(main.py)から起動した場合は
+# ワーカーでもPyQt5がimportされる(main()は__name__ == "__main__"のときだけ動くのでウィンドウは開かない)
+
+REPORT_FORMATS = ("csv", "html", "columnar")
+# ワーカープロセスの数の上限
+MAX_WORKERS = 4
+# 1つのタスクの時間 = その日の勤務時間 × attr_ratio / 100 (attr_ratioのないタスクは0)
+
+
+def snapshot_months(model, start, end):
+    # start～end(両端含む)をModelから取り出し、月ごとのpickleできる形にする
+    # {"yyyy-MM": {"tasks": {date_str: [(text, state_code, attr_ratio), ...]}, "hours": {date_str: h}}}
+    months = {}
+    for date_str, tasks in model.iter_days(start, end):
+        month = months.setdefault(month_key(date_str), {"tasks": {}, "hours": {}})
+        month["tasks"][date_str] = [(t.text, int(t.state_code), t.attr_ratio) for t in tasks]
+    for date_str, hours in model.get_work_hours_range(start, end).items():
+        if hours is not None:
+            months.setdefault(month_key(date_str), {"tasks": {}, "hours": {}})["hours"][date_str] = hours
+    return months
+
+
+def compute_month(month, payload):
+    # ワーカープロセスで実行: 1か月分の集計
+    weeks = {}  # {週の月曜日: 勤務時間}
+    task_hours = {}  # {text: 時間}
+    task_states = {}  # {text: [Planned, Working, Closed]}
+    states = [0] * len(TaskState)
+    hours_total = 0.0
+    days = set(payload["tasks"]) | set(payload["hours"])
+    for date_str in sorted(days):
+        hours = payload["hours"].get(date_str) or 0.0
+        hours_total += hours
+        week = week_start(date_str)
+        weeks[week] = weeks.get(week, 0.0) + hours
+        for text, state, ratio in payload["tasks"].get(date_str, ()):
+            states[state] += 1
+            counts = task_states.setdefault(text, [0] * len(TaskState))
+            counts[state] += 1
+            if ratio is not None:
+                task_hours[text] = task_hours.get(text, 0.0) + hours * ratio / 100
+            else:
+                task_hours.setdefault(text, 0.0)
+    return {"month": month, "hours": hours_total, "weeks": weeks, "states": states,
+            "task_hours": task_hours, "task_states": task_states, "days": len(days)}
+
+
+def merge_reports(start, end, month_reports):
+    # 月ごとの結果を結合(月をまたぐ週は足し合わせる)
+    report = {"start": start, "end": end, "hours": 0.0, "months": [], "weeks": {},
+              "states": [0] * len(TaskState), "tasks": {}}
+    for r in sorted(month_reports, key=lambda r: r["month"]):
+        report["hours"] += r["hours"]
+        report["months"].append({"month": r["month"], "hours": r["hours"], "days": r["days"],
+                                 "states": r["states"]})
+        for week, hours in r["weeks"].items():
+            report["weeks"][week] = report["weeks"].get(week, 0.0) + hours
+        for i, n in enumerate(r["states"]):
+            report["states"][i] += n
+        for text, hours in r["task_hours"].items():
+            entry = report["tasks"].setdefault(text, {"hours": 0.0, "states": [0] * len(TaskState)})
+            entry["hours"] += hours
+            for i, n in enumerate(r["task_states"][text]):
+                entry["states"][i] += n
+    report["weeks"] = dict(sorted(report["weeks"].items()))
+    report["tasks"] = dict(sorted(report["tasks"].items(), key=lambda item: (-item[1]["hours"], item[0])))
+    return report
+
+
+class ReportCanceled(Exception):
+    pass
+
+
+# 月ごとの集計をプロセスプールで実行する
+# GUIからは start() → poll() を定期的に呼ぶ、CLIからは run() で完了まで待つ
+class ReportJob:
+    def __init__(self, model, start, end, max_workers=None):
+        self.start_date = start
+        self.end_date = end
+        # スナップショットはGUIスレッドで取る(以降Modelが変わっても影響しない)
+        self.months = snapshot_months(model, start, end)
+        self.total = len(self.months)
+        self.done = 0
+        self.canceled = False
+        self.error = None
+        self.report = None
+        self._results = []
+        self._futures = set()
+        self._executor = None
+        self.max_workers = max_workers or min(MAX_WORKERS, os.cpu_count() or 1)
+
+    def start(self):
+        if not self.months:
+            self.report = merge_reports(self.start_date, self.end_date, [])
+            return
+        # GUIのプロセス(Qtのスレッドを持つ)をforkしないようspawnで起動する
+        # 起動元のスクリプトは if __name__ == "__main__": で守っておくこと(ワーカーが読み込み直す)
+        self._executor = ProcessPoolExecutor(
+            max_workers=min(self.max_workers, self.total), mp_context=multiprocessing.get_context("spawn"))
+        self._futures = {self._executor.submit(compute_month, m, payload) for m, payload in self.months.items()}
+        self.months = None
+
+    def is_finished(self):
+        return self.report is not None or self.canceled or self.error is not None
+
+    def poll(self, timeout=0):
+        # 終わった月を回収し、すべて終われば結合する。戻り値: 完了したか
+        if self.is_finished():
+            return True
+        finished, self._futures = wait(self._futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in finished:
+            try:
+                self._results.append(future.result())
+            except Exception as e:
+                self.error = e
+                self._shutdown()
+                return True
+        self.done = len(self._results)
+        if not self._futures:
+            self._shutdown()
+            self.report = merge_reports(self.start_date, self.end_date, self._results)
+            return True
+        return False
+
+    def cancel(self):
+        # まだ始まっていない月は実行しない(実行中の月は終わるのを待たずに結果を捨てる)
+        if self.is_finished():
+            return
+        self.canceled = True
+        self._shutdown()
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._futures = set()
+
+    def run(self, on_progress=None):
+        self.start()
+        while not self.poll(timeout=0.1):
+            if on_progress is not None:
+                on_progress(self.done, self.total)
+        if self.error is not None:
+            raise self.error
+        if self.canceled:
+            raise ReportCanceled()
+        if on_progress is not None:
+            on_progress(self.done, self.total)
+        return self.report
+
+
+# 書き出し
+def write_report(path, report, fmt=None):
+    fmt = fmt or detect_report_format(path)
+    if fmt == "html":
+        write_html_report(path, report)
+    elif fmt == "columnar":
+        write_columnar_report(path, report)
+    else:
+        write_csv_report(path, report)
+    return fmt
+
+
+def parquet_available():
+    # pyarrowはParquetで書き出す場合だけ使う(ワーカープロセスでは読み込まない)
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def check_report_path(path, fmt=None):
+    # 書き出せない出力先なら集計を始める前にValueError
+    if (fmt or detect_report_format(path)) == "columnar" and path.lower().endswith(".parquet") \
+            and not parquet_available():
+        raise ValueError("writing .parquet needs pyarrow (pip install pyarrow); "
+                         "use a .columns.json file for the columnar JSON output")
+
+
+def detect_report_format(path):
+    lower = path.lower()
+    if lower.endswith((".html", ".htm")):
+        return "html"
+    if lower.endswith((".parquet", ".columns.json")):
+        return "columnar"
+    return "csv"
+
+
+def _state_names():
+    return [s.name for s in TaskState]
+
+
+def report_tables(report):
+    # 表ごとの (列名, 行) : CSV・HTML・列指向の書き出しで共通
+    states = _state_names()
+    return {
+        "weeks": (["week_start", "hours"],
+                  [[week, round(hours, 2)] for week, hours in report["weeks"].items()]),
+        "months": (["month", "days", "hours"] + states,
+                   [[m["month"], m["days"], round(m["hours"], 2)] + m["states"] for m in report["months"]]),
+        "tasks": (["text", "hours"] + states,
+                  [[text, round(t["hours"], 2)] + t["states"] for text, t in report["tasks"].items()]),
+    }
+
+
+def write_csv_report(path, report):
+    # 1つのCSVに表を順に書く(表の間は空行、先頭列に表の名前)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["report", report["start"], report["end"], "hours", round(report["hours"], 2)]
+                        + [f"{name}={n}" for name, n in zip(_state_names(), report["states"])])
+        for name, (columns, rows) in report_tables(report).items():
+            writer.writerow([])
+            writer.writerow([name] + columns)
+            for row in rows:
+                writer.writerow([name] + row)
+
+
+def write_html_report(path, report):
+    esc = html.escape
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">",
+        f"<title>Report {esc(report['start'])} - {esc(report['end'])}</title>",
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse;margin-bottom:1.5em}"
+        "td,th{border:1px solid #bbb;padding:2px 8px}td.n{text-align:right}</style></head><body>",
+        f"<h1>{esc(report['start'])} - {esc(report['end'])}</h1>",
+        f"<p>Total hours: {report['hours']:.2f} / "
+        + ", ".join(f"{name}: {n}" for name, n in zip(_state_names(), report["states"])) + "</p>",
+    ]
+    for name, (columns, rows) in report_tables(report).items():
+        parts.append(f"<h2>{esc(name)}</h2><table><tr>"
+                     + "".join(f"<th>{esc(c)}</th>" for c in columns) + "</tr>")
+        for row in rows:
+            cells = "".join(f"<td class=\"n\">{v}</td>" if isinstance(v, (int, float))
+                            else f"<td>{esc(str(v))}</td>" for v in row)
+            parts.append(f"<tr>{cells}</tr>")
+        parts.append("</table>")
+    parts.append("</body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def write_columnar_report(path, report):
+    # 列ごとの配列で書き出す(pandasなどでそのまま読める)
+    # 拡張子が.parquetならParquet(表ごとに別ファイル: name.weeks.parquet など。pyarrowが必要)
+    tables = report_tables(report)
+    if path.lower().endswith(".parquet"):
+        check_report_path(path, "columnar")
+        import pyarrow
+        import pyarrow.parquet
+        base = path[:-len(".parquet")]
+        for name, (columns, rows) in tables.items():
+            table = pyarrow.table({c: [row[i] for row in rows] for i, c in enumerate(columns)})
+            pyarrow.parquet.write_table(table, f"{base}.{name}.parquet")
+        return
+    data = {"start": report["start"], "end": report["end"], "tables": {}}
+    for name, (columns, rows) in tables.items():
+        data["tables"][name] = {c: [row[i] for row in rows] for i, c in enumerate(columns)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,58 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from controller.report import ReportJob, check_report_path, write_report
+
+# ReportJobをGUIから使う: タイマーで完了した月を回収し、進捗をシグナルで通知する
+POLL_INTERVAL_MS = 50
+
+
+class ReportRunner(QObject):
+    progress = pyqtSignal(int, int)  # (完了した月, 全月数)
+    finished = pyqtSignal(str)  # 書き出したパス
+    failed = pyqtSignal(str)
+    canceled = pyqtSignal()
+
+    def __init__(self, model, start, end, path, fmt=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.fmt = fmt
+        self.job = ReportJob(model, start, end)
+        self.timer = QTimer(self)
+        self.timer.setInterval(POLL_INTERVAL_MS)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        try:
+            # 書き出せない出力先(pyarrowのない.parquetなど)は集計する前に失敗にする
+            check_report_path(self.path, self.fmt)
+            self.job.start()
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.progress.emit(0, self.job.total)
+        self.timer.start()
+        self.poll()
+
+    def poll(self):
+        if not self.job.poll():
+            self.progress.emit(self.job.done, self.job.total)
+            return
+        self.timer.stop()
+        if self.job.canceled:
+            self.canceled.emit()
+        elif self.job.error is not None:
+            self.failed.emit(str(self.job.error))
+        else:
+            self.progress.emit(self.job.total, self.job.total)
+            try:
+                write_report(self.path, self.job.report, self.fmt)
+            except Exception as e:
+                self.failed.emit(str(e))
+                return
+            self.finished.emit(self.path)
+
+    def cancel(self):
+        self.job.cancel()
+        self.poll()
+
+    def is_running(self):
+        return self.timer.isActive()
@@ -0,0 +1,24 @@
+from concurrent.futures import Future
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# RPCサーバーのスレッドから、Modelの操作をGUIスレッドで実行する
+# (Modelと画面はGUIスレッドだけが触る。シグナルはスレッドをまたぐとキュー経由で届く)
+class GuiThreadExecutor(QObject):
+    _invoke = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._invoke.connect(self._run)
+
+    def submit(self, fn):
+        future = Future()
+        self._invoke.emit(fn, future)
+        return future
+
+    def _run(self, fn, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
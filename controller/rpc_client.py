@@ -0,0 +1,104 @@
+import json
+import socket
+from controller.rpc_server import DEFAULT_HOST, DEFAULT_PORT
+
+# rpc_server.py に接続する同期クライアント(スクリプト・ベンチマーク用)
+# 例) with RpcClient() as client:
+#         client.call("add_task", date="2025-06-16", text="Review", attr_ratio=50)
+#         client.pipeline([("set_work_hours", {"date": d, "hours": 8.0}) for d in dates])
+# 応答を待ち合わせておく件数の既定値
+DEFAULT_WINDOW = 128
+
+
+class RpcClientError(Exception):
+    def __init__(self, error):
+        super().__init__(error.get("message"))
+        self.code = error.get("code")
+
+
+class RpcClient:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, timeout=30.0):
+        if path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self.sock.makefile("rb")
+        self._next_id = 0
+
+    def _encode(self, method, params, with_id=True):
+        request = {"jsonrpc": "2.0", "method": method, "params": params}
+        if with_id:
+            self._next_id += 1
+            request["id"] = self._next_id
+        return request
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by the server")
+        return json.loads(line)
+
+    @staticmethod
+    def _result(reply, raise_errors):
+        if "error" in reply:
+            error = RpcClientError(reply["error"])
+            if raise_errors:
+                raise error
+            return error
+        return reply.get("result")
+
+    def call(self, method, *args, **kwargs):
+        return self.pipeline([(method, kwargs or list(args))])[0]
+
+    def notify(self, method, **params):
+        # 応答のいらない呼び出し
+        self.sock.sendall(json.dumps(self._encode(method, params, with_id=False)).encode("utf-8") + b"\n")
+
+    def pipeline(self, calls, window=DEFAULT_WINDOW, raise_errors=True):
+        # calls: [(method, params), ...] 応答を待たずに続けて送り、結果を順に返す
+        # window件ずつ送り、1つ前のまとまりの応答を読んでから次を送る(送りすぎてバッファが詰まらないように)
+        # raise_errors=Falseならエラーは例外を投げずにRpcClientErrorを結果の位置に入れる
+        requests = [json.dumps(self._encode(m, p), ensure_ascii=False).encode("utf-8") + b"\n" for m, p in calls]
+        replies = []
+        pending = 0
+        for start in range(0, len(requests), window):
+            chunk = requests[start:start + window]
+            self.sock.sendall(b"".join(chunk))
+            pending += len(chunk)
+            while pending > window:
+                replies.append(self._read_reply())
+                pending -= 1
+        while pending:
+            replies.append(self._read_reply())
+            pending -= 1
+        results = [self._result(r, False) for r in replies]
+        if raise_errors:
+            for r in results:
+                if isinstance(r, RpcClientError):
+                    raise r
+        return results
+
+    def batch(self, calls, raise_errors=True):
+        # JSON-RPCのバッチ(1行の配列)で送る
+        requests = [self._encode(m, p) for m, p in calls]
+        self.sock.sendall(json.dumps(requests, ensure_ascii=False).encode("utf-8") + b"\n")
+        replies = self._read_reply()
+        if not isinstance(replies, list):
+            raise RpcClientError(replies.get("error", {}))
+        by_id = {r.get("id"): r for r in replies}
+        return [self._result(by_id[r["id"]], raise_errors) for r in requests]
+
+    def close(self):
+        try:
+            self._reader.close()
+        finally:
+            self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,343 @@
+import json
+import asyncio
+import inspect
+import threading
+from model.task_model import TASK_STATES
+from model.task_recurrence import RecurringTask
+from model.date_keys import to_ordinal
+
+# ローカルのスクリプト(勤務表の自動入力・終業時のスクリプトなど)からTaskModelを操作するJSON-RPC 2.0サーバー
+# 1行に1つのJSON(リクエスト、またはリクエストの配列)を送り、応答も1行ずつリクエストの順に返す
+# 応答を待たずに続けて送ってよい(パイプライン)。届いている行はまとめて1回のmodel.batch()で実行するので、
+# 画面の更新と保存は1回で済む
+# 例) {"jsonrpc": "2.0", "id": 1, "method": "add_task", "params": {"date": "2025-06-16", "text": "Review"}}
+# PyQtはimportしない(GUIのスレッドで実行する場合は rpc_bridge.GuiThreadExecutor を渡す)
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 1回のmodel.batch()で実行する行数の上限
+MAX_BATCH_LINES = 256
+# 未処理の行数の上限(超えたら読み込みを待たせる)
+MAX_PENDING_LINES = 4096
+MAX_LINE_BYTES = 1024 * 1024
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# キューの中の目印: JSONとして読めなかった行 / 接続が閉じられた
+_UNPARSABLE = object()
+_CLOSED = object()
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+# パラメータの検証(Modelは不正な日付・インデックスを黙って無視するので、ここでエラーにする)
+def _date(value):
+    try:
+        to_ordinal(value)
+    except (TypeError, ValueError):
+        raise RpcError(INVALID_PARAMS, f"invalid date: {value!r}") from None
+    return value
+
+
+def _index(model, date_str, index):
+    if type(index) is not int or not 0 <= index < len(model.get_tasks(date_str)):
+        raise RpcError(INVALID_PARAMS, f"no task {index!r} on {date_str}")
+    return index
+
+
+def _number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RpcError(INVALID_PARAMS, f"{name} must be a number: {value!r}")
+    return float(value)
+
+
+def _task_json(task):
+    d = task.to_dict()
+    if isinstance(task, RecurringTask):
+        d["rule_id"] = task.rule_id
+    return d
+
+
+# メソッド: rpc_<名前>(model, パラメータ...)
+def rpc_ping(model):
+    return "pong"
+
+
+def rpc_get_tasks(model, date):
+    return [_task_json(t) for t in model.get_tasks(_date(date))]
+
+
+def rpc_get_tasks_range(model, start, end):
+    return {d: [_task_json(t) for t in tasks] for d, tasks in model.iter_days(_date(start), _date(end))}
+
+
+def rpc_get_work_hours(model, date):
+    return model.get_work_hours(_date(date))
+
+
+def rpc_get_work_hours_range(model, start, end):
+    return model.get_work_hours_range(_date(start), _date(end))
+
+
+def rpc_get_master_list(model):
+    return [dict(t) for t in model.get_master_list()]
+
+
+def rpc_add_task(model, date, text, attr_ratio=None):
+    # 戻り値: 追加したタスクのインデックス(Strategyで追加されなかった場合はNone)
+    if not isinstance(text, str) or not text.strip():
+        raise RpcError(INVALID_PARAMS, "text must be a non-empty string")
+    if attr_ratio is not None:
+        _number(attr_ratio, "attr_ratio")
+    stored = len(model.storage.get_day(_date(date)))
+    model.add_task(date, text.strip(), attr_ratio)
+    return stored if len(model.storage.get_day(date)) > stored else None
+
+
+def rpc_remove_task(model, date, index):
+    model.remove_task(date, _index(model, _date(date), index))
+
+
+def rpc_set_task_state(model, date, index, state):
+    if state not in TASK_STATES:
+        raise RpcError(INVALID_PARAMS, f"state must be one of {TASK_STATES}")
+    model.set_task_state(date, _index(model, _date(date), index), state)
+
+
+def rpc_set_task_attr_ratio(model, date, index, attr_ratio):
+    model.set_task_attr_ratio(date, _index(model, _date(date), index), _number(attr_ratio, "attr_ratio"))
+
+
+def rpc_set_work_hours(model, date, hours):
+    model.set_work_hours(_date(date), _number(hours, "hours"))
+
+
+def rpc_remove_work_hours(model, date):
+    model.remove_work_hours(_date(date))
+
+
+METHODS = {name[len("rpc_"):]: fn for name, fn in dict(globals()).items() if name.startswith("rpc_")}
+
+
+def _error(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _execute(model, request):
+    # 1件のリクエストを実行して応答を返す(通知=idのないリクエストはNone)
+    if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+        return _error(request.get("id") if isinstance(request, dict) else None, INVALID_REQUEST, "invalid request")
+    request_id = request.get("id")
+    try:
+        handler = METHODS.get(request["method"])
+        if handler is None:
+            raise RpcError(METHOD_NOT_FOUND, f"method not found: {request['method']}")
+        params = request.get("params", [])
+        if isinstance(params, list):
+            args, kwargs = params, {}
+        elif isinstance(params, dict):
+            args, kwargs = [], params
+        else:
+            raise RpcError(INVALID_PARAMS, "params must be an array or an object")
+        try:
+            inspect.signature(handler).bind(model, *args, **kwargs)
+        except TypeError as e:
+            raise RpcError(INVALID_PARAMS, str(e)) from None
+        reply = {"jsonrpc": "2.0", "id": request_id, "result": handler(model, *args, **kwargs)}
+    except RpcError as e:
+        reply = _error(request_id, e.code, str(e))
+    except Exception as e:
+        reply = _error(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+    return reply if "id" in request else None
+
+
+def _failure_reply(message, text):
+    # 実行できなかった行への応答(通知には返さない)
+    if isinstance(message, dict):
+        return _error(message.get("id"), INTERNAL_ERROR, text) if "id" in message else None
+    return _error(None, INTERNAL_ERROR, text)
+
+
+def execute_messages(model, messages):
+    # Modelを持つスレッドで実行: 1行ごとの応答(返すものがなければNone)
+    # まとめて1回のbatch()で実行する(1件が失敗しても他の変更は取り消さない)
+    replies = []
+    with model.batch():
+        for message in messages:
+            if message is _UNPARSABLE:
+                replies.append(_error(None, PARSE_ERROR, "parse error"))
+            elif isinstance(message, list):
+                # JSON-RPCのバッチ(配列): 応答も配列で返す
+                if not message:
+                    replies.append(_error(None, INVALID_REQUEST, "empty batch"))
+                    continue
+                batch = [r for r in (_execute(model, m) for m in message) if r is not None]
+                replies.append(batch or None)
+            else:
+                replies.append(_execute(model, message))
+    return replies
+
+
+class RpcServer:
+    # path: Unixドメインソケットのパス(省略時は host:port のTCP。外部から接続できないよう既定はlocalhost)
+    # executor: submit(fn) → concurrent.futures.Future でModelを持つスレッドに実行を頼む
+    #           Noneならこのイベントループのスレッドで直接Modelを操作する(GUIなしの場合)
+    def __init__(self, model, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, executor=None):
+        self.model = model
+        self.host = host
+        self.port = port
+        self.path = path
+        self.executor = executor
+        self.address = None
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0  # 実行できなかったバッチの数
+        self._server = None
+        self._queue = None
+        self._dispatcher = None
+        self._writers = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue(MAX_PENDING_LINES)
+        if self.path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=MAX_LINE_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE_BYTES)
+        self.address = self._server.sockets[0].getsockname()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def serve_forever(self):
+        # start()の後に呼ぶ(取り消されるまで待ち受ける)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except (asyncio.CancelledError, Exception):
+                pass
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+
+    async def _handle(self, reader, writer):
+        # 読むだけ(実行と応答はディスパッチャーが行う)
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = _UNPARSABLE
+                await self._queue.put((writer, message))
+        except (ConnectionError, ValueError):
+            # 切断・長すぎる行
+            pass
+        # 先に届いたリクエストに応答してから閉じる
+        await self._queue.put((writer, _CLOSED))
+
+    async def _dispatch(self):
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < MAX_BATCH_LINES and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            messages = [message for writer, message in items if message is not _CLOSED]
+            try:
+                replies = await self._run(lambda: execute_messages(self.model, messages)) if messages else []
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                # 実行側で想定外の例外(GUIスレッドへの受け渡しの失敗など): 全件にエラーを返して待ち受けを続ける
+                replies = [_failure_reply(message, f"{type(e).__name__}: {e}") for message in messages]
+            replies = iter(replies)
+            self.batches += 1
+            self.requests += len(messages)
+            output = {}  # {writer: [bytes, ...]} 接続ごとにまとめて書く
+            closed = []
+            for writer, message in items:
+                if message is _CLOSED:
+                    closed.append(writer)
+                    continue
+                reply = next(replies)
+                if reply is not None:
+                    output.setdefault(writer, []).append(
+                        json.dumps(reply, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+            for writer, chunks in output.items():
+                if writer.is_closing():
+                    continue
+                writer.write(b"".join(chunks))
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+            for writer in closed:
+                self._writers.discard(writer)
+                writer.close()
+
+    async def _run(self, fn):
+        if self.executor is None:
+            return fn()
+        return await asyncio.wrap_future(self.executor.submit(fn))
+
+    def stats(self):
+        return {"requests": self.requests, "batches": self.batches, "errors": self.errors,
+                "connections": len(self._writers)}
+
+
+# GUIと並行して、専用スレッドのイベントループでサーバーを動かす
+class RpcServerThread(threading.Thread):
+    def __init__(self, model, executor=None, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        super().__init__(name="rpc-server", daemon=True)
+        self.server = RpcServer(model, host, port, path, executor)
+        self.loop = None
+        self.error = None
+        self._ready = threading.Event()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self.server.start())
+        except Exception as e:
+            # ポートが使用中など
+            self.error = e
+            self._ready.set()
+            self.loop.close()
+            return
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.server.close())
+            self.loop.close()
+
+    def start_and_wait(self, timeout=5.0):
+        # 待ち受けを始めるまで待つ(始められなければ例外)
+        self.start()
+        self._ready.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.server.address
+
+    def stop(self, timeout=2.0):
+        if self.is_alive() and self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(timeout)
@@ -0,0 +1,49 @@
+import sys
+import json
+import time
+
+# 起動時間の計測(main.pyの最初に記録した時刻からの経過時間)
+# 例) python main.py --startup-report startup.json --startup-exit
+#     モジュール単位の内訳は python -X importtime main.py で確認する
+
+
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.marks = []  # [(名前, 開始からの経過秒)]
+        self._modules_at_start = len(sys.modules)
+
+    def mark(self, name):
+        if not any(n == name for n, _ in self.marks):
+            self.marks.append((name, time.perf_counter() - self.start))
+
+    def elapsed(self, name):
+        for n, t in self.marks:
+            if n == name:
+                return t
+        return None
+
+    def report(self):
+        phases = []
+        prev = 0.0
+        for name, t in self.marks:
+            phases.append({"phase": name, "at_ms": round(t * 1000, 2), "delta_ms": round((t - prev) * 1000, 2)})
+            prev = t
+        return {
+            "python": sys.version.split()[0],
+            "modules_loaded": len(sys.modules),
+            "phases": phases,
+            "time_to_first_paint_ms": round((self.elapsed("first_paint") or 0.0) * 1000, 2),
+        }
+
+    def write_report(self, path=None):
+        # pathを省略した場合は標準エラーに表形式で出力
+        report = self.report()
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            return report
+        for p in report["phases"]:
+            print(f"{p['phase']:<20} {p['at_ms']:>9.2f} ms  (+{p['delta_ms']:.2f})", file=sys.stderr)
+        print(f"modules loaded: {report['modules_loaded']}", file=sys.stderr)
+        return report
@@ -1,9 +1,110 @@
 import os
-import json
+import sys
+import time
 from model.task_model import TaskModel
-from view.pyqt_builder import TaskListDialog
+from model.task_events import TaskModelListener
+from model.task_stats import TaskStatsIndex
+from model.day_summary_cache import DaySummaryCache
+from model.task_search import TaskSearchIndex, DEFAULT_LIMIT
+from model.date_keys import month_range, quarter_range
+from model.task_storage import import_conf_data, export_conf_data
+from controller.conf_journal import ConfJournal, write_snapshot
+from controller.conf_persistence import ConfPersistence, ShardPersistence, DEFAULT_TASK_MASTER_LIST
+from controller.instrumentation import (
+    instrument, instrument_model, instrument_persistence, mark_pending_paint
+)
 
 INIT_CONF_PATH = os.path.join(os.path.dirname(__file__), '..', 'init.conf')
+# 保存先: "json"(init.conf + ジャーナル) / "sqlite"(init.db) / "sharded"(init.d/ 月ごとのファイル)
+STORAGE_BACKEND = "json"
+SQLITE_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'init.db')
+SHARD_DIR = os.path.join(os.path.dirname(__file__), '..', 'init.d')
+# init.confの形式: "json" / "binary"(列指向のバイナリ。起動時は必要な日だけデコードする)
+# 読み込みはどちらの形式でもよく、次のコンパクションでこの形式に書き直される
+SNAPSHOT_FORMAT = "json"
+# 変更をジャーナルに追記する(Falseなら従来通り毎回init.confを全体保存)
+CONF_JOURNAL_ENABLED = True
+# ジャーナルへの書き込みを専用スレッドで行う(GUIスレッドでファイルI/Oをしない)
+PERSIST_IN_BACKGROUND = True
+# 連続した変更をまとめて1回で書き込む待ち時間(秒)
+PERSIST_DEBOUNCE_SEC = 0.5
+# init.confを別スレッドで読み込み、選択中の日付から順に表示する(読み込み中も編集できる)
+LOAD_IN_BACKGROUND = True
+# 他のプロセス(別ウィンドウ・cli.py)によるinit.confの変更を監視し、変わった日だけを取り込む
+WATCH_EXTERNAL_CHANGES = True
+# ローカルのスクリプトからModelを操作するJSON-RPCサーバー(controller/rpc_server.py)を起動する
+# RPC_SOCKET_PATHを指定するとTCPではなくUnixドメインソケットで待ち受ける
+RPC_SERVER_ENABLED = False
+RPC_HOST = "127.0.0.1"
+RPC_PORT = 8765
+RPC_SOCKET_PATH = None
+# 古い日をinit.conf.archive(圧縮した読み取り専用のファイル)へ移し、init.confには直近の日だけを残す(json保存のみ)
+# アーカイブにある日は、カレンダーでその月を表示したときに読み込む(conf_archive.py)
+ARCHIVE_ENABLED = False
+# この日数より古い日 / タスクがすべてClosedでこの日数が経った日(Noneなら移さない)を移す
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_CLOSED_AFTER_DAYS = 30
+
+def load_conf_for_migration():
+    # 初回の移行元: init.conf(マスタがなければjson保存で起動した場合と同じ既定値)
+    data = ConfJournal(INIT_CONF_PATH).load()
+    data.setdefault("task_master_list", [dict(t) for t in DEFAULT_TASK_MASTER_LIST])
+    return data
+
+def open_task_model(backend=None, path=None, load=True, background=None):
+    # 保存先を開き、(Model, 保存処理) を返す(GUIなしでも使える。PyQtはimportしない)
+    # path: 保存先のパス(省略時はbackendごとの既定値)
+    # load: Falseならinit.confを読み込まない(別スレッドで読み込む場合)
+    backend = backend or STORAGE_BACKEND
+    if background is None:
+        background = PERSIST_IN_BACKGROUND
+    persistence = None
+    if backend == "sqlite":
+        # SQLite: 変更はストレージが行単位で即時書き込む
+        from model.task_storage import SqliteTaskStorage
+        storage = SqliteTaskStorage(path or SQLITE_DB_PATH)
+        if storage.is_empty():
+            # 初回はinit.confから移行
+            import_conf_data(storage, load_conf_for_migration())
+        model = TaskModel(storage=storage)
+    elif backend == "sharded":
+        # 月ごとのファイル: 表示する月だけを読み込み、変更のあった月だけを書き出す
+        from model.shard_storage import ShardedTaskStorage
+        storage = ShardedTaskStorage(path or SHARD_DIR)
+        if not storage.has_manifest():
+            # 初回はinit.confから移行
+            import_conf_data(storage, load_conf_for_migration())
+            storage.save()
+        model = TaskModel(storage=storage)
+        persistence = ShardPersistence(storage)
+        instrument_persistence(persistence)
+        model.add_event_listener(persistence)
+    else:
+        model = TaskModel()
+        # init.conf + ジャーナルから全データをロード
+        persistence = ConfPersistence(
+            model, path or INIT_CONF_PATH, journal_enabled=CONF_JOURNAL_ENABLED,
+            background=background, debounce=PERSIST_DEBOUNCE_SEC, snapshot_format=SNAPSHOT_FORMAT)
+        instrument_persistence(persistence)
+        if ARCHIVE_ENABLED:
+            from controller.conf_archive import ColdArchive, ARCHIVE_SUFFIX
+            persistence.archive = ColdArchive((path or INIT_CONF_PATH) + ARCHIVE_SUFFIX,
+                                              ARCHIVE_AFTER_DAYS, ARCHIVE_CLOSED_AFTER_DAYS)
+        if load:
+            persistence.load_into_model()
+        # Observerパターン: Modelの変更を保存処理に通知
+        model.add_event_listener(persistence)
+    instrument_model(model)
+    return model, persistence
+
+# 計測対象のViewからのシグナルのハンドラ
+HANDLER_NAMES = [
+    "handle_add_task", "handle_date_changed", "handle_delete_task", "handle_change_task_state",
+    "handle_change_task_attr_ratio", "handle_save_work_hours", "handle_delete_work_hours",
+    "handle_add_task_from_master", "handle_close_working_tasks", "handle_copy_to_weekdays",
+    "handle_add_recurring_task", "handle_stop_recurring", "handle_search", "handle_generate_report",
+    "handle_month_changed", "open_task_list_window", "on_master_task_added", "on_master_task_deleted",
+]
 
 # Commandパターン: タスク追加処理をオブジェクト化し、Controllerから実行
 class AddTaskCommand:
@@ -14,21 +115,47 @@ class AddTaskCommand:
         self.model.add_task(date_str, task_text, attr_ratio)
 
 # ControllerはObserverとしてViewのイベントを受信し、Commandで処理を委譲
-class TaskController:
-    def __init__(self, task_view):
-        self.model = TaskModel()
-        self.add_task_command = AddTaskCommand(self.model)
+# また、Modelのリスナーとして変更のあった行だけをViewに反映する
+class TaskController(TaskModelListener):
+    def __init__(self, task_view, stats_panel=None, calendar_view=None):
         self.task_view = task_view
+        self.stats_panel = stats_panel
+        self.calendar_view = calendar_view
         self.current_date = self.task_view.get_selected_date()
-        # init.confから全データをロード
-        conf = self.load_conf()
-        self.task_master_list = conf.get("task_master_list", [
-            {"text": "Sample Task 1", "attr": "Free"},
-            {"text": "Sample Task 2", "attr": "Mon"}
-        ])
-        self.model.tasks = conf.get("calendar_tasks", {})
-        self.model.work_hours = conf.get("work_hours", {})
-        self.task_view.set_task_master_list(self.task_master_list)
+        self.loader = None
+        self.watcher = None
+        self.rpc_server = None
+        # init.confは画面の準備ができてから別スレッドで読み込む
+        background_load = LOAD_IN_BACKGROUND and STORAGE_BACKEND == "json"
+        self.model, self.persistence = open_task_model(load=not background_load)
+        # アーカイブした日は表示する月になったら読み込む(保存処理より後に登録: 編集された日は先に書き込まれる)
+        self.archive_pager = None
+        if isinstance(self.persistence, ConfPersistence) and self.persistence.archive is not None:
+            from controller.conf_archive import ArchivePager
+            self.archive_pager = ArchivePager(self.model, self.persistence.archive, self.persistence.save_days)
+            self.persistence.pager = self.archive_pager
+            self.model.add_event_listener(self.archive_pager)
+        # 計測が有効なら、ハンドラをシグナルに接続する前に計測付きに差し替える
+        instrument(self, HANDLER_NAMES, "controller.", on_start=mark_pending_paint)
+        instrument(self, ["update_stats_view", "_days_changed"], "controller.")
+        self.add_task_command = AddTaskCommand(self.model)
+        self._task_list_dialog = None
+        self._search_dialog = None
+        self._report_dialog = None
+        self.report_runner = None
+        # 集計は変更のあった日だけ更新する(表示より先に更新されるよう先に登録)
+        self.stats = TaskStatsIndex(self.model)
+        self.model.add_event_listener(self.stats)
+        # カレンダーの日ごとの要約(月単位でキャッシュし、変更のあった日だけ無効化)
+        self.day_summaries = DaySummaryCache(self.model)
+        self.model.add_event_listener(self.day_summaries)
+        if self.calendar_view is not None:
+            self.calendar_view.set_summary_provider(self.day_summaries.month)
+        # タスク名の検索(転置インデックスは初めて検索したときに作り、以降は変更のあった日だけ更新)
+        self.search_index = TaskSearchIndex(self.model)
+        self.model.add_event_listener(self.search_index)
+        self.task_view.set_task_master_list(self.model.get_master_list())
+        self.update_stats_view()
         # Observerパターン: ViewのシグナルをControllerが受信
         self.task_view.task_added.connect(self.handle_add_task)
         self.task_view.date_changed.connect(self.handle_date_changed)
@@ -40,102 +167,368 @@ class TaskController:
         self.task_view.work_hours_saved.connect(self.handle_save_work_hours)
         self.task_view.work_hours_deleted.connect(self.handle_delete_work_hours)
         # Observerパターン: Modelの変更をViewに通知
-        self.model.add_listener(self.update_view)
+        self.model.add_event_listener(self)
         # 初期表示
-        self.update_view(self.model.get_tasks(self.current_date))
+        self.task_view.task_list_model.set_tasks(self.model.get_tasks(self.current_date))
+        self.update_work_hours_view()
         self.task_view.task_selected_to_add.connect(self.handle_add_task_from_master)
         self.task_view.open_task_list_requested.connect(self.open_task_list_window)
+        self.task_view.open_search_requested.connect(self.open_search_window)
+        self.task_view.open_report_requested.connect(self.open_report_window)
+        # まとめて変更する操作
+        self.task_view.close_working_requested.connect(self.handle_close_working_tasks)
+        self.task_view.copy_to_weekdays_requested.connect(self.handle_copy_to_weekdays)
+        # 繰り返しタスク
+        self.task_view.recurring_task_requested.connect(self.handle_add_recurring_task)
+        self.task_view.stop_recurring_requested.connect(self.handle_stop_recurring)
+        if self.calendar_view is not None:
+            self.calendar_view.month_changed.connect(self.handle_month_changed)
+        if background_load:
+            self.start_background_load()
+        else:
+            self.start_watching()
+            self.start_rpc_server()
+            self.page_in_archive(self.current_date)
+
+    def start_background_load(self):
+        from controller.conf_loader import ConfLoader
+        # 読み込みが終わるまでジャーナルへの書き込みとコンパクションを保留
+        self.persistence.begin_loading()
+        self.loader = ConfLoader(self.persistence.journal, self.current_date, archive=self.persistence.archive)
+        self.loader.master_loaded.connect(self.model.merge_loaded_master_list)
+        self.loader.recurrence_loaded.connect(self.model.merge_loaded_recurrence)
+        self.loader.chunk_loaded.connect(self._on_chunk_loaded)
+        self.loader.finished.connect(self._on_load_finished)
+        self.task_view.set_loading_progress(0, None)
+        self.loader.start()
+
+    def _on_chunk_loaded(self, calendar_tasks, work_hours, loaded, total):
+        self.model.merge_loaded(calendar_tasks, work_hours)
+        self.task_view.set_loading_progress(loaded, total)
+
+    def _on_load_finished(self):
+        if self.loader is None:
+            return
+        self.loader.wait()
+        self.loader = None
+        self.persistence.finish_loading()
+        self.task_view.set_loading_progress(None, None)
+        self.start_watching()
+        self.start_rpc_server()
+        self.page_in_archive(self.current_date)
+
+    def page_in_archive(self, date_str):
+        # 表示する日の四半期(集計の範囲)のうちアーカイブにある日をModelへ読み込む
+        # 読み込み中はアーカイブへの移動が終わっていないので、読み込み完了時に行う
+        if self.archive_pager is None or self.loader is not None:
+            return
+        self.archive_pager.ensure_range(*quarter_range(date_str))
+
+    def page_in_archive_range(self, start=None, end=None):
+        # レポート・検索の前に、範囲のうちアーカイブにある日を読み込む(省略した端はアーカイブ全体)
+        if self.archive_pager is None or self.loader is not None:
+            return
+        self.archive_pager.ensure_range(start, end)
+
+    def handle_month_changed(self, year, month):
+        # カレンダーで表示する月を変えた: その月の要約を描画できるよう読み込む
+        if self.archive_pager is None or self.loader is not None:
+            return
+        self.archive_pager.ensure_month(f"{year:04d}-{month:02d}")
+
+    def start_watching(self):
+        # 読み込みが終わってから監視を始める(json保存のときだけ)
+        if not WATCH_EXTERNAL_CHANGES or not isinstance(self.persistence, ConfPersistence):
+            return
+        from controller.conf_sync import ConfSync
+        from controller.conf_watcher import ConfWatcher
+        sync = ConfSync(self.model, self.persistence.journal, self.persistence.archive,
+                        self.persistence.pending_keys)
+        sync.prime()
+        self.watcher = ConfWatcher(sync)
+
+    def start_rpc_server(self):
+        # 読み込みが終わってから待ち受ける。Modelの操作はGUIスレッドで行う
+        if not RPC_SERVER_ENABLED or self.rpc_server is not None:
+            return
+        from controller.rpc_server import RpcServerThread
+        from controller.rpc_bridge import GuiThreadExecutor
+        self._rpc_executor = GuiThreadExecutor()
+        server = RpcServerThread(self.model, self._rpc_executor, RPC_HOST, RPC_PORT, RPC_SOCKET_PATH)
+        try:
+            server.start_and_wait()
+        except Exception as e:
+            # ポートが使用中などでも画面はそのまま使えるようにする
+            print(f"RPC server not started: {e}", file=sys.stderr)
+            return
+        self.rpc_server = server
+
+    def is_loading(self):
+        return self.loader is not None
+
+    def wait_until_loaded(self):
+        # 読み込み完了までイベントを処理しながら待つ(終了時・スクリプトからの利用向け)
+        from PyQt5.QtCore import QCoreApplication
+        while self.loader is not None:
+            if self.loader.isFinished():
+                QCoreApplication.processEvents()
+                self._on_load_finished()
+            else:
+                self.loader.wait(10)
+                QCoreApplication.processEvents()
 
     def handle_add_task(self, task_text, attr_ratio=None):
         # Commandパターン: タスク追加処理を委譲
         self.add_task_command.execute(self.current_date, task_text, attr_ratio)
-        self.save_conf()
 
     def handle_date_changed(self, date_str):
         self.current_date = date_str
-        self.update_view(self.model.get_tasks(date_str))
+        self.page_in_archive(date_str)
+        # 日付が変わったときだけリスト全体を差し替える
+        self.task_view.task_list_model.set_tasks(self.model.get_tasks(date_str))
+        self.update_work_hours_view()
+        self.update_stats_view()
 
     def handle_delete_task(self, index):
         self.model.remove_task(self.current_date, index)
-        self.save_conf()
 
     def handle_change_task_state(self, index, new_state):
         self.model.set_task_state(self.current_date, index, new_state)
-        self.save_conf()
 
     def handle_change_task_attr_ratio(self, index, new_ratio):
         self.model.set_task_attr_ratio(self.current_date, index, new_ratio)
-        self.save_conf()
 
     def handle_save_work_hours(self, hours):
         # 入力値はstr型なのでfloatに変換
         try:
             h = float(hours)
             self.model.set_work_hours(self.current_date, h)
-            self.save_conf()
         except ValueError:
             pass  # 不正な入力は無視
 
     def handle_delete_work_hours(self):
         self.model.remove_work_hours(self.current_date)
-        self.save_conf()
 
     def handle_add_task_from_master(self, task_text):
         # マスターリストから選択して追加（attr_ratioはNone）
         self.add_task_command.execute(self.current_date, task_text, None)
-        self.save_conf()
 
-    def load_conf(self):
-        # 設定ファイルを読み込み
-        try:
-            with open(INIT_CONF_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # バリデーション
-                if isinstance(data, dict):
-                    return data
-        except Exception:
-            pass
-        # デフォルト
-        return {}
+    def handle_close_working_tasks(self):
+        # 選択中の月のWorkingのタスクをすべてClosedにする(通知・保存は1回)
+        self.model.close_working_tasks(*month_range(self.current_date))
+
+    def handle_copy_to_weekdays(self):
+        # 選択中の日の予定を同じ月の平日すべてにコピーする(通知・保存は1回)
+        self.model.copy_day_to_weekdays(self.current_date)
+
+    def handle_add_recurring_task(self, task_text):
+        # マスターのタスクを選択中の日から繰り返す(曜日はマスターのattr)
+        self.model.add_recurring_task_from_master(task_text, self.current_date)
+
+    def handle_stop_recurring(self, index):
+        # 選択した繰り返しタスクを選択中の日以降は繰り返さない
+        tasks = self.model.get_tasks(self.current_date)
+        rule_id = getattr(tasks[index], "rule_id", None) if 0 <= index < len(tasks) else None
+        if rule_id is not None:
+            self.model.end_recurring_rule(rule_id, self.current_date)
 
     def save_conf(self):
-        # 設定ファイルに保存
-        data = {
-            "task_master_list": self.task_master_list,
-            "calendar_tasks": self.model.tasks,
-            "work_hours": self.model.work_hours
-        }
-        try:
-            with open(INIT_CONF_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        # 設定ファイルに全体を保存(SQLiteは変更時に書き込み済み)
+        if self.persistence is not None:
+            self.persistence.save_conf()
+
+    def export_conf(self, path=INIT_CONF_PATH):
+        # 現在の保存先の内容をinit.conf(JSON)形式で書き出す(移行用)
+        data = export_conf_data(self.model.storage)
+        data["task_master_list"] = self.model.get_master_list()
+        write_snapshot(path, data)
+
+    def persist_stats(self):
+        # 書き込み回数・レイテンシの確認用
+        if self.persistence is None:
+            return {}
+        return self.persistence.stats()
+
+    def close(self):
+        # 終了時: 未書き込みの変更をすべて書き出す(読み込み中なら読み込みを終えてから)
+        self.wait_until_loaded()
+        self.cancel_report()
+        if self.rpc_server is not None:
+            self.rpc_server.stop()
+            self.rpc_server = None
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.persistence is not None:
+            self.persistence.close()
+        self.model.storage.close()
 
     def open_task_list_window(self):
-        dialog = TaskListDialog(self.task_master_list)
+        # ダイアログは初めて開くときに読み込む
+        from view.task_list_dialog import TaskListDialog
+        dialog = TaskListDialog(self.model.get_master_list())
         dialog.task_added.connect(self.on_master_task_added)
         dialog.task_deleted.connect(self.on_master_task_deleted)
+        self._task_list_dialog = dialog
         dialog.exec_()
-        # 閉じた後にコンボボックスを更新
-        self.task_view.set_task_master_list(self.task_master_list)
-        self.save_conf()
+        self._task_list_dialog = None
+
+    def open_search_window(self):
+        # 検索ダイアログはモードレス(開いたままカレンダーを操作できる)
+        if self._search_dialog is None:
+            from view.search_dialog import SearchDialog
+            self._search_dialog = SearchDialog(self.task_view)
+            self._search_dialog.search_requested.connect(self.handle_search)
+            self._search_dialog.date_activated.connect(self.jump_to_date)
+        self._search_dialog.show()
+        self._search_dialog.raise_()
+
+    def handle_search(self, query, state=None, start=None, end=None):
+        started = time.perf_counter()
+        self.page_in_archive_range(start, end)
+        hits = self.search_index.search(query, state, start, end, DEFAULT_LIMIT)
+        if self._search_dialog is not None:
+            self._search_dialog.show_results(hits, (time.perf_counter() - started) * 1000, DEFAULT_LIMIT)
+        return hits
+
+    def open_report_window(self):
+        if self._report_dialog is None:
+            from view.report_dialog import ReportDialog
+            self._report_dialog = ReportDialog(self.current_date, self.task_view)
+            self._report_dialog.generate_requested.connect(self.handle_generate_report)
+            self._report_dialog.cancel_requested.connect(self.cancel_report)
+        self._report_dialog.show()
+        self._report_dialog.raise_()
+
+    def handle_generate_report(self, start, end, path, fmt=None):
+        # Modelのスナップショットを取り、集計は別プロセスで行う(完了・取り消しはシグナルで通知)
+        from controller.report_runner import ReportRunner
+        if self.report_runner is not None and self.report_runner.is_running():
+            return None
+        self.page_in_archive_range(start, end)
+        runner = ReportRunner(self.model, start, end, path, fmt)
+        dialog = self._report_dialog
+        if dialog is not None:
+            runner.progress.connect(dialog.set_progress)
+            runner.finished.connect(lambda p: dialog.set_status(f"Saved: {p}"))
+            runner.failed.connect(lambda e: dialog.set_status(f"Failed: {e}"))
+            runner.canceled.connect(lambda: dialog.set_status("Canceled"))
+            for signal in (runner.finished, runner.failed, runner.canceled):
+                signal.connect(lambda *args: dialog.set_running(False))
+            dialog.set_running(True)
+        self.report_runner = runner
+        runner.start()
+        return runner
+
+    def cancel_report(self):
+        if self.report_runner is not None:
+            self.report_runner.cancel()
+
+    def jump_to_date(self, date_str):
+        # カレンダーの選択を変えると、通常の日付変更と同じ流れで表示が切り替わる
+        if self.calendar_view is not None:
+            self.calendar_view.select_date(date_str)
+        else:
+            self.task_view._current_date = date_str
+            self.task_view.set_selected_date(date_str)
 
     def on_master_task_added(self, text, attr):
-        self.task_view.set_task_master_list(self.task_master_list)
-        self.save_conf()
+        self.model.add_master_task(text, attr)
 
     def on_master_task_deleted(self, idx):
-        self.task_view.set_task_master_list(self.task_master_list)
-        self.save_conf()
-
-    def update_view(self, tasks):
-        self.task_view.task_list.clear()
-        for t in tasks:
-            # 状態とattr_ratioを表示に含める
-            ratio_str = ""
-            if t.get("attr_ratio") is not None:
-                ratio_str = f" ({t['attr_ratio']}%)"
-            self.task_view.task_list.addItem(f"{t['text']} [{t['state']}]"+ratio_str)
-        # 勤務時間表示も更新
+        self.model.remove_master_task(idx)
+
+    def update_work_hours_view(self):
         hours = self.model.get_work_hours(self.current_date)
         self.task_view.set_work_hours_display(hours)
+
+    def set_stats_panel(self, stats_panel):
+        # 集計パネルが後から作られた場合
+        self.stats_panel = stats_panel
+        self.update_stats_view()
+
+    def update_stats_view(self):
+        # 選択中の日付を含む月(週別)と四半期の集計を表示
+        if self.stats_panel is None:
+            return
+        month_start, month_end = month_range(self.current_date)
+        quarter_start, quarter_end = quarter_range(self.current_date)
+        self.stats_panel.show_stats(
+            self.current_date[:7],
+            self.stats.summary(month_start, month_end),
+            self.stats.rollup(month_start, month_end, "week"),
+            self.stats.average_ratio_by_task(quarter_start, quarter_end))
+
+    def _stats_changed(self, date_str):
+        # カレンダーは変更のあった日のセルだけ再描画
+        if self.calendar_view is not None:
+            self.calendar_view.refresh_date(date_str)
+        # 表示中の四半期に含まれる変更なら集計表示を更新
+        quarter_start, quarter_end = quarter_range(self.current_date)
+        if quarter_start <= date_str <= quarter_end:
+            self.update_stats_view()
+
+    # TaskModelListener: 表示中の日付の変更だけを行単位で反映
+    def task_added(self, date_str, index, task):
+        if date_str == self.current_date:
+            self.task_view.task_list_model.task_inserted(self.model.get_tasks(date_str), index)
+        self._stats_changed(date_str)
+
+    def task_removed(self, date_str, index, task):
+        if date_str == self.current_date:
+            self.task_view.task_list_model.task_removed(self.model.get_tasks(date_str), index)
+        self._stats_changed(date_str)
+
+    def task_updated(self, date_str, index, fields):
+        if date_str == self.current_date:
+            self.task_view.task_list_model.task_changed(self.model.get_tasks(date_str), index)
+        self._stats_changed(date_str)
+
+    def work_hours_changed(self, date_str, hours):
+        if date_str == self.current_date:
+            self.task_view.set_work_hours_display(hours)
+        self._stats_changed(date_str)
+
+    def master_list_changed(self, task_master_list):
+        self.task_view.set_task_master_list(task_master_list)
+        if self._task_list_dialog is not None:
+            self._task_list_dialog.task_master_list = task_master_list
+            self._task_list_dialog.refresh_list()
+
+    def master_list_loaded(self, task_master_list):
+        self.master_list_changed(task_master_list)
+
+    def days_loaded(self, date_strs):
+        self._days_changed(date_strs)
+
+    def recurring_rules_changed(self, rules):
+        self._recurrence_changed()
+
+    def recurrence_loaded(self):
+        self._recurrence_changed()
+
+    def _recurrence_changed(self):
+        # どの日も変わりうるので、表示中の日・カレンダー・集計を作り直す
+        self.task_view.task_list_model.set_tasks(self.model.get_tasks(self.current_date))
+        if self.calendar_view is not None:
+            self.calendar_view.refresh_all()
+        self.update_stats_view()
+
+    def batch_committed(self, changes):
+        if changes.recurring_rules_changed:
+            self._recurrence_changed()
+        self._days_changed(changes.dates())
+        if changes.master_list_changed:
+            self.master_list_changed(self.model.get_master_list())
+
+    def _days_changed(self, date_strs):
+        # まとめて変わった日付のうち表示中のものだけを差し替える
+        if self.current_date in date_strs:
+            self.task_view.task_list_model.set_tasks(self.model.get_tasks(self.current_date))
+            self.update_work_hours_view()
+        if self.calendar_view is not None:
+            for date_str in date_strs:
+                self.calendar_view.refresh_date(date_str)
+        quarter_start, quarter_end = quarter_range(self.current_date)
+        if any(quarter_start <= d <= quarter_end for d in date_strs):
+            self.update_stats_view()
@@ -1,10 +1,63 @@
+import os
 import sys
+import time
+_START = time.perf_counter()
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from controller.app_controller import AppController
+from controller.startup_timer import StartupTimer
+from controller import instrumentation
+
+def parse_startup_options(argv):
+    # --startup-report [PATH]: 起動時間レポートを出力(PATH省略時は標準エラー)
+    # --startup-exit: 起動が終わったら終了(リリースごとの計測用)
+    report, report_path, exit_after = False, None, False
+    args = list(argv)
+    if "--startup-report" in args:
+        report = True
+        i = args.index("--startup-report")
+        if i + 1 < len(args) and not args[i + 1].startswith("-"):
+            report_path = args.pop(i + 1)
+        args.pop(i)
+    if "--startup-exit" in args:
+        exit_after = True
+        args.remove("--startup-exit")
+    return args, report, report_path, exit_after
+
+def parse_trace_option(argv):
+    # --trace [PATH]: ハンドラ・通知・保存の処理時間を計測し、終了時にPATHへ書き出す
+    # 環境変数 SCHEDULE_TRACE=PATH でも有効になる
+    args = list(argv)
+    path = os.environ.get(instrumentation.TRACE_ENV)
+    if "--trace" in args:
+        i = args.index("--trace")
+        path = "trace.json"
+        if i + 1 < len(args) and not args[i + 1].startswith("-"):
+            path = args.pop(i + 1)
+        args.pop(i)
+    return args, path
 
 def main():
-    app = QApplication(sys.argv)
-    controller = AppController(app)
+    argv, report, report_path, exit_after = parse_startup_options(sys.argv)
+    argv, trace_path = parse_trace_option(argv)
+    if trace_path:
+        instrumentation.enable(trace_path)
+    timer = StartupTimer(_START)
+    timer.mark("imports")
+    app = QApplication(argv)
+    timer.mark("qapplication")
+    controller = AppController(app, startup_timer=timer)
+
+    def on_startup_finished():
+        # 最初の描画を待ってからレポートを出す
+        def finish():
+            timer.mark("startup_finished")
+            if report:
+                timer.write_report(report_path)
+            if exit_after:
+                app.quit()
+        QTimer.singleShot(0, finish)
+    controller.on_startup_finished = on_startup_finished
     controller.run()
 
 if __name__ == "__main__":
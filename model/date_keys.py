@@ -0,0 +1,111 @@
+import logging
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from datetime import date, timedelta
+
+# 日付キー("yyyy-MM-dd")と日序数(date.toordinal)の変換
+# ストレージ内部は日序数で持ち、文字列はModelのAPIとJSONの出入口だけで使う
+# 同じ日付が繰り返し変換されるのでキャッシュする
+ORDINAL_CACHE_SIZE = 4096
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=ORDINAL_CACHE_SIZE)
+def to_ordinal(date_str):
+    return date.fromisoformat(date_str).toordinal()
+
+
+@lru_cache(maxsize=ORDINAL_CACHE_SIZE)
+def from_ordinal(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+def valid_date_keys(mapping, source="init.conf"):
+    # キーが日付として読める項目だけのdict(読めないキーはログに出して無視する)
+    valid = {}
+    for date_str, value in mapping.items():
+        try:
+            to_ordinal(date_str)
+        except (TypeError, ValueError):
+            logger.warning("ignoring invalid date key %r in %s", date_str, source)
+            continue
+        valid[date_str] = value
+    return valid
+
+
+def ordinal_bounds(start=None, end=None):
+    # 範囲(両端含む、Noneは制限なし)を日序数の (lo, hi) に
+    lo = to_ordinal(start) if start is not None else None
+    hi = to_ordinal(end) if end is not None else None
+    return lo, hi
+
+
+# 日序数の昇順リスト(bisectで範囲を O(log n + k) で取り出す)
+class SortedDayIndex:
+    __slots__ = ("_keys",)
+
+    def __init__(self, ordinals=()):
+        self._keys = sorted(set(ordinals))
+
+    def add(self, ordinal):
+        i = bisect_left(self._keys, ordinal)
+        if i == len(self._keys) or self._keys[i] != ordinal:
+            self._keys.insert(i, ordinal)
+
+    def discard(self, ordinal):
+        i = bisect_left(self._keys, ordinal)
+        if i < len(self._keys) and self._keys[i] == ordinal:
+            del self._keys[i]
+
+    def range(self, lo=None, hi=None):
+        # lo～hi(両端含む、Noneは制限なし)の日序数のリスト
+        i = 0 if lo is None else bisect_left(self._keys, lo)
+        j = len(self._keys) if hi is None else bisect_right(self._keys, hi)
+        return self._keys[i:j]
+
+    def clear(self):
+        self._keys = []
+
+    def __contains__(self, ordinal):
+        i = bisect_left(self._keys, ordinal)
+        return i < len(self._keys) and self._keys[i] == ordinal
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def week_start(date_str):
+    # その週の月曜日
+    d = date.fromisoformat(date_str)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def week_range(date_str):
+    # その週の月曜日と日曜日
+    first = date.fromisoformat(week_start(date_str))
+    return first.isoformat(), (first + timedelta(days=6)).isoformat()
+
+
+def month_key(date_str):
+    # "yyyy-MM"
+    return date_str[:7]
+
+
+def month_range(date_str):
+    # その月の初日と末日
+    d = date.fromisoformat(date_str)
+    first = d.replace(day=1)
+    next_first = (first + timedelta(days=32)).replace(day=1)
+    return first.isoformat(), (next_first - timedelta(days=1)).isoformat()
+
+
+def quarter_range(date_str):
+    d = date.fromisoformat(date_str)
+    first_month = (d.month - 1) // 3 * 3 + 1
+    first = date(d.year, first_month, 1)
+    last_month_first = date(d.year, first_month + 2, 1)
+    return first.isoformat(), month_range(last_month_first.isoformat())[1]
@@ -0,0 +1,107 @@
+import calendar
+from model.task_events import TaskModelListener
+from model.task_record import TaskState
+
+
+# 1日分の要約(状態ごとのタスク数と勤務時間)
+class DaySummary:
+    __slots__ = ("counts", "hours")
+
+    def __init__(self, counts, hours):
+        self.counts = counts  # [Planned, Working, Closed]
+        self.hours = hours
+
+    def total(self):
+        return sum(self.counts)
+
+    def open_count(self):
+        return self.counts[TaskState.Planned] + self.counts[TaskState.Working]
+
+
+# 月単位の要約キャッシュ: {(year, month): {day: DaySummary}}
+# Modelから変更通知のあった日だけを無効化し、次に参照されたときに再計算する
+class DaySummaryCache(TaskModelListener):
+    def __init__(self, model):
+        self.model = model
+        self._months = {}
+        self._stale = {}  # {(year, month): {day, ...}}
+
+    def _summarize(self, date_str):
+        counts = [0] * len(TaskState)
+        for t in self.model.get_tasks(date_str):
+            counts[t.state_code] += 1
+        hours = self.model.get_work_hours(date_str)
+        if not any(counts) and hours is None:
+            return None
+        return DaySummary(counts, hours)
+
+    def _put(self, month, year, mon, day):
+        summary = self._summarize(f"{year:04d}-{mon:02d}-{day:02d}")
+        if summary is None:
+            month.pop(day, None)
+        else:
+            month[day] = summary
+
+    def month(self, year, mon):
+        key = (year, mon)
+        month = self._months.get(key)
+        if month is None:
+            # データのある日だけを範囲で取り出して要約する
+            first = f"{year:04d}-{mon:02d}-01"
+            last = f"{year:04d}-{mon:02d}-{calendar.monthrange(year, mon)[1]:02d}"
+            counts = {}
+            for date_str, tasks in self.model.iter_days(first, last):
+                c = counts[int(date_str[8:10])] = [0] * len(TaskState)
+                for t in tasks:
+                    c[t.state_code] += 1
+            hours = {int(d[8:10]): h for d, h in self.model.get_work_hours_range(first, last).items()}
+            month = {day: DaySummary(counts.get(day, [0] * len(TaskState)), hours.get(day))
+                     for day in sorted(counts.keys() | hours.keys())}
+            self._months[key] = month
+            self._stale.pop(key, None)
+        else:
+            for day in self._stale.pop(key, ()):
+                self._put(month, year, mon, day)
+        return month
+
+    def get(self, date_str):
+        year, mon, day = int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10])
+        return self.month(year, mon).get(day)
+
+    def invalidate(self, date_str):
+        key = (int(date_str[:4]), int(date_str[5:7]))
+        if key in self._months:
+            self._stale.setdefault(key, set()).add(int(date_str[8:10]))
+
+    def clear(self):
+        self._months = {}
+        self._stale = {}
+
+    # TaskModelListener
+    def task_added(self, date_str, index, task):
+        self.invalidate(date_str)
+
+    def task_removed(self, date_str, index, task):
+        self.invalidate(date_str)
+
+    def task_updated(self, date_str, index, fields):
+        self.invalidate(date_str)
+
+    def work_hours_changed(self, date_str, hours):
+        self.invalidate(date_str)
+
+    def days_loaded(self, date_strs):
+        for date_str in date_strs:
+            self.invalidate(date_str)
+
+    def batch_committed(self, changes):
+        if changes.recurring_rules_changed:
+            self.clear()
+        self.days_loaded(changes.dates())
+
+    def recurring_rules_changed(self, rules):
+        # どの日が変わったかはルールを展開しないとわからないので、表示時に作り直す
+        self.clear()
+
+    def recurrence_loaded(self):
+        self.clear()
@@ -0,0 +1,246 @@
+import os
+import json
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from model.task_storage import TaskStorage
+from model.task_record import Task, tasks_to_json
+from model.task_index import TextIndexedList
+from model.date_keys import month_key
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# 同時にメモリに載せておく月数(これを超えたら古い月から追い出す)
+DEFAULT_MAX_LOADED_MONTHS = 12
+
+
+def _write_json(path, data):
+    # 一時ファイルに書いてから置き換え
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class _MonthShard:
+    __slots__ = ("tasks", "work_hours", "dirty")
+
+    def __init__(self, tasks=None, work_hours=None):
+        self.tasks = tasks or {}  # {date_str: TextIndexedList([Task, ...])}
+        self.work_hours = work_hours or {}
+        self.dirty = False
+
+
+# 月ごとのファイル(yyyy-MM.json)に分割して保存し、表示する月だけを読み込む
+# manifest.jsonには月の一覧とマスターリスト・繰り返しタスクだけを持つ
+class ShardedTaskStorage(TaskStorage):
+    def __init__(self, shard_dir, max_loaded_months=DEFAULT_MAX_LOADED_MONTHS):
+        self.shard_dir = shard_dir
+        self.max_loaded_months = max_loaded_months
+        self._shards = OrderedDict()  # {"yyyy-MM": _MonthShard} LRU順
+        self._months = set()  # データのある月
+        self._task_master_list = []
+        self._recurrence = {"rules": [], "overrides": {}}
+        self._manifest_dirty = False
+        self.loads = 0
+        self.writes = 0
+        os.makedirs(shard_dir, exist_ok=True)
+        self._read_manifest()
+
+    def _manifest_path(self):
+        return os.path.join(self.shard_dir, MANIFEST_NAME)
+
+    def _shard_path(self, month):
+        return os.path.join(self.shard_dir, f"{month}.json")
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._months = set(manifest.get("months", []))
+        self._task_master_list = manifest.get("task_master_list", [])
+        self._recurrence = manifest.get("recurrence", self._recurrence)
+
+    def has_manifest(self):
+        return os.path.exists(self._manifest_path())
+
+    def _read_shard(self, month):
+        try:
+            with open(self._shard_path(month), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return _MonthShard()
+        self.loads += 1
+        tasks = {d: TextIndexedList(Task.from_dict(t) for t in ts)
+                 for d, ts in data.get("calendar_tasks", {}).items()}
+        return _MonthShard(tasks, data.get("work_hours", {}))
+
+    def _write_shard(self, month, shard):
+        _write_json(self._shard_path(month), {
+            "calendar_tasks": tasks_to_json(shard.tasks),
+            "work_hours": shard.work_hours,
+        })
+        shard.dirty = False
+        self.writes += 1
+
+    def _shard(self, month):
+        # 必要になった月だけ読み込む(LRU)
+        shard = self._shards.get(month)
+        if shard is not None:
+            self._shards.move_to_end(month)
+            return shard
+        shard = self._read_shard(month) if month in self._months else _MonthShard()
+        self._shards[month] = shard
+        self._evict()
+        return shard
+
+    def _shard_for_read(self, month):
+        # データのない月は空のシャードを作らない(空の月をめくっても読み込み済みの月を追い出さない)
+        if month not in self._months and month not in self._shards:
+            return None
+        return self._shard(month)
+
+    def _evict(self):
+        while len(self._shards) > self.max_loaded_months:
+            month, shard = self._shards.popitem(last=False)
+            if shard.dirty:
+                # 未保存の月は書き出してから追い出す
+                self._write_shard(month, shard)
+
+    def _touch(self, date_str):
+        month = month_key(date_str)
+        shard = self._shard(month)
+        shard.dirty = True
+        if month not in self._months:
+            self._months.add(month)
+            self._manifest_dirty = True
+        return shard
+
+    def loaded_months(self):
+        return list(self._shards)
+
+    def get_day(self, date_str):
+        shard = self._shard_for_read(month_key(date_str))
+        day = shard.tasks.get(date_str) if shard is not None else None
+        return day if day is not None else TextIndexedList()
+
+    def _day_for_write(self, date_str):
+        shard = self._touch(date_str)
+        day = shard.tasks.get(date_str)
+        if day is None:
+            day = shard.tasks[date_str] = TextIndexedList()
+        return day
+
+    def insert_task(self, date_str, index, task):
+        self._day_for_write(date_str).insert(index, task)
+
+    def insert_tasks(self, date_str, index, tasks):
+        day = self._day_for_write(date_str)
+        for i, task in enumerate(tasks):
+            day.insert(index + i, task)
+
+    def remove_task(self, date_str, index):
+        day = self._day_for_write(date_str)
+        del day[index]
+        if not day:
+            del self._touch(date_str).tasks[date_str]
+
+    def update_task(self, date_str, index, fields):
+        day = self._day_for_write(date_str)
+        if "text" in fields:
+            day.rename(index, fields["text"])
+        day[index].update({k: v for k, v in fields.items() if k != "text"})
+
+    def get_work_hours(self, date_str):
+        shard = self._shard_for_read(month_key(date_str))
+        return shard.work_hours.get(date_str, None) if shard is not None else None
+
+    def set_work_hours(self, date_str, hours):
+        self._touch(date_str).work_hours[date_str] = hours
+
+    def remove_work_hours(self, date_str):
+        self._touch(date_str).work_hours.pop(date_str, None)
+
+    def _iter_shards(self, start=None, end=None):
+        # 範囲にかかる月だけを順に返す
+        # 読み込み済みの月はそのまま、それ以外は一時的に読む(キャッシュしない)
+        months = sorted(self._months)
+        lo = 0 if start is None else bisect_left(months, month_key(start))
+        hi = len(months) if end is None else bisect_right(months, month_key(end))
+        for month in months[lo:hi]:
+            shard = self._shards.get(month)
+            yield month, shard if shard is not None else self._read_shard(month)
+
+    @staticmethod
+    def _in_range(date_strs, start, end):
+        # 月の中の日付を範囲で絞り込んで日付順に
+        return sorted(d for d in date_strs if (start is None or start <= d) and (end is None or d <= end))
+
+    def iter_days(self, start=None, end=None):
+        for month, shard in self._iter_shards(start, end):
+            for date_str in self._in_range(shard.tasks, start, end):
+                yield date_str, shard.tasks[date_str]
+
+    def iter_work_hours(self, start=None, end=None):
+        for month, shard in self._iter_shards(start, end):
+            for date_str in self._in_range(shard.work_hours, start, end):
+                yield date_str, shard.work_hours[date_str]
+
+    def get_master_list(self):
+        return self._task_master_list
+
+    def set_master_list(self, task_master_list):
+        self._task_master_list = task_master_list
+        self._manifest_dirty = True
+
+    def get_recurrence(self):
+        return self._recurrence
+
+    def set_recurrence(self, recurrence):
+        # 繰り返しタスクのルールと上書きはマニフェストに持つ(月のファイルには展開しない)
+        self._recurrence = recurrence
+        self._manifest_dirty = True
+
+    def load_data(self, calendar_tasks, work_hours):
+        # init.confの内容を月ごとに振り分けて全シャードを書き出す(移行用)
+        self.clear()
+        shards = {}
+        for date_str, tasks in calendar_tasks.items():
+            shard = shards.setdefault(month_key(date_str), _MonthShard())
+            shard.tasks[date_str] = TextIndexedList(Task.from_dict(t) for t in tasks)
+        for date_str, hours in work_hours.items():
+            shards.setdefault(month_key(date_str), _MonthShard()).work_hours[date_str] = hours
+        for month, shard in shards.items():
+            self._write_shard(month, shard)
+        self._months = set(shards)
+        self._manifest_dirty = True
+        self.save()
+
+    def clear(self):
+        for month in self._months:
+            try:
+                os.remove(self._shard_path(month))
+            except FileNotFoundError:
+                pass
+        self._shards.clear()
+        self._months = set()
+        self._manifest_dirty = True
+
+    def save(self):
+        # 変更のあった月とマニフェストだけを書き出す
+        for month, shard in self._shards.items():
+            if shard.dirty:
+                self._write_shard(month, shard)
+        if self._manifest_dirty:
+            _write_json(self._manifest_path(), {
+                "version": MANIFEST_VERSION,
+                "months": sorted(self._months),
+                "task_master_list": [dict(t) for t in self._task_master_list],
+                "recurrence": self._recurrence,
+            })
+            self._manifest_dirty = False
+            self.writes += 1
+
+    def close(self):
+        self.save()
@@ -0,0 +1,102 @@
+# TaskModel.batch() でまとめた変更の内容(コミット時に1回だけ通知する)
+class BatchChanges:
+    def __init__(self):
+        self.task_dates = set()  # タスクが変わった日付
+        self.work_hours_dates = set()  # 勤務時間が変わった日付
+        self.master_list_changed = False
+        self.recurring_rules_changed = False
+        self.occurrence_dates = set()  # 繰り返しタスクの上書きが変わった日付
+        self.event_count = 0
+
+    def record(self, event, args):
+        self.event_count += 1
+        if event in ("task_added", "task_removed", "task_updated"):
+            self.task_dates.add(args[0])
+        elif event == "work_hours_changed":
+            self.work_hours_dates.add(args[0])
+        elif event == "master_list_changed":
+            self.master_list_changed = True
+        elif event == "recurring_rules_changed":
+            self.recurring_rules_changed = True
+        elif event == "occurrence_changed":
+            self.occurrence_dates.add(args[0])
+
+    def dates(self):
+        return sorted(self.task_dates | self.work_hours_dates)
+
+    def __bool__(self):
+        return self.event_count > 0
+
+
+# Observerパターン: TaskModelの変更を種類ごとに通知するリスナー
+# 必要なメソッドだけをオーバーライドして使う
+class TaskModelListener:
+    def task_added(self, date_str, index, task):
+        pass
+
+    def task_removed(self, date_str, index, task):
+        pass
+
+    def task_updated(self, date_str, index, fields):
+        # fields: 変更された項目だけのdict 例) {"state": "Closed"}
+        pass
+
+    def work_hours_changed(self, date_str, hours):
+        # hours: 削除された場合はNone
+        pass
+
+    def master_list_changed(self, task_master_list):
+        pass
+
+    def recurring_rules_changed(self, rules):
+        # 繰り返しタスクのルールが追加・削除された(どの日の表示も変わりうる)
+        pass
+
+    def occurrence_changed(self, date_str, rule_id):
+        # 繰り返しタスクのその日だけの変更(状態・attr_ratio・削除)
+        # 表示向けには task_updated / task_removed も通知される
+        pass
+
+    def recurrence_loaded(self):
+        # 繰り返しタスクを読み込んだ(保存は不要)
+        pass
+
+    def days_loaded(self, date_strs):
+        # バックグラウンド読み込みで日付単位のデータが届いた(保存は不要)
+        pass
+
+    def master_list_loaded(self, task_master_list):
+        # バックグラウンド読み込みでマスターリストが届いた(保存は不要)
+        pass
+
+    def batch_committed(self, changes):
+        # model.batch() の変更: 個別の通知の代わりにコミット時に1回だけ呼ばれる
+        # changes: BatchChanges(変更のあった日付など。行の位置は含まない)
+        pass
+
+
+# 従来の listener(tasks) 形式の関数を受け付けるためのアダプター
+# どの変更でもその日付のタスクリスト全体を渡す
+class TaskListListenerAdapter(TaskModelListener):
+    def __init__(self, model, listener):
+        self.model = model
+        self.listener = listener
+
+    def _notify(self, date_str):
+        self.listener(self.model.get_tasks(date_str))
+
+    def task_added(self, date_str, index, task):
+        self._notify(date_str)
+
+    def task_removed(self, date_str, index, task):
+        self._notify(date_str)
+
+    def task_updated(self, date_str, index, fields):
+        self._notify(date_str)
+
+    def work_hours_changed(self, date_str, hours):
+        self._notify(date_str)
+
+    def batch_committed(self, changes):
+        for date_str in changes.dates():
+            self._notify(date_str)
@@ -0,0 +1,78 @@
+# タスク名の集合を併せ持つリスト
+# 1日分のタスク([Task, ...])とマスターリスト([{'text':..., 'attr':...}, ...])で使い、
+# 「同じ名前があるか」をO(1)で判定する(削除・名前変更時も集合を同期する)
+class TextIndexedList(list):
+    def __init__(self, items=()):
+        super().__init__(items)
+        self._text_counts = {}  # {text: 件数} 重複追加を許す戦略もあるので件数で持つ
+        for item in self:
+            self._add_text(item["text"])
+
+    def _add_text(self, text):
+        self._text_counts[text] = self._text_counts.get(text, 0) + 1
+
+    def _discard_text(self, text):
+        count = self._text_counts.get(text, 0)
+        if count <= 1:
+            self._text_counts.pop(text, None)
+        else:
+            self._text_counts[text] = count - 1
+
+    def _reindex(self):
+        self._text_counts = {}
+        for item in self:
+            self._add_text(item["text"])
+
+    def contains_text(self, text):
+        return text in self._text_counts
+
+    def append(self, item):
+        super().append(item)
+        self._add_text(item["text"])
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._add_text(item["text"])
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        for item in items:
+            self._add_text(item["text"])
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._discard_text(item["text"])
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._discard_text(item["text"])
+
+    def clear(self):
+        super().clear()
+        self._text_counts = {}
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            super().__delitem__(index)
+            self._reindex()
+            return
+        self._discard_text(self[index]["text"])
+        super().__delitem__(index)
+
+    def __setitem__(self, index, item):
+        super().__setitem__(index, item)
+        # スライス代入や置き換えはまれなので作り直す
+        self._reindex()
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def rename(self, index, text):
+        # 名前の変更は必ずここを通して集合を更新する
+        item = self[index]
+        self._discard_text(item["text"])
+        item["text"] = text
+        self._add_text(text)
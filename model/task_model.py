@@ -1,33 +1,191 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
 from model.task_strategy import TaskAddStrategy, SimpleAddStrategy
+from model.task_storage import TaskStorage, MemoryTaskStorage
+from model.task_events import TaskModelListener, TaskListListenerAdapter, BatchChanges
+from model.task_record import Task, TaskState
+from model.task_index import TextIndexedList
+from model.task_recurrence import RecurrenceSet, rule_for_master_task, previous_day
+from model.date_keys import month_range, week_range
 
 # タスク状態定数
-TASK_STATES = ["Planned", "Working", "Closed"]
+TASK_STATES = [s.name for s in TaskState]
 
 # Strategyパターン: タスク追加方法を切り替え可能
 class TaskModel:
-    def __init__(self, strategy: TaskAddStrategy = None):
-        # self.tasks = [] → 日付ごとにリスト
-        # 各タスクは{"text": ..., "state": ..., "attr_ratio": ...}
-        self.tasks = {}  # {date_str: [task_dict, ...]}
+    def __init__(self, strategy: TaskAddStrategy = None, storage: TaskStorage = None):
+        # 日付ごとのタスクリストと勤務時間はstorageが保持する
+        # 各タスクはTask(text, state, attr_ratio)
+        self.storage = storage or MemoryTaskStorage()
         self.strategy = strategy or SimpleAddStrategy()
         self._listeners = []
-        self.work_hours = {}  # {date_str: hours(float)}
+        # batch()の実行中だけ使う: まとめた変更と取り消し用の操作
+        self._batch = None
+        self._undo = None
+        # マスターリストは小さいので常にメモリ上に持ち、変更時にstorageへ書き込む
+        self.task_master_list = TextIndexedList(self.storage.get_master_list())
+        # 繰り返しタスク: ルールと日ごとの上書きだけを持ち、get_tasks()のときに展開する
+        self.recurrence = RecurrenceSet()
+        recurrence = self.storage.get_recurrence()
+        self.recurrence.load(recurrence.get("rules"), recurrence.get("overrides"))
+
+    @property
+    def tasks(self):
+        # {date_str: [Task, ...]} (保存・エクスポート用)
+        return {d: tasks for d, tasks in self.storage.iter_days()}
+
+    @property
+    def work_hours(self):
+        # {date_str: hours(float)}
+        return self.storage.all_work_hours()
+
+    def load_data(self, calendar_tasks, work_hours):
+        self.storage.load_data(calendar_tasks, work_hours)
+
+    def merge_loaded(self, calendar_tasks, work_hours):
+        # バックグラウンド読み込みの結果を反映する: calendar_tasksは {date_str: [Task, ...]}
+        # 読み込み中に編集された日は、読み込んだタスクを先頭に置き、後から追加したタスクを残す
+        for date_str, tasks in calendar_tasks.items():
+            day = self.storage.get_day(date_str)
+            if day:
+                tasks = self.strategy.select_new(day, tasks)
+            if tasks:
+                self.storage.insert_tasks(date_str, 0, tasks)
+        for date_str, hours in work_hours.items():
+            # 読み込み中に入力された勤務時間を優先
+            if self.storage.get_work_hours(date_str) is None:
+                self.storage.set_work_hours(date_str, hours)
+        self._emit("days_loaded", sorted(set(calendar_tasks) | set(work_hours)))
+
+    def replace_days(self, calendar_tasks, work_hours):
+        # 外部(他のプロセス)で変更された日の内容で置き換える(保存は不要)
+        # calendar_tasks: {date_str: [Task, ...]} 空リストはその日のタスクを削除
+        # work_hours: {date_str: hours または None}
+        for date_str, tasks in calendar_tasks.items():
+            for index in reversed(range(len(self.storage.get_day(date_str)))):
+                self.storage.remove_task(date_str, index)
+            if tasks:
+                self.storage.insert_tasks(date_str, 0, tasks)
+        for date_str, hours in work_hours.items():
+            if hours is None:
+                self.storage.remove_work_hours(date_str)
+            else:
+                self.storage.set_work_hours(date_str, hours)
+        self._emit("days_loaded", sorted(set(calendar_tasks) | set(work_hours)))
+
+    def replace_master_list(self, task_master_list):
+        # 外部で変更されたマスターリストで置き換える(保存は不要)
+        self.load_master_list(task_master_list)
+        self._emit("master_list_loaded", self.task_master_list)
+
+    def load_recurrence(self, rules, overrides):
+        # 読み込み時用(通知しない)
+        self.recurrence.load(rules, overrides)
+        self._store_recurrence()
+
+    def replace_recurrence(self, rules, overrides):
+        # 外部で変更された繰り返しタスクで置き換える(保存は不要)
+        self.load_recurrence(rules, overrides)
+        self._emit("recurrence_loaded")
+
+    def merge_loaded_recurrence(self, rules, overrides):
+        # バックグラウンド読み込み: 読み込んだルールの後ろに、読み込み中に追加されたルールを残す
+        local = self.recurrence
+        self.recurrence = RecurrenceSet()
+        self.recurrence.load(rules, overrides)
+        for rule in local.rules:
+            d = rule.to_dict()
+            added = self.recurrence.add_rule(d["text"], d["kind"], d["start"], d["end"], d["interval"],
+                                             d["weekday"], d["attr_ratio"])
+            for date_str, by_rule in local.overrides.items():
+                if rule.rule_id in by_rule:
+                    self.recurrence.set_override(date_str, added.rule_id, by_rule[rule.rule_id])
+        self._store_recurrence()
+        self._emit("recurrence_loaded")
+
+    def merge_loaded_master_list(self, task_master_list):
+        if not self.task_master_list:
+            self.load_master_list(task_master_list)
+            self._emit("master_list_loaded", self.task_master_list)
+            return
+        # 読み込み中に追加された項目は後ろに残す(この場合は保存が必要なので変更として通知)
+        merged = TextIndexedList(task_master_list)
+        for t in self.task_master_list:
+            if not merged.contains_text(t["text"]):
+                merged.append(t)
+        self.set_master_list(merged)
 
     def set_strategy(self, strategy: TaskAddStrategy):
         # Strategyパターン: 動的に戦略を切り替え
         self.strategy = strategy
 
     def add_listener(self, listener):
+        # 従来形式: listener(その日付のタスクリスト)
+        self.add_event_listener(TaskListListenerAdapter(self, listener))
+
+    def add_event_listener(self, listener: TaskModelListener):
         self._listeners.append(listener)
 
-    def notify(self, date_str):
-        # 指定日付のタスクリストを通知
+    def remove_event_listener(self, listener: TaskModelListener):
+        self._listeners.remove(listener)
+
+    def _emit(self, event, *args):
+        # 変更の種類ごとにリスナーへ通知(batch()の中ではコミットまで溜めておく)
+        if self._batch is not None:
+            self._batch.record(event, args)
+            return
         for listener in self._listeners:
-            listener(self.get_tasks(date_str))
+            getattr(listener, event)(*args)
 
-    def add_task(self, date_str, task_text, attr_ratio=None):
-        if date_str not in self.tasks:
-            self.tasks[date_str] = []
+    def _record_undo(self, undo):
+        if self._undo is not None:
+            self._undo.append(undo)
+
+    @contextmanager
+    def batch(self):
+        # with model.batch(): の中の変更は、通知と保存をまとめて最後に1回だけ行う
+        # 例外が起きたら中の変更をすべて取り消す(入れ子にした場合は外側にまとめる)
+        if self._batch is not None:
+            yield self._batch
+            return
+        self._batch = BatchChanges()
+        self._undo = []
+        self.storage.begin_batch()
+        try:
+            yield self._batch
+        except BaseException:
+            for undo in reversed(self._undo):
+                undo()
+            self._batch = None
+            self._undo = None
+            self.storage.end_batch()
+            raise
+        changes = self._batch
+        self._batch = None
+        self._undo = None
+        self.storage.end_batch()
+        if changes:
+            self._emit("batch_committed", changes)
+
+    def _has_task(self, date_str, index):
+        return 0 <= index < len(self.get_tasks(date_str))
+
+    def _occurrence(self, date_str, index):
+        # indexが繰り返しタスク(保存済みのタスクの後ろに並ぶ)ならそのタスク、そうでなければNone
+        if not self.recurrence:
+            return None
+        stored = len(self.storage.get_day(date_str))
+        if index < stored:
+            return None
+        occurrences = self.recurrence.tasks_for(date_str)
+        if index - stored < len(occurrences):
+            return occurrences[index - stored]
+        return None
+
+    def is_occurrence(self, date_str, index):
+        return self._occurrence(date_str, index) is not None
+
+    def _make_task(self, task_text, attr_ratio=None, state=TaskState.Planned):
         # attr_ratioのバリデーション
         ratio = None
         if attr_ratio is not None:
@@ -41,40 +199,125 @@ class TaskModel:
                     ratio = 100.0
             except Exception:
                 ratio = None
-        # タスクは辞書で管理
-        task = {"text": task_text, "state": "Planned", "attr_ratio": ratio}
-        # Strategyに合わせて追加
-        self.strategy.add_task(self.tasks[date_str], task)
-        self.notify(date_str)
+        return Task(task_text, state, ratio)
+
+    def add_task(self, date_str, task_text, attr_ratio=None):
+        task = self._make_task(task_text, attr_ratio)
+        # Strategyに合わせて追加(追加された場合だけストレージに書き込む)
+        day = self.storage.get_day(date_str)
+        if self.strategy.accepts(day, task):
+            index = len(day)
+            self.storage.insert_task(date_str, index, task)
+            self._record_undo(lambda: self.storage.remove_task(date_str, index))
+            self._emit("task_added", date_str, index, task)
+
+    def add_tasks(self, date_str, entries):
+        # 一括追加: entriesは (task_text, attr_ratio) または (task_text, attr_ratio, state) のリスト
+        # 重複判定は1回ずつ、ストレージへの書き込みはまとめて1回
+        day = self.storage.get_day(date_str)
+        tasks = self.strategy.select_new(day, [self._make_task(*entry) for entry in entries])
+        if not tasks:
+            return []
+        index = len(day)
+        self.storage.insert_tasks(date_str, index, tasks)
+        self._record_undo(lambda: [self.storage.remove_task(date_str, index + i)
+                                   for i in reversed(range(len(tasks)))])
+        for i, task in enumerate(tasks):
+            self._emit("task_added", date_str, index + i, task)
+        return tasks
 
     def get_tasks(self, date_str):
-        return self.tasks.get(date_str, [])
+        # 保存済みのタスクの後ろに、その日の繰り返しタスクを並べる
+        day = self.storage.get_day(date_str)
+        if not self.recurrence:
+            return day
+        occurrences = self.recurrence.tasks_for(date_str)
+        if not occurrences:
+            return day
+        return TextIndexedList(list(day) + occurrences)
+
+    def iter_days(self, start=None, end=None):
+        # start～end(両端含む)のタスクのある日を日付順に (date_str, tasks) で返す
+        # 両端を指定した場合は繰り返しタスクも含める(get_tasksと同じ並び)。省略した場合は保存済みのタスクだけ
+        if start is None or end is None or not self.recurrence:
+            for date_str, day in self.storage.iter_days(start, end):
+                if day:
+                    yield date_str, day
+            return
+        occurrences = {}
+        for date_str, task in self.recurrence.occurrences(start, end):
+            occurrences.setdefault(date_str, []).append(task)
+        stored = {d: day for d, day in self.storage.iter_days(start, end) if day}
+        for date_str in sorted(stored.keys() | occurrences.keys()):
+            day = stored.get(date_str)
+            extra = occurrences.get(date_str)
+            if not extra:
+                yield date_str, day
+            else:
+                yield date_str, TextIndexedList(list(day or ()) + extra)
+
+    def get_tasks_range(self, start, end):
+        # {date_str: tasks} 日付順(タスクのない日は含まない)
+        return dict(self.iter_days(start, end))
+
+    def get_work_hours_range(self, start, end):
+        # {date_str: hours} 日付順
+        return dict(self.storage.iter_work_hours(start, end))
+
+    def get_week(self, date_str):
+        # その日を含む週(月曜日～日曜日)のタスク
+        return self.get_tasks_range(*week_range(date_str))
+
+    def get_month(self, date_str):
+        # その日を含む月のタスク
+        return self.get_tasks_range(*month_range(date_str))
 
     def remove_task(self, date_str, index):
         # 指定日付・インデックスで削除
-        if date_str in self.tasks and 0 <= index < len(self.tasks[date_str]):
-            del self.tasks[date_str][index]
-            self.notify(date_str)
+        occurrence = self._occurrence(date_str, index)
+        if occurrence is not None:
+            # 繰り返しタスクはその日だけ削除(ルールは残す)
+            self._change_occurrence(date_str, occurrence.rule_id, {"skip": True})
+            self._emit("task_removed", date_str, index, occurrence)
+            self._emit("occurrence_changed", date_str, occurrence.rule_id)
+        elif self._has_task(date_str, index):
+            task = self.storage.get_day(date_str)[index]
+            self.storage.remove_task(date_str, index)
+            self._record_undo(lambda: self.storage.insert_task(date_str, index, task))
+            self._emit("task_removed", date_str, index, task)
 
     def change_task_state(self, date_str, index):
         # 状態をPlanned→Working→Closed→Plannedで循環
-        if date_str in self.tasks and 0 <= index < len(self.tasks[date_str]):
-            task = self.tasks[date_str][index]
-            current = task["state"]
-            next_idx = (TASK_STATES.index(current) + 1) % len(TASK_STATES)
-            task["state"] = TASK_STATES[next_idx]
-            self.notify(date_str)
+        if self._has_task(date_str, index):
+            current = self.get_tasks(date_str)[index].state_code
+            next_idx = (current + 1) % len(TASK_STATES)
+            self._update_task(date_str, index, {"state": TASK_STATES[next_idx]})
+
+    def _update_task(self, date_str, index, fields):
+        occurrence = self._occurrence(date_str, index)
+        if occurrence is not None:
+            override = self.recurrence.get_override(date_str, occurrence.rule_id) or {}
+            override.update({k: v for k, v in fields.items() if k in ("state", "attr_ratio")})
+            self._change_occurrence(date_str, occurrence.rule_id, override)
+            self._emit("task_updated", date_str, index, fields)
+            self._emit("occurrence_changed", date_str, occurrence.rule_id)
+            return
+        if self._undo is not None:
+            task = self.storage.get_day(date_str)[index]
+            old = {k: task[k] for k in fields}
+            self._record_undo(lambda: self.storage.update_task(date_str, index, old))
+        self.storage.update_task(date_str, index, fields)
+        self._emit("task_updated", date_str, index, fields)
 
     def set_task_state(self, date_str, index, new_state):
         # ドロップダウンで直接状態をセット
-        if date_str in self.tasks and 0 <= index < len(self.tasks[date_str]):
+        if self._has_task(date_str, index):
             if new_state in TASK_STATES:
-                self.tasks[date_str][index]["state"] = new_state
-                self.notify(date_str)
+                self._update_task(date_str, index, {"state": new_state})
 
     def set_task_attr_ratio(self, date_str, index, attr_ratio):
         # attr_ratioのバリデーション
-        if date_str in self.tasks and 0 <= index < len(self.tasks[date_str]):
+        if self._has_task(date_str, index):
             try:
                 ratio = float(attr_ratio)
                 ratio = round(ratio, 2)
@@ -82,22 +325,166 @@ class TaskModel:
                     ratio = 0.0
                 elif ratio > 100:
                     ratio = 100.0
-                self.tasks[date_str][index]["attr_ratio"] = ratio
-                self.notify(date_str)
+                self._update_task(date_str, index, {"attr_ratio": ratio})
             except Exception:
                 pass
 
     # 勤務時間の保存
     def set_work_hours(self, date_str, hours):
-        self.work_hours[date_str] = hours
-        self.notify(date_str)
+        self._record_work_hours_undo(date_str)
+        self.storage.set_work_hours(date_str, hours)
+        self._emit("work_hours_changed", date_str, hours)
+
+    def _record_work_hours_undo(self, date_str):
+        if self._undo is None:
+            return
+        old = self.storage.get_work_hours(date_str)
+        if old is None:
+            self._record_undo(lambda: self.storage.remove_work_hours(date_str))
+        else:
+            self._record_undo(lambda: self.storage.set_work_hours(date_str, old))
 
     # 勤務時間の取得
     def get_work_hours(self, date_str):
-        return self.work_hours.get(date_str, None)
+        return self.storage.get_work_hours(date_str)
 
     # 勤務時間の削除
     def remove_work_hours(self, date_str):
-        if date_str in self.work_hours:
-            del self.work_hours[date_str]
-            self.notify(date_str)
+        if self.storage.get_work_hours(date_str) is not None:
+            self._record_work_hours_undo(date_str)
+            self.storage.remove_work_hours(date_str)
+            self._emit("work_hours_changed", date_str, None)
+
+    # タスクマスターリスト [{'text':..., 'attr':...}, ...]
+    def get_master_list(self):
+        return self.task_master_list
+
+    def load_master_list(self, task_master_list):
+        # 読み込み時用(通知しない)
+        self.task_master_list = TextIndexedList(task_master_list)
+        self.storage.set_master_list(self.task_master_list)
+
+    def _record_master_undo(self):
+        if self._undo is not None:
+            old = [dict(t) for t in self.task_master_list]
+            self._record_undo(lambda: self.load_master_list(old))
+
+    def set_master_list(self, task_master_list):
+        self._record_master_undo()
+        self.load_master_list(task_master_list)
+        self._emit("master_list_changed", self.task_master_list)
+
+    def has_master_task(self, text):
+        return self.task_master_list.contains_text(text)
+
+    def add_master_task(self, text, attr):
+        # 同名のタスクは追加しない
+        if self.has_master_task(text):
+            return False
+        self._record_master_undo()
+        self.task_master_list.append({"text": text, "attr": attr})
+        self.storage.set_master_list(self.task_master_list)
+        self._emit("master_list_changed", self.task_master_list)
+        return True
+
+    def remove_master_task(self, index):
+        if 0 <= index < len(self.task_master_list):
+            self._record_master_undo()
+            del self.task_master_list[index]
+            self.storage.set_master_list(self.task_master_list)
+            self._emit("master_list_changed", self.task_master_list)
+
+    # 繰り返しタスク
+    def _store_recurrence(self):
+        self.storage.set_recurrence({"rules": self.recurrence.rules_data(),
+                                     "overrides": self.recurrence.overrides_data()})
+
+    def _record_recurrence_undo(self):
+        if self._undo is not None:
+            rules, overrides = self.recurrence.rules_data(), self.recurrence.overrides_data()
+            self._record_undo(lambda: self.load_recurrence(rules, overrides))
+
+    def _change_occurrence(self, date_str, rule_id, override):
+        if self._undo is not None:
+            old = self.recurrence.get_override(date_str, rule_id)
+            self._record_undo(lambda: (self.recurrence.set_override(date_str, rule_id, old),
+                                       self._store_recurrence()))
+        self.recurrence.set_override(date_str, rule_id, override)
+        self._store_recurrence()
+
+    def get_recurring_rules(self):
+        return self.recurrence.rules
+
+    def get_occurrences(self, start, end):
+        # start～end(両端含む)の繰り返しタスク [(date_str, RecurringTask), ...]
+        return list(self.recurrence.occurrences(start, end))
+
+    def add_recurring_task(self, task_text, kind, start, end=None, interval=1, weekday=None, attr_ratio=None):
+        self._record_recurrence_undo()
+        rule = self.recurrence.add_rule(task_text, kind, start, end, interval, weekday,
+                                        self._make_task(task_text, attr_ratio).attr_ratio)
+        self._store_recurrence()
+        self._emit("recurring_rules_changed", self.recurrence.rules)
+        return rule
+
+    def add_recurring_task_from_master(self, task_text, start):
+        # マスターリストのattrの曜日ごと("Free"は平日)に、startから繰り返す
+        for t in self.task_master_list:
+            if t["text"] == task_text:
+                kind, weekday = rule_for_master_task(t)
+                return self.add_recurring_task(task_text, kind, start, weekday=weekday)
+        return None
+
+    def remove_recurring_rule(self, rule_id):
+        if self.recurrence.get_rule(rule_id) is None:
+            return
+        self._record_recurrence_undo()
+        self.recurrence.remove_rule(rule_id)
+        self._store_recurrence()
+        self._emit("recurring_rules_changed", self.recurrence.rules)
+
+    def end_recurring_rule(self, rule_id, date_str):
+        # date_str以降は繰り返さない(それより前の日は残す)
+        rule = self.recurrence.get_rule(rule_id)
+        if rule is None:
+            return
+        if date_str <= rule.start:
+            self.remove_recurring_rule(rule_id)
+            return
+        self._record_recurrence_undo()
+        rules = self.recurrence.rules_data()
+        for d in rules:
+            if d["id"] == rule_id:
+                d["end"] = previous_day(date_str)
+        self.recurrence.load(rules, self.recurrence.overrides_data())
+        self._store_recurrence()
+        self._emit("recurring_rules_changed", self.recurrence.rules)
+
+    # まとめて変更する操作(batch()で通知・保存は1回)
+    def close_working_tasks(self, start, end):
+        # start～end(両端含む)のWorkingのタスクをすべてClosedにする
+        count = 0
+        with self.batch():
+            d = date.fromisoformat(start)
+            last = date.fromisoformat(end)
+            while d <= last:
+                date_str = d.isoformat()
+                for i, t in enumerate(self.get_tasks(date_str)):
+                    if t.state_code == TaskState.Working:
+                        self._update_task(date_str, i, {"state": TaskState.Closed.name})
+                        count += 1
+                d += timedelta(days=1)
+        return count
+
+    def copy_day_to_weekdays(self, date_str):
+        # その日の予定(タスク名とattr_ratio)を同じ月の平日すべてに追加する(状態はPlanned)
+        entries = [(t.text, t.attr_ratio) for t in self.storage.get_day(date_str)]
+        first, last = month_range(date_str)
+        count = 0
+        with self.batch():
+            d = date.fromisoformat(first)
+            while d.isoformat() <= last:
+                if d.weekday() < 5 and d.isoformat() != date_str:
+                    count += len(self.add_tasks(d.isoformat(), entries))
+                d += timedelta(days=1)
+        return count
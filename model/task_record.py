@@ -0,0 +1,83 @@
+import sys
+from enum import IntEnum
+
+
+# タスク状態(保存時は名前の文字列、メモリ上は小さい整数)
+class TaskState(IntEnum):
+    Planned = 0
+    Working = 1
+    Closed = 2
+
+
+# 1件のカレンダータスク
+# __slots__で1件あたりのメモリを抑え、同じタスク名の文字列はinternで共有する
+# JSONとの互換のため task["text"] や dict(task) の形でも読み書きできる
+class Task:
+    __slots__ = ("text", "state_code", "attr_ratio")
+    FIELDS = ("text", "state", "attr_ratio")
+
+    def __init__(self, text, state="Planned", attr_ratio=None):
+        self.text = sys.intern(text)
+        self.state_code = to_state_code(state)
+        self.attr_ratio = attr_ratio
+
+    @property
+    def state(self):
+        return self.state_code.name
+
+    @state.setter
+    def state(self, value):
+        self.state_code = to_state_code(value)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["text"], d.get("state", "Planned"), d.get("attr_ratio"))
+
+    def to_dict(self):
+        return {"text": self.text, "state": self.state_code.name, "attr_ratio": self.attr_ratio}
+
+    # dict互換のアクセス
+    def keys(self):
+        return self.FIELDS
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        if key not in self.FIELDS:
+            return default
+        return getattr(self, key)
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def __eq__(self, other):
+        if not isinstance(other, Task):
+            return NotImplemented
+        return (self.text == other.text and self.state_code == other.state_code
+                and self.attr_ratio == other.attr_ratio)
+
+    def __repr__(self):
+        return f"Task({self.text!r}, {self.state!r}, {self.attr_ratio!r})"
+
+
+def to_state_code(state):
+    if isinstance(state, TaskState):
+        return state
+    if isinstance(state, int):
+        return TaskState(state)
+    # 未知の状態名はPlanned扱い
+    return TaskState.__members__.get(state, TaskState.Planned)
+
+
+def tasks_to_json(calendar_tasks):
+    # {date_str: [Task, ...]} → init.confに書ける形
+    return {d: [t.to_dict() for t in tasks] for d, tasks in calendar_tasks.items()}
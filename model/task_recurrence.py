@@ -0,0 +1,213 @@
+from datetime import date, timedelta
+from model.task_record import Task
+
+# 繰り返しタスク: ルールだけを保存し、表示・集計する日付の分だけその場で展開する
+# 日ごとの変更(状態・attr_ratio・その日だけ削除)は変更した日の分だけ保存する
+# 保存形式(init.conf):
+#   "recurring_rules": [{"id": "r1", "text": ..., "kind": "weekly", "interval": 1,
+#                        "weekday": 0, "start": "yyyy-MM-dd", "end": null, "attr_ratio": null}, ...]
+#   "recurring_overrides": {date_str: {rule_id: {"state": ..., "attr_ratio": ..., "skip": true}}}
+
+# ルールの種類
+RULE_WEEKLY = "weekly"      # weekday(0=月曜)の曜日ごと(intervalで隔週など)
+RULE_DAILY = "daily"        # start から interval 日ごと
+RULE_WEEKDAYS = "weekdays"  # 平日(月～金)
+RULE_KINDS = (RULE_WEEKLY, RULE_DAILY, RULE_WEEKDAYS)
+
+# マスターリストのattrと曜日("Free"は平日すべて)
+ATTR_WEEKDAYS = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4}
+
+OVERRIDE_FIELDS = ("state", "attr_ratio")
+
+
+# 展開したタスク(どのルールから作られたかを持つ)
+class RecurringTask(Task):
+    __slots__ = ("rule_id",)
+
+    def __init__(self, rule_id, text, state="Planned", attr_ratio=None):
+        super().__init__(text, state, attr_ratio)
+        self.rule_id = rule_id
+
+
+class RecurrenceRule:
+    __slots__ = ("rule_id", "text", "kind", "interval", "weekday", "start", "end", "attr_ratio",
+                 "_start_ordinal", "_end_ordinal")
+
+    def __init__(self, rule_id, text, kind, start, end=None, interval=1, weekday=None, attr_ratio=None):
+        if kind not in RULE_KINDS:
+            raise ValueError(f"unknown rule kind: {kind}")
+        self.rule_id = rule_id
+        self.text = text
+        self.kind = kind
+        self.interval = max(int(interval or 1), 1)
+        start_date = date.fromisoformat(start)
+        if kind == RULE_WEEKLY and weekday is None:
+            weekday = start_date.weekday()
+        self.weekday = weekday
+        self.start = start
+        self.end = end
+        self.attr_ratio = attr_ratio
+        self._start_ordinal = start_date.toordinal()
+        self._end_ordinal = date.fromisoformat(end).toordinal() if end else None
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["id"], d["text"], d["kind"], d["start"], d.get("end"), d.get("interval", 1),
+                   d.get("weekday"), d.get("attr_ratio"))
+
+    def to_dict(self):
+        return {"id": self.rule_id, "text": self.text, "kind": self.kind, "interval": self.interval,
+                "weekday": self.weekday, "start": self.start, "end": self.end, "attr_ratio": self.attr_ratio}
+
+    def occurs_on(self, ordinal):
+        if ordinal < self._start_ordinal or (self._end_ordinal is not None and ordinal > self._end_ordinal):
+            return False
+        days = ordinal - self._start_ordinal
+        weekday = (ordinal - 1) % 7  # date.fromordinal(1)は月曜日
+        if self.kind == RULE_WEEKLY:
+            return weekday == self.weekday and (days // 7) % self.interval == 0
+        if self.kind == RULE_DAILY:
+            return days % self.interval == 0
+        return weekday < 5
+
+    def ordinals(self, start, end):
+        # start～end(日序数・両端含む)の発生日を順に返す(該当しない日は飛ばす)
+        lo = max(start, self._start_ordinal)
+        hi = end if self._end_ordinal is None else min(end, self._end_ordinal)
+        if self.kind == RULE_WEEKDAYS:
+            for o in range(lo, hi + 1):
+                if (o - 1) % 7 < 5:
+                    yield o
+            return
+        if self.kind == RULE_WEEKLY:
+            first = self._start_ordinal + (self.weekday - (self._start_ordinal - 1) % 7) % 7
+            step = 7 * self.interval
+        else:
+            first = self._start_ordinal
+            step = self.interval
+        if lo > first:
+            first += -(-(lo - first) // step) * step
+        yield from range(first, hi + 1, step)
+
+
+class RecurrenceSet:
+    def __init__(self):
+        self.rules = []  # [RecurrenceRule, ...] (表示順)
+        self.overrides = {}  # {date_str: {rule_id: {...}}}
+        self._next_id = 1
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def load(self, rules, overrides):
+        # init.conf形式から読み込む(存在しないルールの上書きは捨てる)
+        self.rules = []
+        for d in rules or ():
+            try:
+                self.rules.append(RecurrenceRule.from_dict(d))
+            except (KeyError, ValueError):
+                pass
+        ids = {r.rule_id for r in self.rules}
+        self.overrides = {}
+        for date_str, by_rule in (overrides or {}).items():
+            kept = {rule_id: dict(o) for rule_id, o in by_rule.items() if rule_id in ids}
+            if kept:
+                self.overrides[date_str] = kept
+        self._next_id = 1 + max((int(i[1:]) for i in ids if i[1:].isdigit()), default=0)
+
+    def rules_data(self):
+        return [r.to_dict() for r in self.rules]
+
+    def overrides_data(self, date_str=None):
+        if date_str is not None:
+            return {rule_id: dict(o) for rule_id, o in self.overrides.get(date_str, {}).items()}
+        return {d: {rule_id: dict(o) for rule_id, o in by_rule.items()} for d, by_rule in self.overrides.items()}
+
+    def get_rule(self, rule_id):
+        for rule in self.rules:
+            if rule.rule_id == rule_id:
+                return rule
+        return None
+
+    def add_rule(self, text, kind, start, end=None, interval=1, weekday=None, attr_ratio=None):
+        rule = RecurrenceRule(f"r{self._next_id}", text, kind, start, end, interval, weekday, attr_ratio)
+        self._next_id += 1
+        self.rules.append(rule)
+        return rule
+
+    def remove_rule(self, rule_id):
+        # ルールとその上書きを削除し、上書きのあった日付を返す
+        self.rules = [r for r in self.rules if r.rule_id != rule_id]
+        dates = []
+        for date_str in list(self.overrides):
+            by_rule = self.overrides[date_str]
+            if by_rule.pop(rule_id, None) is not None:
+                dates.append(date_str)
+                if not by_rule:
+                    del self.overrides[date_str]
+        return dates
+
+    def tasks_for(self, date_str):
+        # その日に発生するタスク(上書きを反映済み、削除された日は含めない)
+        if not self.rules:
+            return []
+        ordinal = date.fromisoformat(date_str).toordinal()
+        by_rule = self.overrides.get(date_str, {})
+        tasks = []
+        for rule in self.rules:
+            if rule.occurs_on(ordinal):
+                override = by_rule.get(rule.rule_id)
+                if override is None:
+                    tasks.append(RecurringTask(rule.rule_id, rule.text, "Planned", rule.attr_ratio))
+                elif not override.get("skip"):
+                    tasks.append(RecurringTask(rule.rule_id, rule.text, override.get("state", "Planned"),
+                                               override.get("attr_ratio", rule.attr_ratio)))
+        return tasks
+
+    def occurrences(self, start, end):
+        # start～end(両端含む)の (date_str, RecurringTask) を日付順に返す
+        lo = date.fromisoformat(start).toordinal()
+        hi = date.fromisoformat(end).toordinal()
+        ordinals = set()
+        for rule in self.rules:
+            ordinals.update(rule.ordinals(lo, hi))
+        for o in sorted(ordinals):
+            date_str = date.fromordinal(o).isoformat()
+            for task in self.tasks_for(date_str):
+                yield date_str, task
+
+    def get_override(self, date_str, rule_id):
+        o = self.overrides.get(date_str, {}).get(rule_id)
+        return dict(o) if o is not None else None
+
+    def set_override(self, date_str, rule_id, override):
+        # override: Noneなら上書きを消す(ルール通りに戻す)
+        if override:
+            self.overrides.setdefault(date_str, {})[rule_id] = dict(override)
+        else:
+            by_rule = self.overrides.get(date_str)
+            if by_rule is not None:
+                by_rule.pop(rule_id, None)
+                if not by_rule:
+                    del self.overrides[date_str]
+
+    def update_occurrence(self, date_str, rule_id, fields):
+        override = self.overrides.get(date_str, {}).get(rule_id, {})
+        override = dict(override)
+        override.update({k: v for k, v in fields.items() if k in OVERRIDE_FIELDS})
+        self.set_override(date_str, rule_id, override)
+
+    def skip_occurrence(self, date_str, rule_id):
+        self.set_override(date_str, rule_id, {"skip": True})
+
+
+def rule_for_master_task(master_task):
+    # マスターリストのattrから (kind, weekday) を決める: 曜日ならその曜日ごと、"Free"は平日
+    weekday = ATTR_WEEKDAYS.get(master_task.get("attr"))
+    if weekday is None:
+        return RULE_WEEKDAYS, None
+    return RULE_WEEKLY, weekday
+
+
+def previous_day(date_str):
+    return (date.fromisoformat(date_str) - timedelta(days=1)).isoformat()
@@ -0,0 +1,191 @@
+import re
+from functools import lru_cache
+from bisect import bisect_left, insort
+from model.task_events import TaskModelListener
+from model.task_record import to_state_code
+
+# タスク名の全文検索(転置インデックス)
+# トークン → {date_str: 件数} を持ち、Modelの変更通知で変わった日だけを差し替える
+# 前方一致はソート済みのトークン一覧を二分探索する
+# 初めて検索したときに全日付を走査して作る(起動時には作らない)
+TOKEN_PATTERN = re.compile(r"\w+")
+# 検索結果の既定の上限
+DEFAULT_LIMIT = 500
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+@lru_cache(maxsize=65536)
+def index_terms(text):
+    # 同じタスク名は何度も出てくるので結果を使い回す(frozensetを返す)
+    # 日本語は単語の区切りがないので、ASCII以外を含むトークンは接尾辞もすべて登録する
+    # (接尾辞の前方一致 = 部分一致 になる。タスク名は短いので数は少ない)
+    terms = set()
+    for token in tokenize(text):
+        terms.add(token)
+        if not token.isascii():
+            terms.update(token[i:] for i in range(1, len(token)))
+    return frozenset(terms)
+
+
+# 検索結果の1件
+class SearchHit:
+    __slots__ = ("date_str", "index", "task")
+
+    def __init__(self, date_str, index, task):
+        self.date_str = date_str
+        self.index = index  # get_tasks(date_str) での位置
+        self.task = task
+
+    def __repr__(self):
+        return f"SearchHit({self.date_str!r}, {self.index}, {self.task!r})"
+
+
+class TaskSearchIndex(TaskModelListener):
+    def __init__(self, model):
+        self.model = model
+        self.built = False
+        self._postings = {}  # {token: {date_str: 件数}}
+        self._day_tokens = {}  # {date_str: {token: 件数}} 差し替え用
+        self._tokens = []  # ソート済みのトークン(前方一致用)
+
+    def build(self):
+        self._postings = {}
+        self._day_tokens = {}
+        self._tokens = []
+        for date_str, tasks in self.model.storage.iter_days():
+            self._index_day(date_str, tasks)
+        self.built = True
+
+    def _ensure_built(self):
+        if not self.built:
+            self.build()
+
+    def _index_day(self, date_str, tasks):
+        # その日のトークンを数え直し、差分だけを転置インデックスに反映する
+        counts = {}
+        for t in tasks:
+            for token in index_terms(t.text):
+                counts[token] = counts.get(token, 0) + 1
+        old = self._day_tokens.pop(date_str, {})
+        for token in old.keys() - counts.keys():
+            dates = self._postings[token]
+            del dates[date_str]
+            if not dates:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+        for token, n in counts.items():
+            dates = self._postings.get(token)
+            if dates is None:
+                dates = self._postings[token] = {}
+                insort(self._tokens, token)
+            dates[date_str] = n
+        if counts:
+            self._day_tokens[date_str] = counts
+
+    def _refresh(self, date_str):
+        if self.built:
+            self._index_day(date_str, self.model.storage.get_day(date_str))
+
+    def _dates_for(self, token, prefix):
+        # tokenを含む日付の集合(prefixなら前方一致するトークンすべて)
+        if not prefix:
+            return set(self._postings.get(token, ()))
+        dates = set()
+        i = bisect_left(self._tokens, token)
+        while i < len(self._tokens) and self._tokens[i].startswith(token):
+            dates.update(self._postings[self._tokens[i]])
+            i += 1
+        return dates
+
+    def candidate_dates(self, query, prefix=True):
+        # すべての語を含むタスクがありうる日付(ソート済み)
+        # 最後の語だけ前方一致にする(入力途中でも候補が出るように)
+        self._ensure_built()
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        dates = None
+        for i, token in enumerate(tokens):
+            found = self._dates_for(token, prefix and i == len(tokens) - 1)
+            dates = found if dates is None else dates & found
+            if not dates:
+                return []
+        return sorted(dates)
+
+    def search(self, query, state=None, start=None, end=None, limit=DEFAULT_LIMIT, prefix=True):
+        # 検索語(空白区切り、すべてを含む)・状態・日付範囲(両端含む)で絞り込み、日付順に返す
+        # 繰り返しタスクは日付範囲を指定したときだけ、その範囲を展開して含める
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        state_code = to_state_code(state) if state else None
+        matches = _matcher(tokens, prefix)
+        dates = [d for d in self.candidate_dates(query, prefix)
+                 if (start is None or d >= start) and (end is None or d <= end)]
+        if start is not None and end is not None:
+            rule_texts = [r.text for r in self.model.get_recurring_rules() if matches(r.text)]
+            if rule_texts:
+                dates = sorted(set(dates) | {d for d, t in self.model.get_occurrences(start, end)
+                                             if t.text in rule_texts})
+        hits = []
+        for date_str in dates:
+            for i, t in enumerate(self.model.get_tasks(date_str)):
+                if (state_code is None or t.state_code == state_code) and matches(t.text):
+                    hits.append(SearchHit(date_str, i, t))
+                    if len(hits) >= limit:
+                        return hits
+        return hits
+
+    def suggest(self, prefix, limit=20):
+        # 前方一致するトークン(入力補完用)
+        self._ensure_built()
+        prefix = prefix.lower()
+        i = bisect_left(self._tokens, prefix)
+        result = []
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix) and len(result) < limit:
+            result.append(self._tokens[i])
+            i += 1
+        return result
+
+    # TaskModelListener
+    def task_added(self, date_str, index, task):
+        self._refresh(date_str)
+
+    def task_removed(self, date_str, index, task):
+        self._refresh(date_str)
+
+    def task_updated(self, date_str, index, fields):
+        if "text" in fields:
+            self._refresh(date_str)
+
+    def days_loaded(self, date_strs):
+        for date_str in date_strs:
+            self._refresh(date_str)
+
+    def batch_committed(self, changes):
+        for date_str in changes.task_dates:
+            self._refresh(date_str)
+
+
+def _matcher(tokens, prefix):
+    # タスク名がすべての語を含むか(最後の語は前方一致)
+    # 同じタスク名が何度も出てくるので、タスク名ごとの結果を覚えておく
+    head, last = set(tokens[:-1]), tokens[-1]
+    cache = {}
+
+    def matches(text):
+        result = cache.get(text)
+        if result is None:
+            words = index_terms(text)
+            if not head.issubset(words):
+                result = False
+            elif prefix:
+                result = any(w.startswith(last) for w in words)
+            else:
+                result = last in words
+            cache[text] = result
+        return result
+    return matches
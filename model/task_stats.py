@@ -0,0 +1,248 @@
+from array import array
+from datetime import date, timedelta
+from model.task_events import TaskModelListener
+from model.task_record import TaskState
+from model.date_keys import to_ordinal, month_key, month_range
+
+# 日ごとの集計値(チャンネル)
+HOURS = 0
+STATE_BASE = 1  # STATE_BASE + TaskState
+RATIO_SUM = STATE_BASE + len(TaskState)
+RATIO_COUNT = RATIO_SUM + 1
+CHANNEL_COUNT = RATIO_COUNT + 1
+
+
+class FenwickTree:
+    # 1点加算・累積和がO(log n)の配列
+    def __init__(self, size):
+        self.tree = array("d", bytes(8 * (size + 1)))
+
+    def add(self, i, delta):
+        i += 1
+        n = len(self.tree)
+        while i < n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, i):
+        # [0, i) の合計
+        total = 0.0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+# 日序数で引く複数チャンネルの累積和
+# 範囲外の日付が来たら容量を倍にして作り直す
+class DaySeries:
+    def __init__(self, channels, capacity=4096):
+        self.channels = channels
+        self.capacity = capacity
+        self.base = None
+        self._trees = [FenwickTree(capacity) for _ in range(channels)]
+        self._values = {}  # {ordinal: [値, ...]} 作り直し用
+
+    def _ensure(self, ordinal):
+        if self.base is None:
+            self.base = ordinal - self.capacity // 2
+        if self.base <= ordinal < self.base + self.capacity:
+            return
+        lo = min([ordinal] + list(self._values))
+        hi = max([ordinal] + list(self._values))
+        while self.capacity <= hi - lo + 1:
+            self.capacity *= 2
+        self.base = lo - (self.capacity - (hi - lo + 1)) // 2
+        self._trees = [FenwickTree(self.capacity) for _ in range(self.channels)]
+        for o, values in self._values.items():
+            for c, v in enumerate(values):
+                if v:
+                    self._trees[c].add(o - self.base, v)
+
+    def add(self, ordinal, deltas):
+        self._ensure(ordinal)
+        values = self._values.setdefault(ordinal, [0.0] * self.channels)
+        for c, delta in enumerate(deltas):
+            if delta:
+                values[c] += delta
+                self._trees[c].add(ordinal - self.base, delta)
+        if not any(values):
+            del self._values[ordinal]
+
+    def range_sum(self, start, end):
+        # start～end(両端含む)の各チャンネル合計
+        if self.base is None:
+            return [0.0] * self.channels
+        lo = max(start - self.base, 0)
+        hi = min(end - self.base + 1, self.capacity)
+        if lo >= hi:
+            return [0.0] * self.channels
+        return [t.prefix_sum(hi) - t.prefix_sum(lo) for t in self._trees]
+
+
+# 集計エンジン: Modelのリスナーとして変更のあった日だけを再集計し、
+# 差分を累積和に反映する(範囲の合計はO(log n))
+# 月単位で、クエリされた範囲の月だけを初回に集計する(全履歴を起動時に走査しない)
+class TaskStatsIndex(TaskModelListener):
+    def __init__(self, model):
+        self.model = model
+        self.rebuild()
+
+    def rebuild(self):
+        self.series = DaySeries(CHANNEL_COUNT)
+        self._day_vectors = {}  # {ordinal: [チャンネル値]} (タスク由来のみ)
+        self._day_ratios = {}  # {ordinal: {text: (ratio_sum, count)}}
+        self._month_ratios = {}  # {"yyyy-MM": {text: [ratio_sum, count]}}
+        self._indexed_months = set()
+
+    def _ensure_range(self, start, end):
+        d = date.fromisoformat(start).replace(day=1)
+        last = date.fromisoformat(end)
+        while d <= last:
+            key = d.isoformat()[:7]
+            nxt = (d + timedelta(days=32)).replace(day=1)
+            if key not in self._indexed_months:
+                self._indexed_months.add(key)
+                # データのある日だけを範囲で取り出す
+                month_start, month_end = month_range(d.isoformat())
+                for date_str, tasks in self.model.iter_days(month_start, month_end):
+                    self._refresh_day(date_str, tasks)
+                for date_str, hours in self.model.get_work_hours_range(month_start, month_end).items():
+                    if hours:
+                        self.series.add(to_ordinal(date_str), [hours] + [0.0] * (CHANNEL_COUNT - 1))
+            d = nxt
+
+    def _is_indexed(self, date_str):
+        return month_key(date_str) in self._indexed_months
+
+    def _refresh_day(self, date_str, tasks):
+        ordinal = to_ordinal(date_str)
+        vector = [0.0] * CHANNEL_COUNT
+        ratios = {}
+        for t in tasks:
+            vector[STATE_BASE + t.state_code] += 1
+            if t.attr_ratio is not None:
+                vector[RATIO_SUM] += t.attr_ratio
+                vector[RATIO_COUNT] += 1
+                s, n = ratios.get(t.text, (0.0, 0))
+                ratios[t.text] = (s + t.attr_ratio, n + 1)
+        old = self._day_vectors.get(ordinal, [0.0] * CHANNEL_COUNT)
+        self.series.add(ordinal, [v - o for v, o in zip(vector, old)])
+        if any(vector):
+            self._day_vectors[ordinal] = vector
+        else:
+            self._day_vectors.pop(ordinal, None)
+        # タスク名ごとのattr_ratioは月単位の小計に反映
+        month = self._month_ratios.setdefault(month_key(date_str), {})
+        for text, (s, n) in self._day_ratios.pop(ordinal, {}).items():
+            entry = month[text]
+            entry[0] -= s
+            entry[1] -= n
+            if entry[1] == 0:
+                del month[text]
+        for text, (s, n) in ratios.items():
+            entry = month.setdefault(text, [0.0, 0])
+            entry[0] += s
+            entry[1] += n
+        if ratios:
+            self._day_ratios[ordinal] = ratios
+
+    # TaskModelListener (まだ集計していない月の変更は、集計時に反映されるので無視)
+    def task_added(self, date_str, index, task):
+        if self._is_indexed(date_str):
+            self._refresh_day(date_str, self.model.get_tasks(date_str))
+
+    def task_removed(self, date_str, index, task):
+        if self._is_indexed(date_str):
+            self._refresh_day(date_str, self.model.get_tasks(date_str))
+
+    def task_updated(self, date_str, index, fields):
+        if self._is_indexed(date_str):
+            self._refresh_day(date_str, self.model.get_tasks(date_str))
+
+    def work_hours_changed(self, date_str, hours):
+        if not self._is_indexed(date_str):
+            return
+        ordinal = to_ordinal(date_str)
+        old = self.series.range_sum(ordinal, ordinal)[HOURS]
+        self.series.add(ordinal, [(hours or 0.0) - old] + [0.0] * (CHANNEL_COUNT - 1))
+
+    def days_loaded(self, date_strs):
+        for date_str in date_strs:
+            if self._is_indexed(date_str):
+                self._refresh_day(date_str, self.model.get_tasks(date_str))
+                self.work_hours_changed(date_str, self.model.get_work_hours(date_str))
+
+    def recurring_rules_changed(self, rules):
+        # 繰り返しタスクは集計する月を展開したときに数えるので、集計済みの月を捨てる
+        self.rebuild()
+
+    def recurrence_loaded(self):
+        self.rebuild()
+
+    def batch_committed(self, changes):
+        if changes.recurring_rules_changed:
+            self.rebuild()
+            return
+        for date_str in changes.task_dates:
+            if self._is_indexed(date_str):
+                self._refresh_day(date_str, self.model.get_tasks(date_str))
+        for date_str in changes.work_hours_dates:
+            self.work_hours_changed(date_str, self.model.get_work_hours(date_str))
+
+    # 集計クエリ(日付は "yyyy-MM-dd"、両端を含む)
+    def summary(self, start, end):
+        self._ensure_range(start, end)
+        values = self.series.range_sum(to_ordinal(start), to_ordinal(end))
+        result = {"hours": values[HOURS]}
+        for state in TaskState:
+            result[state.name] = int(round(values[STATE_BASE + state]))
+        result["avg_ratio"] = values[RATIO_SUM] / values[RATIO_COUNT] if values[RATIO_COUNT] else None
+        return result
+
+    def total_hours(self, start, end):
+        return self.summary(start, end)["hours"]
+
+    def state_counts(self, start, end):
+        s = self.summary(start, end)
+        return {state.name: s[state.name] for state in TaskState}
+
+    def rollup(self, start, end, period="week"):
+        # 週("week": 月曜始まり)または月("month")ごとの集計 [(期間の初日, summary), ...]
+        result = []
+        d = date.fromisoformat(start)
+        last = date.fromisoformat(end)
+        while d <= last:
+            if period == "month":
+                nxt = (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+            else:
+                nxt = d + timedelta(days=7 - d.weekday())
+            chunk_end = min(nxt - timedelta(days=1), last)
+            result.append((d.isoformat(), self.summary(d.isoformat(), chunk_end.isoformat())))
+            d = nxt
+        return result
+
+    def average_ratio_by_task(self, start, end):
+        # タスク名ごとの平均attr_ratio
+        # 範囲に完全に含まれる月は月の小計、端の月は日ごとの値を足す
+        self._ensure_range(start, end)
+        totals = {}
+
+        def add(ratios):
+            for text, (s, n) in ratios:
+                entry = totals.setdefault(text, [0.0, 0])
+                entry[0] += s
+                entry[1] += n
+
+        start_o, end_o = to_ordinal(start), to_ordinal(end)
+        d = date.fromisoformat(start).replace(day=1)
+        while d.toordinal() <= end_o:
+            nxt = (d + timedelta(days=32)).replace(day=1)
+            m_start, m_end = d.toordinal(), nxt.toordinal() - 1
+            if start_o <= m_start and m_end <= end_o:
+                add((text, tuple(v)) for text, v in self._month_ratios.get(d.isoformat()[:7], {}).items())
+            else:
+                for o in range(max(m_start, start_o), min(m_end, end_o) + 1):
+                    add(self._day_ratios.get(o, {}).items())
+            d = nxt
+        return {text: s / n for text, (s, n) in totals.items() if n}
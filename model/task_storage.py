@@ -0,0 +1,400 @@
+import json
+import sqlite3
+from contextlib import nullcontext
+from abc import ABC, abstractmethod
+from model.task_record import Task, tasks_to_json
+from model.task_index import TextIndexedList
+from model.date_keys import to_ordinal, from_ordinal, ordinal_bounds, valid_date_keys, SortedDayIndex
+
+
+# タスクデータの保存先を差し替えられるようにする(TaskModelから利用)
+class TaskStorage(ABC):
+    @abstractmethod
+    def get_day(self, date_str):
+        # TextIndexedList([Task, ...]) を返す
+        pass
+
+    @abstractmethod
+    def insert_task(self, date_str, index, task):
+        pass
+
+    def insert_tasks(self, date_str, index, tasks):
+        for i, task in enumerate(tasks):
+            self.insert_task(date_str, index + i, task)
+
+    @abstractmethod
+    def remove_task(self, date_str, index):
+        pass
+
+    @abstractmethod
+    def update_task(self, date_str, index, fields):
+        pass
+
+    @abstractmethod
+    def get_work_hours(self, date_str):
+        pass
+
+    @abstractmethod
+    def set_work_hours(self, date_str, hours):
+        pass
+
+    @abstractmethod
+    def remove_work_hours(self, date_str):
+        pass
+
+    @abstractmethod
+    def iter_days(self, start=None, end=None):
+        # (date_str, [task, ...]) を日付順に返す(start～end 両端含む、Noneは制限なし)
+        pass
+
+    @abstractmethod
+    def iter_work_hours(self, start=None, end=None):
+        # (date_str, hours) を日付順に返す
+        pass
+
+    def all_work_hours(self):
+        # {date_str: hours}
+        return dict(self.iter_work_hours())
+
+    @abstractmethod
+    def get_master_list(self):
+        pass
+
+    @abstractmethod
+    def set_master_list(self, task_master_list):
+        pass
+
+    @abstractmethod
+    def get_recurrence(self):
+        # 繰り返しタスク {"rules": [...], "overrides": {date_str: {rule_id: {...}}}}
+        pass
+
+    @abstractmethod
+    def set_recurrence(self, recurrence):
+        pass
+
+    def get_tasks_by_state(self, state):
+        # [(date_str, index, task), ...]
+        return [(date_str, i, t)
+                for date_str, tasks in self.iter_days()
+                for i, t in enumerate(tasks) if t.state == state]
+
+    def load_data(self, calendar_tasks, work_hours):
+        # init.conf形式のデータを取り込む(既存データは置き換え)
+        self.clear()
+        for date_str, tasks in calendar_tasks.items():
+            for i, t in enumerate(tasks):
+                self.insert_task(date_str, i, Task.from_dict(t))
+        for date_str, hours in work_hours.items():
+            self.set_work_hours(date_str, hours)
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def begin_batch(self):
+        # TaskModel.batch() の開始と終了(書き込みをまとめられる保存先だけが使う)
+        pass
+
+    def end_batch(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# 従来通りすべてメモリ上のdictで保持
+# キーは日序数(int)、日付の範囲はソート済みのキーからbisectで取り出す
+class MemoryTaskStorage(TaskStorage):
+    def __init__(self):
+        self._days = {}  # {ordinal: TextIndexedList([Task, ...])}
+        self._hours = {}  # {ordinal: hours(float)}
+        self._day_keys = SortedDayIndex()
+        self._hour_keys = SortedDayIndex()
+        self.task_master_list = []
+        self.recurrence = {"rules": [], "overrides": {}}
+
+    def get_day(self, date_str):
+        day = self._days.get(to_ordinal(date_str))
+        return day if day is not None else TextIndexedList()
+
+    def _day_for_write(self, date_str):
+        ordinal = to_ordinal(date_str)
+        day = self._days.get(ordinal)
+        if day is None:
+            day = self._days[ordinal] = TextIndexedList()
+            self._day_keys.add(ordinal)
+        return day
+
+    def insert_task(self, date_str, index, task):
+        self._day_for_write(date_str).insert(index, task)
+
+    def insert_tasks(self, date_str, index, tasks):
+        if not tasks:
+            return
+        day = self._day_for_write(date_str)
+        if index == len(day):
+            day.extend(tasks)
+        else:
+            for i, task in enumerate(tasks):
+                day.insert(index + i, task)
+
+    def remove_task(self, date_str, index):
+        ordinal = to_ordinal(date_str)
+        day = self._days[ordinal]
+        del day[index]
+        # タスクのなくなった日はキーごと消す(範囲の取り出し・保存に空の日を出さない)
+        if not day:
+            del self._days[ordinal]
+            self._day_keys.discard(ordinal)
+
+    def update_task(self, date_str, index, fields):
+        day = self._days[to_ordinal(date_str)]
+        if "text" in fields:
+            # タスク名の集合も更新する
+            day.rename(index, fields["text"])
+        day[index].update({k: v for k, v in fields.items() if k != "text"})
+
+    def get_work_hours(self, date_str):
+        return self._hours.get(to_ordinal(date_str), None)
+
+    def set_work_hours(self, date_str, hours):
+        ordinal = to_ordinal(date_str)
+        if ordinal not in self._hours:
+            self._hour_keys.add(ordinal)
+        self._hours[ordinal] = hours
+
+    def remove_work_hours(self, date_str):
+        ordinal = to_ordinal(date_str)
+        if self._hours.pop(ordinal, None) is not None:
+            self._hour_keys.discard(ordinal)
+
+    def iter_days(self, start=None, end=None):
+        for ordinal in self._day_keys.range(*ordinal_bounds(start, end)):
+            yield from_ordinal(ordinal), self._days[ordinal]
+
+    def iter_work_hours(self, start=None, end=None):
+        for ordinal in self._hour_keys.range(*ordinal_bounds(start, end)):
+            yield from_ordinal(ordinal), self._hours[ordinal]
+
+    def get_master_list(self):
+        return self.task_master_list
+
+    def set_master_list(self, task_master_list):
+        self.task_master_list = task_master_list
+
+    def get_recurrence(self):
+        return self.recurrence
+
+    def set_recurrence(self, recurrence):
+        self.recurrence = recurrence
+
+    def load_data(self, calendar_tasks, work_hours):
+        # JSONから読んだdictをTaskに変換して保持(日付はここで日序数にする)
+        # 日付として読めないキーは読み込み全体を止めずに無視する
+        self._days = {to_ordinal(d): TextIndexedList(Task.from_dict(t) for t in tasks)
+                      for d, tasks in valid_date_keys(calendar_tasks).items() if tasks}
+        self._hours = {to_ordinal(d): hours for d, hours in valid_date_keys(work_hours).items()}
+        self._day_keys = SortedDayIndex(self._days)
+        self._hour_keys = SortedDayIndex(self._hours)
+
+    def clear(self):
+        self._days = {}
+        self._hours = {}
+        self._day_keys.clear()
+        self._hour_keys.clear()
+
+
+# SQLiteに保存: 日付・状態にインデックスを張り、変更した行だけを書き込む
+class SqliteTaskStorage(TaskStorage):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            date TEXT NOT NULL,
+            pos INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            state TEXT NOT NULL,
+            attr_ratio REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks (date, pos);
+        CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, date);
+        CREATE TABLE IF NOT EXISTS work_hours (
+            date TEXT PRIMARY KEY,
+            hours REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS task_master (
+            pos INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            attr TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS recurrence (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            data TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._batch_depth = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def _transaction(self):
+        # batch中はコミットせず、end_batchでまとめて1回コミットする
+        return nullcontext() if self._batch_depth else self.conn
+
+    def begin_batch(self):
+        self._batch_depth += 1
+
+    def end_batch(self):
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.conn.commit()
+
+    @staticmethod
+    def _row_to_task(row):
+        return Task(row[0], row[1], row[2])
+
+    def get_day(self, date_str):
+        rows = self.conn.execute(
+            "SELECT text, state, attr_ratio FROM tasks WHERE date = ? ORDER BY pos", (date_str,))
+        return TextIndexedList(self._row_to_task(r) for r in rows)
+
+    def insert_task(self, date_str, index, task):
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET pos = pos + 1 WHERE date = ? AND pos >= ?", (date_str, index))
+            self.conn.execute(
+                "INSERT INTO tasks (date, pos, text, state, attr_ratio) VALUES (?, ?, ?, ?, ?)",
+                (date_str, index, task.text, task.state, task.attr_ratio))
+
+    def insert_tasks(self, date_str, index, tasks):
+        # 1トランザクションでまとめて追加
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET pos = pos + ? WHERE date = ? AND pos >= ?", (len(tasks), date_str, index))
+            self.conn.executemany(
+                "INSERT INTO tasks (date, pos, text, state, attr_ratio) VALUES (?, ?, ?, ?, ?)",
+                [(date_str, index + i, t.text, t.state, t.attr_ratio) for i, t in enumerate(tasks)])
+
+    def remove_task(self, date_str, index):
+        with self._transaction():
+            self.conn.execute("DELETE FROM tasks WHERE date = ? AND pos = ?", (date_str, index))
+            self.conn.execute(
+                "UPDATE tasks SET pos = pos - 1 WHERE date = ? AND pos > ?", (date_str, index))
+
+    def update_task(self, date_str, index, fields):
+        columns = [k for k in Task.FIELDS if k in fields]
+        if not columns:
+            return
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        with self._transaction():
+            self.conn.execute(
+                f"UPDATE tasks SET {assignments} WHERE date = ? AND pos = ?",
+                [fields[c] for c in columns] + [date_str, index])
+
+    def get_work_hours(self, date_str):
+        row = self.conn.execute("SELECT hours FROM work_hours WHERE date = ?", (date_str,)).fetchone()
+        return row[0] if row else None
+
+    def set_work_hours(self, date_str, hours):
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO work_hours (date, hours) VALUES (?, ?)", (date_str, hours))
+
+    def remove_work_hours(self, date_str):
+        with self._transaction():
+            self.conn.execute("DELETE FROM work_hours WHERE date = ?", (date_str,))
+
+    @staticmethod
+    def _date_range(start, end):
+        # "yyyy-MM-dd" は文字列の順序が日付の順序と同じなので、dateのインデックスで範囲検索できる
+        return ("" if start is None else start), ("9999-99-99" if end is None else end)
+
+    def iter_days(self, start=None, end=None):
+        # 1日分ずつ読み出す(全履歴をメモリに載せない)
+        dates = [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT date FROM tasks WHERE date BETWEEN ? AND ? ORDER BY date", self._date_range(start, end))]
+        for date_str in dates:
+            yield date_str, self.get_day(date_str)
+
+    def iter_work_hours(self, start=None, end=None):
+        return iter(self.conn.execute(
+            "SELECT date, hours FROM work_hours WHERE date BETWEEN ? AND ? ORDER BY date", self._date_range(start, end)
+        ).fetchall())
+
+    def get_tasks_by_state(self, state):
+        rows = self.conn.execute(
+            "SELECT date, pos, text, state, attr_ratio FROM tasks WHERE state = ? ORDER BY date, pos",
+            (state,))
+        return [(r[0], r[1], self._row_to_task(r[2:])) for r in rows]
+
+    def get_master_list(self):
+        rows = self.conn.execute("SELECT text, attr FROM task_master ORDER BY pos")
+        return [{"text": r[0], "attr": r[1]} for r in rows]
+
+    def set_master_list(self, task_master_list):
+        with self._transaction():
+            self.conn.execute("DELETE FROM task_master")
+            self.conn.executemany(
+                "INSERT INTO task_master (pos, text, attr) VALUES (?, ?, ?)",
+                [(i, t["text"], t["attr"]) for i, t in enumerate(task_master_list)])
+
+    def get_recurrence(self):
+        # ルールと上書きは小さいので1行のJSONで持つ
+        row = self.conn.execute("SELECT data FROM recurrence WHERE id = 0").fetchone()
+        return json.loads(row[0]) if row else {"rules": [], "overrides": {}}
+
+    def set_recurrence(self, recurrence):
+        with self._transaction():
+            self.conn.execute("INSERT OR REPLACE INTO recurrence (id, data) VALUES (0, ?)",
+                              (json.dumps(recurrence, ensure_ascii=False),))
+
+    def load_data(self, calendar_tasks, work_hours):
+        # 1トランザクションでまとめて取り込む
+        with self._transaction():
+            self.conn.execute("DELETE FROM tasks")
+            self.conn.execute("DELETE FROM work_hours")
+            self.conn.executemany(
+                "INSERT INTO tasks (date, pos, text, state, attr_ratio) VALUES (?, ?, ?, ?, ?)",
+                [(d, i, t["text"], t.get("state", "Planned"), t.get("attr_ratio"))
+                 for d, tasks in calendar_tasks.items() for i, t in enumerate(tasks)])
+            self.conn.executemany(
+                "INSERT INTO work_hours (date, hours) VALUES (?, ?)", list(work_hours.items()))
+
+    def is_empty(self):
+        for table in ("tasks", "work_hours", "task_master"):
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return False
+        return True
+
+    def clear(self):
+        with self._transaction():
+            self.conn.execute("DELETE FROM tasks")
+            self.conn.execute("DELETE FROM work_hours")
+
+    def close(self):
+        self.conn.close()
+
+
+def import_conf_data(storage, data):
+    # init.conf(JSON)の内容をストレージに取り込む(移行用)
+    storage.load_data(data.get("calendar_tasks", {}), data.get("work_hours", {}))
+    if "task_master_list" in data:
+        storage.set_master_list(data["task_master_list"])
+    if "recurring_rules" in data:
+        storage.set_recurrence({"rules": data["recurring_rules"],
+                                "overrides": data.get("recurring_overrides", {})})
+
+
+def export_conf_data(storage):
+    # ストレージの内容をinit.conf(JSON)形式で返す(移行用)
+    recurrence = storage.get_recurrence()
+    return {
+        "task_master_list": storage.get_master_list(),
+        "calendar_tasks": tasks_to_json({d: tasks for d, tasks in storage.iter_days()}),
+        "work_hours": dict(storage.all_work_hours()),
+        "recurring_rules": recurrence["rules"],
+        "recurring_overrides": recurrence["overrides"],
+    }
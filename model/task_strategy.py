@@ -1,16 +1,38 @@
 from abc import ABC, abstractmethod
 
 # Strategyパターン: タスク追加方法の切り替え
+# task_listはTextIndexedList(タスク名の集合を持つ)を受け取る
 class TaskAddStrategy(ABC):
     @abstractmethod
-    def add_task(self, task_list, task):
+    def accepts(self, task_list, task):
         pass
 
-class SimpleAddStrategy(TaskAddStrategy):
     def add_task(self, task_list, task):
-        task_list.append(task)
+        if self.accepts(task_list, task):
+            task_list.append(task)
+
+    def select_new(self, task_list, tasks):
+        # まとめて追加する場合: 追加するタスクだけを順番通りに返す
+        return [t for t in tasks if self.accepts(task_list, t)]
+
+class SimpleAddStrategy(TaskAddStrategy):
+    def accepts(self, task_list, task):
+        return True
+
+    def select_new(self, task_list, tasks):
+        return list(tasks)
 
 class UniqueAddStrategy(TaskAddStrategy):
-    def add_task(self, task_list, task):
-        if all(t["text"] != task["text"] for t in task_list):
-            task_list.append(task)
+    def accepts(self, task_list, task):
+        return not task_list.contains_text(task.text)
+
+    def select_new(self, task_list, tasks):
+        # 追加するタスク同士の重複も除く
+        seen = set()
+        result = []
+        for t in tasks:
+            if t.text in seen or task_list.contains_text(t.text):
+                continue
+            seen.add(t.text)
+            result.append(t)
+        return result
@@ -0,0 +1,118 @@
+from datetime import date
+from controller.conf_archive import ArchivePager, ColdArchive, ARCHIVE_SUFFIX
+from controller.conf_journal import ConfJournal, write_snapshot
+from controller.conf_persistence import ConfPersistence
+from model.task_model import TaskModel
+
+TODAY = date(2025, 6, 30)
+
+
+def day(text, state="Planned"):
+    return [{"text": text, "state": state, "attr_ratio": 10.0}]
+
+
+def make_conf(tmp_path):
+    # 2024年1〜3月(古い日)・2025年5月(すべてClosed)・2025年6月(直近)
+    conf_path = str(tmp_path / "init.conf")
+    write_snapshot(conf_path, {
+        "task_master_list": [{"text": "M", "attr": "Free"}],
+        "calendar_tasks": {"2024-01-10": day("Jan"), "2024-02-10": day("Feb"), "2024-03-10": day("Mar"),
+                           "2025-05-10": day("Done", "Closed"), "2025-06-10": day("Hot")},
+        "work_hours": {"2024-01-10": 8.0, "2024-01-11": 4.0, "2025-06-10": 7.0},
+    })
+    return conf_path
+
+
+def archive_conf(tmp_path):
+    conf_path = make_conf(tmp_path)
+    archive = ColdArchive(conf_path + ARCHIVE_SUFFIX, after_days=365, closed_after_days=30)
+    data = archive.archive_from(ConfJournal(conf_path), TODAY)
+    return conf_path, archive, data
+
+
+def test_archive_from_moves_old_days(tmp_path):
+    conf_path, archive, data = archive_conf(tmp_path)
+    assert archive.archived_days == 5
+    assert sorted(data["calendar_tasks"]) == ["2025-06-10"]
+    assert data["work_hours"] == {"2025-06-10": 7.0}
+    assert ConfJournal(conf_path).load()["calendar_tasks"] == {"2025-06-10": day("Hot")}
+    assert archive.months() == ["2024-01", "2024-02", "2024-03", "2025-05"]
+    # 別のインスタンスで読み直しても同じ内容
+    archive = ColdArchive(archive.path)
+    assert archive.read_month("2024-01") == ({"2024-01-10": day("Jan")}, {"2024-01-10": 8.0, "2024-01-11": 4.0})
+    assert archive.read_month("2025-05") == ({"2025-05-10": day("Done", "Closed")}, {})
+    assert archive.contains("2024-01-11") and not archive.contains("2025-06-10")
+
+
+def test_restored_days_are_hidden_until_archived_again(tmp_path):
+    conf_path, archive, data = archive_conf(tmp_path)
+    archive.mark_restored(["2024-02-10"])
+    assert not archive.contains("2024-02-10")
+    assert not archive.has_month("2024-02")
+    assert ColdArchive(archive.path).read_month("2024-02") == ({}, {})
+    # 同じ日を再び移すと新しい内容になり、復元済みのリストは消える
+    archive.add({"2024-02-10": day("Feb2")}, {})
+    assert archive.read_month("2024-02") == ({"2024-02-10": day("Feb2")}, {})
+    assert archive.read_month("2024-01")[0] == {"2024-01-10": day("Jan")}
+
+
+def test_unreadable_archive_is_not_overwritten(tmp_path):
+    conf_path = make_conf(tmp_path)
+    archive_path = conf_path + ARCHIVE_SUFFIX
+    with open(archive_path, "wb") as f:
+        f.write(b"not a zip")
+    archive = ColdArchive(archive_path)
+    data = archive.archive_from(ConfJournal(conf_path), TODAY)
+    # 移さずにそのまま読み込む
+    assert archive.archived_days == 0
+    assert len(data["calendar_tasks"]) == 5
+    with open(archive_path, "rb") as f:
+        assert f.read() == b"not a zip"
+
+
+def test_pager_pages_in_and_evicts(tmp_path):
+    conf_path, archive, data = archive_conf(tmp_path)
+    model = TaskModel()
+    model.load_data(data["calendar_tasks"], data["work_hours"])
+    pager = ArchivePager(model, archive, max_months=2)
+    model.add_event_listener(pager)
+    assert pager.ensure_month("2024-01") == ["2024-01-10", "2024-01-11"]
+    assert [t.text for t in model.get_tasks("2024-01-10")] == ["Jan"]
+    assert model.get_work_hours("2024-01-11") == 4.0
+    pager.ensure_month("2024-02")
+    pager.ensure_month("2024-03")
+    # 最も前に使った月から外す
+    assert model.get_tasks("2024-01-10") == [] and model.get_work_hours("2024-01-11") is None
+    assert [t.text for t in model.get_tasks("2024-03-10")] == ["Mar"]
+    # 範囲の月は上限を超えても読み込んだままにする
+    pager.ensure_range("2024-01-01", "2025-05-31")
+    assert pager.paged_dates() == {"2024-01-10", "2024-01-11", "2024-02-10", "2024-03-10", "2025-05-10"}
+    pager.ensure_month("2025-05")
+    assert len(pager.paged_dates() & {"2024-01-10", "2024-02-10", "2024-03-10"}) == 1
+
+
+def test_edited_day_is_written_back_then_marked_restored(tmp_path):
+    conf_path, archive, data = archive_conf(tmp_path)
+    model = TaskModel()
+    persistence = ConfPersistence(model, conf_path, debounce=60.0)
+    persistence.load_into_model()
+    model.add_event_listener(persistence)
+    pager = ArchivePager(model, archive, persistence.save_days)
+    persistence.pager = pager
+    model.add_event_listener(pager)
+    try:
+        pager.ensure_month("2024-01")
+        model.set_task_state("2024-01-10", 0, "Closed")
+        # 書き込みスレッドがinit.confに書くまでは復元済みにしない
+        assert not pager.is_paged("2024-01-10")
+        assert archive.contains("2024-01-10")
+        assert persistence.persist_worker.flush()
+        assert not archive.contains("2024-01-10")
+        assert pager.restored == 1
+    finally:
+        persistence.close()
+    data = ConfJournal(conf_path).load()
+    assert data["calendar_tasks"]["2024-01-10"][0]["state"] == "Closed"
+    assert data["work_hours"]["2024-01-10"] == 8.0
+    # 編集していない日はinit.confに書かない
+    assert "2024-01-11" not in data["work_hours"]
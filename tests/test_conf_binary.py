@@ -0,0 +1,71 @@
+import json
+from controller.conf_binary import (
+    BinarySnapshot, LazyCalendarTasks, is_binary_snapshot, read_binary_snapshot, write_binary_snapshot
+)
+from controller.conf_journal import ConfJournal, OP_DAY, SNAPSHOT_BINARY, convert_snapshot
+
+DATA = {
+    "task_master_list": [{"text": "M", "attr": "Free"}],
+    "calendar_tasks": {
+        "2024-02-29": [{"text": "閏日の作業", "state": "Working", "attr_ratio": 12.5}],
+        "2025-06-16": [{"text": "A", "state": "Planned", "attr_ratio": None},
+                       {"text": "B", "state": "Closed", "attr_ratio": 0.0},
+                       {"text": "A", "state": "Planned", "attr_ratio": 100.0}],
+    },
+    "work_hours": {"2025-06-16": 7.5, "2025-06-18": 0.0},
+    "recurring_rules": [],
+    "recurring_overrides": {},
+}
+
+
+def test_write_read_round_trip(tmp_path):
+    path = str(tmp_path / "init.conf")
+    write_binary_snapshot(path, DATA)
+    assert is_binary_snapshot(path)
+    assert read_binary_snapshot(path) == DATA
+
+
+def test_lazy_days_and_overlay(tmp_path):
+    path = str(tmp_path / "init.conf")
+    write_binary_snapshot(path, DATA)
+    snapshot = BinarySnapshot(path)
+    try:
+        assert snapshot.dates() == ["2024-02-29", "2025-06-16"]
+        assert snapshot.day_tasks("2025-06-17") is None
+        tasks = snapshot.to_conf()["calendar_tasks"]
+        assert isinstance(tasks, LazyCalendarTasks)
+        # 書き換えはメモリ上に重ねるだけ
+        tasks["2025-06-17"] = [{"text": "C", "state": "Planned"}]
+        del tasks["2024-02-29"]
+        assert "2024-02-29" not in tasks
+        assert sorted(tasks) == ["2025-06-16", "2025-06-17"]
+        assert dict(tasks.items())["2025-06-16"] == DATA["calendar_tasks"]["2025-06-16"]
+        assert snapshot.day_tasks("2024-02-29") == DATA["calendar_tasks"]["2024-02-29"]
+    finally:
+        snapshot.close()
+
+
+def test_journal_on_binary_snapshot(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    journal = ConfJournal(conf_path, snapshot_format=SNAPSHOT_BINARY)
+    journal.compact(DATA)
+    assert is_binary_snapshot(conf_path)
+    journal.append({"op": OP_DAY, "date": "2025-06-16", "tasks": []})
+    journal.compact()
+    expected = dict(DATA, calendar_tasks={"2024-02-29": DATA["calendar_tasks"]["2024-02-29"]})
+    assert read_binary_snapshot(conf_path) == expected
+    assert ConfJournal(conf_path).load() == expected
+
+
+def test_convert_between_formats(tmp_path):
+    json_path = str(tmp_path / "init.conf")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(DATA, f, ensure_ascii=False)
+    binary_path = str(tmp_path / "init.conf.bin")
+    convert_snapshot(json_path, binary_path, SNAPSHOT_BINARY)
+    assert is_binary_snapshot(binary_path)
+    back_path = str(tmp_path / "back.conf")
+    convert_snapshot(binary_path, back_path, "json")
+    assert not is_binary_snapshot(back_path)
+    with open(back_path, encoding="utf-8") as f:
+        assert json.load(f) == DATA
@@ -0,0 +1,125 @@
+import time
+from controller.conf_journal import (
+    ConfJournal, write_snapshot, OP_DAY, OP_WORK_HOURS, OP_MASTER, OP_RULES, OP_OCCURRENCE
+)
+from controller.persist_worker import PersistWorker
+
+RULE = {"id": "r1", "text": "Standup", "kind": "weekly", "start": "2025-06-02", "end": None,
+        "interval": 1, "weekday": 0, "attr_ratio": 5.0}
+RECORDS = [
+    {"op": OP_DAY, "date": "2025-06-16", "tasks": [{"text": "A", "state": "Planned", "attr_ratio": 50.0}]},
+    {"op": OP_DAY, "date": "2025-06-17", "tasks": [{"text": "会議", "state": "Closed", "attr_ratio": None}]},
+    {"op": OP_WORK_HOURS, "date": "2025-06-16", "hours": 7.5},
+    {"op": OP_MASTER, "list": [{"text": "M", "attr": "Free"}]},
+    {"op": OP_RULES, "list": [RULE]},
+    {"op": OP_OCCURRENCE, "date": "2025-06-16", "overrides": {"r1": {"state": "Closed"}}},
+    # 後のレコードが前のレコードを上書き・削除する
+    {"op": OP_DAY, "date": "2025-06-17", "tasks": []},
+]
+EXPECTED = {
+    "calendar_tasks": {"2025-06-16": [{"text": "A", "state": "Planned", "attr_ratio": 50.0}]},
+    "work_hours": {"2025-06-16": 7.5},
+    "task_master_list": [{"text": "M", "attr": "Free"}],
+    "recurring_rules": [RULE],
+    "recurring_overrides": {"2025-06-16": {"r1": {"state": "Closed"}}},
+}
+
+
+def test_append_load_compact_round_trip(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    journal = ConfJournal(conf_path)
+    journal.append(RECORDS[0])
+    journal.append_many(RECORDS[1:])
+    assert journal.record_count() == len(RECORDS)
+    assert ConfJournal(conf_path).load() == EXPECTED
+    journal.compact()
+    assert not (tmp_path / "init.conf.journal").exists()
+    assert ConfJournal(conf_path).load() == EXPECTED
+
+
+def test_journal_replays_on_top_of_snapshot(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    write_snapshot(conf_path, {"calendar_tasks": {"2025-06-01": [{"text": "Old", "state": "Planned"}]},
+                               "work_hours": {"2025-06-01": 8.0}})
+    journal = ConfJournal(conf_path)
+    journal.append({"op": OP_WORK_HOURS, "date": "2025-06-01", "hours": None})
+    data = journal.load()
+    assert data["calendar_tasks"] == {"2025-06-01": [{"text": "Old", "state": "Planned"}]}
+    assert data["work_hours"] == {}
+
+
+def test_truncated_line_is_skipped_and_closed(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    journal = ConfJournal(conf_path)
+    journal.append(RECORDS[0])
+    # 書き込み途中で落ちた行
+    with open(journal.journal_path, "ab") as f:
+        f.write(b'{"op":"wh","date":"2025-06-16","ho')
+    assert ConfJournal(conf_path).load()["calendar_tasks"] == EXPECTED["calendar_tasks"]
+    # 次の追記は途切れた行とは別の行になる
+    journal.append({"op": OP_WORK_HOURS, "date": "2025-06-16", "hours": 6.0})
+    assert ConfJournal(conf_path).load()["work_hours"] == {"2025-06-16": 6.0}
+
+
+def test_read_records_from_returns_only_new_complete_lines(tmp_path):
+    journal = ConfJournal(str(tmp_path / "init.conf"))
+    journal.append(RECORDS[0])
+    records, offset = journal.read_records_from(0)
+    assert records == [RECORDS[0]]
+    with open(journal.journal_path, "ab") as f:
+        f.write(b'{"op":"master"')
+    assert journal.read_records_from(offset) == ([], offset)
+
+
+def wait_written(worker, timeout=5.0):
+    # flush()は失敗中ならすぐにFalseを返すので、再試行で書けるまで繰り返す
+    deadline = time.monotonic() + timeout
+    while not worker.flush(timeout):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+class FlakyJournal(ConfJournal):
+    # 最初のfailures回の追記に失敗する
+    def __init__(self, conf_path, failures):
+        super().__init__(conf_path)
+        self.failures = failures
+
+    def append_many(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().append_many(records)
+
+
+def test_worker_retries_failed_writes(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    worker = PersistWorker(FlakyJournal(conf_path, failures=2), debounce=0.0, retry_delay=0.01)
+    worker.start()
+    try:
+        worker.submit((OP_DAY, "2025-06-16"), RECORDS[0])
+        worker.submit((OP_WORK_HOURS, "2025-06-16"), RECORDS[2])
+        wait_written(worker)
+        assert worker.pending_records() == []
+        assert worker.errors == 2
+    finally:
+        worker.stop()
+    data = ConfJournal(conf_path).load()
+    assert data["calendar_tasks"] == EXPECTED["calendar_tasks"]
+    assert data["work_hours"] == EXPECTED["work_hours"]
+
+
+def test_worker_keeps_newer_record_over_failed_one(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    journal = FlakyJournal(conf_path, failures=1)
+    worker = PersistWorker(journal, debounce=0.0, retry_delay=0.01)
+    worker.start()
+    try:
+        worker.submit((OP_WORK_HOURS, "2025-06-16"), {"op": OP_WORK_HOURS, "date": "2025-06-16", "hours": 1.0})
+        # 失敗した書き込みの後に同じキーで新しいレコードが来たら、そちらを書く
+        assert not worker.flush(1.0)
+        worker.submit((OP_WORK_HOURS, "2025-06-16"), {"op": OP_WORK_HOURS, "date": "2025-06-16", "hours": 2.0})
+        wait_written(worker)
+    finally:
+        worker.stop()
+    assert ConfJournal(conf_path).load()["work_hours"] == {"2025-06-16": 2.0}
@@ -0,0 +1,63 @@
+from model.task_model import TaskModel
+from controller.conf_journal import ConfJournal, OP_DAY
+from controller.conf_persistence import ConfPersistence
+from controller.conf_sync import ConfSync
+
+DATE = "2025-06-16"
+
+
+def texts(model, date_str=DATE):
+    return [t.text for t in model.get_tasks(date_str)]
+
+
+def open_model(conf_path, debounce=60.0):
+    # 書き込みスレッドのデバウンスを長くして、flush()するまで書き込まないようにする
+    model = TaskModel()
+    persistence = ConfPersistence(model, conf_path, debounce=debounce)
+    persistence.load_into_model()
+    model.add_event_listener(persistence)
+    sync = ConfSync(model, persistence.journal, pending_keys=persistence.pending_keys)
+    sync.prime()
+    return model, persistence, sync
+
+
+def test_poll_keeps_edits_still_queued(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    model, persistence, sync = open_model(conf_path)
+    try:
+        model.add_task(DATE, "A")
+        assert persistence.persist_worker.flush()
+        model.add_task(DATE, "B")
+        assert (OP_DAY, DATE) in persistence.pending_keys()
+        # ディスク上は[A]だけだが、未書き込みの[A, B]を巻き戻さない
+        assert sync.poll() == []
+        assert texts(model) == ["A", "B"]
+        model.add_task(DATE, "C")
+        assert persistence.persist_worker.flush()
+        assert sync.poll() == []
+        assert texts(model) == ["A", "B", "C"]
+    finally:
+        persistence.close()
+    tasks = ConfJournal(conf_path).load()["calendar_tasks"][DATE]
+    assert [t["text"] for t in tasks] == ["A", "B", "C"]
+
+
+def test_poll_merges_other_process_edits(tmp_path):
+    conf_path = str(tmp_path / "init.conf")
+    model, persistence, sync = open_model(conf_path)
+    try:
+        model.add_task(DATE, "A")
+        # 他のプロセスの追記: 別の日は取り込み、未書き込みの日は自分の変更を残す
+        ConfJournal(conf_path).append_many([
+            {"op": OP_DAY, "date": "2025-06-17", "tasks": [{"text": "X", "state": "Planned"}]},
+            {"op": OP_DAY, "date": DATE, "tasks": [{"text": "Y", "state": "Planned"}]},
+        ])
+        assert sync.poll() == ["2025-06-17"]
+        assert texts(model, "2025-06-17") == ["X"]
+        assert texts(model) == ["A"]
+        # 自分の変更を書き込んだ後は、ジャーナルの最後の内容と同じなので何もしない
+        assert persistence.persist_worker.flush()
+        assert sync.poll() == []
+        assert texts(model) == ["A"]
+    finally:
+        persistence.close()
@@ -9,6 +9,10 @@ class SchedulerUIBuilder(ABC):
     def build_task_view(self):
         pass
 
+    @abstractmethod
+    def build_stats_panel(self):
+        pass
+
     @abstractmethod
     def build_main_window(self):
         pass
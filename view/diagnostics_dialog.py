@@ -0,0 +1,72 @@
+import time
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog,
+    QHeaderView
+)
+from PyQt5.QtCore import QObject, QEvent
+
+SUMMARY_COLUMNS = ["count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+
+# 監視するウィジェットの再描画を検出し、ハンドラの開始から描画までの時間を記録する
+class PaintLatencyProbe(QObject):
+    def __init__(self, tracer, parent=None):
+        super().__init__(parent)
+        self.tracer = tracer
+
+    def watch(self, widget):
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.tracer.pending_paint is not None:
+            name, start = self.tracer.pending_paint
+            self.tracer.pending_paint = None
+            self.tracer.record("paint." + name, start, time.perf_counter(), "view")
+        return False
+
+
+# 計測結果(p50/p95/p99)の一覧と書き出し
+class DiagnosticsDialog(QDialog):
+    def __init__(self, tracer, parent=None):
+        super().__init__(parent)
+        self.tracer = tracer
+        self.setWindowTitle("Diagnostics")
+        self.setGeometry(200, 200, 760, 420)
+
+        layout = QVBoxLayout()
+        self.table = QTableWidget(0, len(SUMMARY_COLUMNS) + 1, self)
+        self.table.setHorizontalHeaderLabels(["name"] + SUMMARY_COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        btn_layout = QHBoxLayout()
+        self.refresh_button = QPushButton("Refresh", self)
+        btn_layout.addWidget(self.refresh_button)
+        self.reset_button = QPushButton("Reset", self)
+        btn_layout.addWidget(self.reset_button)
+        self.save_button = QPushButton("Save Trace...", self)
+        btn_layout.addWidget(self.save_button)
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+
+        self.refresh_button.clicked.connect(self.refresh)
+        self.reset_button.clicked.connect(self.on_reset)
+        self.save_button.clicked.connect(self.on_save)
+        self.refresh()
+
+    def refresh(self):
+        summary = self.tracer.summary()
+        self.table.setRowCount(len(summary))
+        for row, (name, values) in enumerate(summary.items()):
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+            for col, key in enumerate(SUMMARY_COLUMNS, start=1):
+                self.table.setItem(row, col, QTableWidgetItem(f"{values[key]:g}"))
+
+    def on_reset(self):
+        self.tracer.reset()
+        self.refresh()
+
+    def on_save(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Trace", "trace.json", "JSON (*.json)")
+        if path:
+            self.tracer.dump(path)
@@ -5,5 +5,6 @@ class SchedulerUIDirector:
     def construct(self):
         self.builder.build_calendar_view()
         self.builder.build_task_view()
+        self.builder.build_stats_panel()
         self.builder.build_main_window()
         return self.builder.get_result()
\ No newline at end of file
@@ -1,13 +1,50 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QLabel, QCheckBox, QCalendarWidget,
-    QListWidget, QLineEdit, QPushButton, QHBoxLayout, QComboBox, QDialog, QInputDialog
+    QListView, QLineEdit, QPushButton, QHBoxLayout, QComboBox, QInputDialog
 )
-from PyQt5.QtCore import pyqtSignal, QDate
+from PyQt5.QtCore import pyqtSignal, QDate, Qt
+from PyQt5.QtGui import QColor
 from .abstract_builder import SchedulerUIBuilder
-import re
+from .task_list_model import TaskListModel, TEXT_ROLE, STATE_ROLE, RATIO_ROLE
+from .task_combo_model import MasterTaskListModel, WeekdayBucketProxyModel, ALL_BUCKET, weekday_attr
+
+# 日ごとの要約(タスク数・勤務時間)をセルに描画するカレンダー
+class SummaryCalendarWidget(QCalendarWidget):
+    # 勤務時間の色の濃さがこの時間で最大になる
+    HEAT_MAX_HOURS = 10.0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # summary_provider(year, month) -> {day: DaySummary} (キャッシュ済みの月を返す想定)
+        self.summary_provider = None
+
+    def paintCell(self, painter, rect, date):
+        super().paintCell(painter, rect, date)
+        if self.summary_provider is None:
+            return
+        summary = self.summary_provider(date.year(), date.month()).get(date.day())
+        if summary is None:
+            return
+        painter.save()
+        if summary.hours:
+            alpha = int(min(summary.hours / self.HEAT_MAX_HOURS, 1.0) * 110)
+            painter.fillRect(rect, QColor(40, 160, 60, alpha))
+        if summary.total():
+            # 未完了があれば橙、すべてClosedなら灰
+            painter.setPen(QColor(220, 120, 0) if summary.open_count() else QColor(120, 120, 120))
+            font = painter.font()
+            font.setPointSizeF(max(font.pointSizeF() * 0.7, 6.0))
+            painter.setFont(font)
+            badge = "/".join(str(c) for c in summary.counts)
+            painter.drawText(rect.adjusted(2, 0, -2, -1), Qt.AlignBottom | Qt.AlignRight, badge)
+        painter.restore()
+
+    def refresh_date(self, date_str):
+        self.updateCell(QDate.fromString(date_str, "yyyy-MM-dd"))
 
 class PyQtCalendarView(QWidget):
     date_selected = pyqtSignal(str)  # 追加: 日付選択シグナル
+    month_changed = pyqtSignal(int, int)  # 表示する月の変更 (year, month)
 
     def __init__(self):
         super().__init__()
@@ -16,13 +53,14 @@ class PyQtCalendarView(QWidget):
 
         layout = QVBoxLayout()
 
-        self.calendar = QCalendarWidget(self)
+        self.calendar = SummaryCalendarWidget(self)
         self.calendar.setGridVisible(True)
         layout.addWidget(self.calendar)
 
         self.setLayout(layout)
         # 日付変更時にシグナル発火
         self.calendar.selectionChanged.connect(self.on_date_changed)
+        self.calendar.currentPageChanged.connect(self.month_changed)
 
     def on_date_changed(self):
         date = self.calendar.selectedDate()
@@ -32,61 +70,19 @@ class PyQtCalendarView(QWidget):
     def get_selected_date(self):
         return self.calendar.selectedDate().toString("yyyy-MM-dd")
 
-class TaskListDialog(QDialog):
-    # タスク追加・削除のシグナル
-    task_added = pyqtSignal(str, str)  # (text, attr)
-    task_deleted = pyqtSignal(int)
+    def set_summary_provider(self, provider):
+        self.calendar.summary_provider = provider
+        self.calendar.updateCells()
 
-    def __init__(self, task_master_list):
-        super().__init__()
-        self.setWindowTitle("Task List")
-        self.setGeometry(200, 200, 400, 400)
-        self.task_master_list = task_master_list  # [{text, attr}, ...]
+    def refresh_date(self, date_str):
+        self.calendar.refresh_date(date_str)
 
-        layout = QVBoxLayout()
-
-        self.list_widget = QListWidget(self)
-        self.refresh_list()
-        layout.addWidget(self.list_widget)
+    def refresh_all(self):
+        self.calendar.updateCells()
 
-        input_layout = QHBoxLayout()
-        self.input_line = QLineEdit(self)
-        input_layout.addWidget(self.input_line)
-        self.attr_combo = QComboBox(self)
-        self.attr_combo.addItems(["Free", "Mon", "Tue", "Wed", "Thu", "Fri"])
-        input_layout.addWidget(self.attr_combo)
-        self.add_button = QPushButton("Add", self)
-        input_layout.addWidget(self.add_button)
-        layout.addLayout(input_layout)
-
-        self.delete_button = QPushButton("Delete Selected", self)
-        layout.addWidget(self.delete_button)
-
-        self.setLayout(layout)
-
-        self.add_button.clicked.connect(self.on_add)
-        self.delete_button.clicked.connect(self.on_delete)
-
-    def refresh_list(self):
-        self.list_widget.clear()
-        for t in self.task_master_list:
-            self.list_widget.addItem(f"{t['text']} ({t['attr']})")
-
-    def on_add(self):
-        text = self.input_line.text()
-        attr = self.attr_combo.currentText()
-        if text and not any(t['text'] == text for t in self.task_master_list):
-            self.task_master_list.append({'text': text, 'attr': attr})
-            self.refresh_list()
-            self.input_line.clear()
-            self.task_added.emit(text, attr)
-
-    def on_delete(self):
-        row = self.list_widget.currentRow()
-        if 0 <= row < len(self.task_master_list):
-            del self.task_master_list[row]
-            self.refresh_list()
-            self.task_deleted.emit(row)
+    def select_date(self, date_str):
+        # 検索結果などから日付を移動(date_selectedが通知される)
+        self.calendar.setSelectedDate(QDate.fromString(date_str, "yyyy-MM-dd"))
 
 class PyQtTaskView(QWidget):
     # タスク追加イベントのシグナル
@@ -104,6 +100,14 @@ class PyQtTaskView(QWidget):
     open_task_list_requested = pyqtSignal()
     # タスク属性比率変更シグナル
     task_attr_ratio_change_requested = pyqtSignal(int, float)  # (index, new_ratio)
+    # まとめて変更する操作のシグナル
+    close_working_requested = pyqtSignal()
+    copy_to_weekdays_requested = pyqtSignal()
+    # 繰り返しタスク: マスターのタスクを選択中の日から繰り返す / 選択した繰り返しをこの日以降止める
+    recurring_task_requested = pyqtSignal(str)
+    stop_recurring_requested = pyqtSignal(int)
+    open_search_requested = pyqtSignal()
+    open_report_requested = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -112,30 +116,61 @@ class PyQtTaskView(QWidget):
 
         layout = QVBoxLayout()
 
-        self.task_list = QListWidget(self)
+        # 読み込み中の表示
+        self.loading_label = QLabel("", self)
+        self.loading_label.hide()
+        layout.addWidget(self.loading_label)
+
+        # タスクリスト: モデル/ビューで行単位に更新(全行の作り直しはしない)
+        self.task_list_model = TaskListModel(self)
+        self.task_list = QListView(self)
+        self.task_list.setModel(self.task_list_model)
+        self.task_list.setUniformItemSizes(True)
         layout.addWidget(self.task_list)
 
         # 追加: タスク選択用コンボボックス＋例外チェック
         select_layout = QHBoxLayout()
         self.task_select_combo = QComboBox(self)
+        # マスターリストは曜日バケットごとに振り分け、プロキシで表示を切り替える
+        self.task_combo_source = MasterTaskListModel(self)
+        self.task_combo_proxy = WeekdayBucketProxyModel(self)
+        self.task_combo_proxy.setSourceModel(self.task_combo_source)
+        self.task_select_combo.setModel(self.task_combo_proxy)
         select_layout.addWidget(QLabel("Select Task:"))
         select_layout.addWidget(self.task_select_combo)
         self.exception_checkbox = QCheckBox("例外")
         select_layout.addWidget(self.exception_checkbox)
         self.add_task_button = QPushButton("Add Task", self)
         select_layout.addWidget(self.add_task_button)
+        self.add_recurring_button = QPushButton("Repeat", self)
+        self.add_recurring_button.setToolTip("マスターの曜日ごと(Freeは平日)にこの日から繰り返す")
+        select_layout.addWidget(self.add_recurring_button)
         layout.addLayout(select_layout)
 
         # 追加: タスクリストウィンドウ呼び出しボタン
         self.open_task_list_button = QPushButton("Check Task List", self)
         layout.addWidget(self.open_task_list_button)
+        self.open_search_button = QPushButton("Search Tasks...", self)
+        layout.addWidget(self.open_search_button)
+        self.open_report_button = QPushButton("Export Report...", self)
+        layout.addWidget(self.open_report_button)
 
         # ボタン群
         btn_layout = QHBoxLayout()
         self.delete_task_button = QPushButton("Delete Task", self)
         btn_layout.addWidget(self.delete_task_button)
+        self.stop_recurring_button = QPushButton("Stop Repeating", self)
+        btn_layout.addWidget(self.stop_recurring_button)
         layout.addLayout(btn_layout)
 
+        # まとめて変更するボタン
+        bulk_layout = QHBoxLayout()
+        self.close_working_button = QPushButton("Close Working (Month)", self)
+        bulk_layout.addWidget(self.close_working_button)
+        self.copy_to_weekdays_button = QPushButton("Copy Day to Weekdays", self)
+        bulk_layout.addWidget(self.copy_to_weekdays_button)
+        layout.addLayout(bulk_layout)
+
         # 状態変更用ドロップダウン
         state_layout = QHBoxLayout()
         self.state_combo = QComboBox(self)
@@ -164,12 +199,19 @@ class PyQtTaskView(QWidget):
 
         # シグナル接続
         self.add_task_button.clicked.connect(self.on_add_task_from_combo)
+        self.add_recurring_button.clicked.connect(self.on_add_recurring_from_combo)
+        self.stop_recurring_button.clicked.connect(self.on_stop_recurring)
         self.open_task_list_button.clicked.connect(self.open_task_list_requested.emit)
+        self.open_search_button.clicked.connect(self.open_search_requested.emit)
+        self.open_report_button.clicked.connect(self.open_report_requested.emit)
         self.delete_task_button.clicked.connect(self.on_delete_task)
+        self.close_working_button.clicked.connect(self.close_working_requested.emit)
+        self.copy_to_weekdays_button.clicked.connect(self.copy_to_weekdays_requested.emit)
         # ドロップダウン選択時
         self.state_combo.currentIndexChanged.connect(self.on_state_combo_changed)
         # タスクリスト選択時にドロップダウンを同期
-        self.task_list.currentRowChanged.connect(self.sync_state_combo)
+        self.task_list.selectionModel().currentRowChanged.connect(
+            lambda current, previous: self.sync_state_combo(current.row()))
         # 勤務時間ボタンのシグナル
         self.save_work_hours_button.clicked.connect(self.on_save_work_hours)
         self.delete_work_hours_button.clicked.connect(self.on_delete_work_hours)
@@ -178,40 +220,50 @@ class PyQtTaskView(QWidget):
         # タスクマスターリスト初期化
         self._task_master_list = []
 
-        self.task_list.itemDoubleClicked.connect(self.edit_attr_ratio_dialog)
+        self.task_list.doubleClicked.connect(self.edit_attr_ratio_dialog)
 
     def set_task_master_list(self, task_master_list):
         # task_master_list: [{'text':..., 'attr':...}, ...]
         self._task_master_list = task_master_list
+        self.task_combo_source.set_master_list(task_master_list)
         self.update_task_combo_filter()
 
     def update_task_combo_filter(self):
-        # カレンダーで選択中日付の曜日を取得
-        date_str = self.get_selected_date()
-        qdate = QDate.fromString(date_str, "yyyy-MM-dd")
-        weekday = qdate.dayOfWeek()  # 1=Mon, ..., 7=Sun
-        weekday_map = {1: "Mon", 2: "Tue", 3: "Wed", 4: "Thu", 5: "Fri"}
-        weekday_str = weekday_map.get(weekday, None)
-        show_all = self.exception_checkbox.isChecked()
-        self.task_select_combo.clear()
-        for t in self._task_master_list:
-            if t['attr'] == "Free" or show_all or t['attr'] == weekday_str:
-                self.task_select_combo.addItem(f"{t['text']} ({t['attr']})")
+        # カレンダーで選択中日付の曜日のバケットに切り替える
+        if self.exception_checkbox.isChecked():
+            bucket = ALL_BUCKET
+        else:
+            bucket = weekday_attr(self.get_selected_date())
+        self.task_combo_proxy.set_bucket(bucket)
+        if self.task_select_combo.currentIndex() < 0 and self.task_select_combo.count() > 0:
+            self.task_select_combo.setCurrentIndex(0)
 
     def on_add_task_from_combo(self):
-        text = self.task_select_combo.currentText()
-        if text:
-            # "text (attr)" からtext部分だけ抽出
-            task_text = text.split(" (")[0]
+        task_text = self.task_select_combo.currentData(TEXT_ROLE)
+        if task_text:
             self.task_selected_to_add.emit(task_text)
 
+    def on_add_recurring_from_combo(self):
+        task_text = self.task_select_combo.currentData(TEXT_ROLE)
+        if task_text:
+            self.recurring_task_requested.emit(task_text)
+
+    def on_stop_recurring(self):
+        row = self.current_task_row()
+        if row >= 0:
+            self.stop_recurring_requested.emit(row)
+
+    def current_task_row(self):
+        index = self.task_list.currentIndex()
+        return index.row() if index.isValid() else -1
+
     def on_delete_task(self):
-        row = self.task_list.currentRow()
+        row = self.current_task_row()
         if row >= 0:
             self.task_delete_requested.emit(row)
 
     def on_state_combo_changed(self, idx):
-        row = self.task_list.currentRow()
+        row = self.current_task_row()
         if row >= 0:
             state = self.state_combo.currentText()
             self.task_state_change_requested.emit(row, state)
@@ -220,17 +272,12 @@ class PyQtTaskView(QWidget):
         # タスクリスト選択時に状態をドロップダウンに反映
         if row < 0:
             return
-        item = self.task_list.item(row)
-        if item:
-            # 表示は "text [state]" なので末尾[]から状態を取得
-            text = item.text()
-            if "[" in text and text.endswith("]"):
-                state = text[text.rfind("[")+1:-1]
-                idx = self.state_combo.findText(state)
-                if idx >= 0:
-                    self.state_combo.blockSignals(True)
-                    self.state_combo.setCurrentIndex(idx)
-                    self.state_combo.blockSignals(False)
+        state = self.task_list_model.index(row).data(STATE_ROLE)
+        idx = self.state_combo.findText(state) if state else -1
+        if idx >= 0:
+            self.state_combo.blockSignals(True)
+            self.state_combo.setCurrentIndex(idx)
+            self.state_combo.blockSignals(False)
 
     def set_selected_date(self, date_str):
         # 必要ならUIに日付表示など
@@ -254,6 +301,17 @@ class PyQtTaskView(QWidget):
         else:
             self.work_hours_display.setText(f"Work Hours: {hours}")
 
+    def set_loading_progress(self, loaded, total):
+        # loaded=None で読み込み完了(非表示)
+        if loaded is None:
+            self.loading_label.hide()
+            return
+        if total:
+            self.loading_label.setText(f"Loading... {loaded} / {total} days")
+        else:
+            self.loading_label.setText("Loading...")
+        self.loading_label.show()
+
     def emit_task_added(self):
         task_text = self.task_combo.currentText()
         ratio_text = self.attr_ratio_input.text()
@@ -266,23 +324,27 @@ class PyQtTaskView(QWidget):
             attr_ratio = None
         self.task_added.emit(task_text, attr_ratio)
 
-    def edit_attr_ratio_dialog(self, item):
-        index = self.task_list.row(item)
-        current_text = item.text()
-        m = re.search(r"\(([\d\.]+)%\)", current_text)
-        default = float(m.group(1)) if m else 0.0
+    def edit_attr_ratio_dialog(self, model_index):
+        index = model_index.row()
+        current = model_index.data(RATIO_ROLE)
+        default = float(current) if current is not None else 0.0
         ratio, ok = QInputDialog.getDouble(self, "体感割合の編集", "新しい体感割合(0.00～100.00):", default, 0, 100, 2)
         if ok:
             self.task_attr_ratio_change_requested.emit(index, ratio)
 
 class PyQtMainWindow(QMainWindow):
-    def __init__(self, calendar_view, task_view):
+    # 集計パネルを後から作成したときのシグナル
+    stats_panel_created = pyqtSignal(object)
+
+    def __init__(self, calendar_view, task_view, stats_panel=None, lazy_stats=False):
         super().__init__()
         self.setWindowTitle("Scheduler")
         self.setGeometry(100, 100, 800, 600)
 
         self.calendar_view = calendar_view
         self.task_view = task_view
+        self.stats_panel = stats_panel
+        self.stats_button = None
 
         # カレンダーとタスクビューの連携
         self.calendar_view.date_selected.connect(self.on_calendar_date_changed)
@@ -291,26 +353,49 @@ class PyQtMainWindow(QMainWindow):
         self.task_view._current_date = init_date
         self.task_view.set_selected_date(init_date)
 
-        self.init_ui()
+        self.init_ui(lazy_stats)
 
-    def init_ui(self):
+    def init_ui(self, lazy_stats=False):
         central_widget = QWidget(self)
         self.setCentralWidget(central_widget)
 
         layout = QHBoxLayout(central_widget)
 
-        layout.addWidget(self.calendar_view)
+        # カレンダーの下に集計パネル
+        self.left_layout = QVBoxLayout()
+        self.left_layout.addWidget(self.calendar_view)
+        if self.stats_panel is not None:
+            self.left_layout.addWidget(self.stats_panel)
+        elif lazy_stats:
+            # 集計パネルは初めて押されたときに作る
+            self.stats_button = QPushButton("Show Stats", central_widget)
+            self.stats_button.clicked.connect(self.ensure_stats_panel)
+            self.left_layout.addWidget(self.stats_button)
+        layout.addLayout(self.left_layout)
         layout.addWidget(self.task_view)
 
+    def ensure_stats_panel(self):
+        if self.stats_panel is None:
+            from .stats_panel import PyQtStatsPanel
+            self.stats_panel = PyQtStatsPanel()
+            self.left_layout.addWidget(self.stats_panel)
+            if self.stats_button is not None:
+                self.stats_button.hide()
+            self.stats_panel_created.emit(self.stats_panel)
+        return self.stats_panel
+
     def on_calendar_date_changed(self, date_str):
         self.task_view._current_date = date_str
         self.task_view.set_selected_date(date_str)
 
 # Builderパターン: UI部品の組み立てを担当
 class PyQtSchedulerUIBuilder(SchedulerUIBuilder):
-    def __init__(self):
+    def __init__(self, lazy_secondary=False):
+        # lazy_secondary: 起動を速くするため、補助的なウィジェットは初めて使うときに作る
+        self.lazy_secondary = lazy_secondary
         self.calendar_view = None
         self.task_view = None
+        self.stats_panel = None
         self.main_window = None
 
     def build_calendar_view(self):
@@ -319,12 +404,26 @@ class PyQtSchedulerUIBuilder(SchedulerUIBuilder):
     def build_task_view(self):
         self.task_view = PyQtTaskView()
 
+    def build_stats_panel(self):
+        if self.lazy_secondary:
+            return
+        from .stats_panel import PyQtStatsPanel
+        self.stats_panel = PyQtStatsPanel()
+
     def build_main_window(self):
         if self.calendar_view is None or self.task_view is None:
             raise Exception("Views must be built before main window")
-        self.main_window = PyQtMainWindow(self.calendar_view, self.task_view)
+        self.main_window = PyQtMainWindow(
+            self.calendar_view, self.task_view, self.stats_panel, lazy_stats=self.lazy_secondary)
 
     def get_result(self):
         return self.main_window
 
+def __getattr__(name):
+    # TaskListDialogは使うときに読み込む
+    if name == "TaskListDialog":
+        from .task_list_dialog import TaskListDialog
+        return TaskListDialog
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 __all__ = ["PyQtSchedulerUIBuilder", "TaskListDialog"]
\ No newline at end of file
@@ -0,0 +1,79 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QDateEdit, QComboBox, QPushButton, QProgressBar,
+    QFileDialog
+)
+from PyQt5.QtCore import pyqtSignal, QDate
+
+# 表示名, 形式, 既定のファイル名, ファイルの種類
+FORMATS = [
+    ("CSV", "csv", "report.csv", "CSV (*.csv)"),
+    ("HTML", "html", "report.html", "HTML (*.html)"),
+    ("Columnar (JSON)", "columnar", "report.columns.json", "Columnar JSON (*.columns.json)"),
+]
+
+
+# 期間のレポート(週ごとの勤務時間・タスクごとの時間・状態の内訳)の書き出し
+# 集計は別プロセスで行い、進捗を表示して途中で取り消せる
+class ReportDialog(QDialog):
+    # (start, end, path, format)
+    generate_requested = pyqtSignal(str, str, str, str)
+    cancel_requested = pyqtSignal()
+
+    def __init__(self, current_date, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Report")
+        self.setGeometry(200, 200, 420, 160)
+
+        layout = QVBoxLayout()
+        range_layout = QHBoxLayout()
+        year = QDate.fromString(current_date, "yyyy-MM-dd").year()
+        self.start_edit = QDateEdit(QDate(year, 1, 1), self)
+        self.end_edit = QDateEdit(QDate(year, 12, 31), self)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setDisplayFormat("yyyy-MM-dd")
+            edit.setCalendarPopup(True)
+        range_layout.addWidget(QLabel("Period:"))
+        range_layout.addWidget(self.start_edit)
+        range_layout.addWidget(QLabel("~"))
+        range_layout.addWidget(self.end_edit)
+        layout.addLayout(range_layout)
+
+        format_layout = QHBoxLayout()
+        self.format_combo = QComboBox(self)
+        self.format_combo.addItems([f[0] for f in FORMATS])
+        format_layout.addWidget(QLabel("Format:"))
+        format_layout.addWidget(self.format_combo)
+        self.generate_button = QPushButton("Generate...", self)
+        format_layout.addWidget(self.generate_button)
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.setEnabled(False)
+        format_layout.addWidget(self.cancel_button)
+        layout.addLayout(format_layout)
+
+        self.progress_bar = QProgressBar(self)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("", self)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        self.generate_button.clicked.connect(self.on_generate)
+        self.cancel_button.clicked.connect(self.cancel_requested.emit)
+
+    def on_generate(self):
+        _, fmt, default_name, file_filter = FORMATS[self.format_combo.currentIndex()]
+        path, _ = QFileDialog.getSaveFileName(self, "Export Report", default_name, file_filter)
+        if path:
+            self.generate_requested.emit(self.start_edit.date().toString("yyyy-MM-dd"),
+                                         self.end_edit.date().toString("yyyy-MM-dd"), path, fmt)
+
+    def set_running(self, running):
+        self.generate_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def set_progress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"{done} / {total} months")
+
+    def set_status(self, text):
+        self.status_label.setText(text)
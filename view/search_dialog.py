@@ -0,0 +1,97 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QComboBox, QCheckBox, QDateEdit, QLabel,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtCore import pyqtSignal, QDate, QTimer
+
+# 入力が止まってから検索するまでの時間
+SEARCH_DELAY_MS = 150
+RESULT_COLUMNS = ["Date", "Task", "State", "Ratio"]
+
+
+# タスクの検索(語・状態・期間で絞り込み、結果をダブルクリックでその日へ移動)
+class SearchDialog(QDialog):
+    # (query, state または None, start または None, end または None)
+    search_requested = pyqtSignal(str, object, object, object)
+    date_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Search Tasks")
+        self.setGeometry(200, 200, 600, 480)
+
+        layout = QVBoxLayout()
+        query_layout = QHBoxLayout()
+        self.query_input = QLineEdit(self)
+        self.query_input.setPlaceholderText("Search task names (all words, last word as prefix)")
+        query_layout.addWidget(self.query_input)
+        self.state_combo = QComboBox(self)
+        self.state_combo.addItems(["All", "Planned", "Working", "Closed"])
+        query_layout.addWidget(self.state_combo)
+        layout.addLayout(query_layout)
+
+        range_layout = QHBoxLayout()
+        self.range_checkbox = QCheckBox("Period", self)
+        range_layout.addWidget(self.range_checkbox)
+        today = QDate.currentDate()
+        self.start_edit = QDateEdit(today.addYears(-1), self)
+        self.end_edit = QDateEdit(today.addYears(1), self)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setDisplayFormat("yyyy-MM-dd")
+            edit.setCalendarPopup(True)
+            edit.setEnabled(False)
+        range_layout.addWidget(self.start_edit)
+        range_layout.addWidget(QLabel("~"))
+        range_layout.addWidget(self.end_edit)
+        layout.addLayout(range_layout)
+
+        self.table = QTableWidget(0, len(RESULT_COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(RESULT_COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        layout.addWidget(self.table)
+        self.status_label = QLabel("", self)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(SEARCH_DELAY_MS)
+        self.timer.timeout.connect(self.request_search)
+        self.query_input.textChanged.connect(self.timer.start)
+        self.state_combo.currentIndexChanged.connect(self.timer.start)
+        self.range_checkbox.stateChanged.connect(self.on_range_toggled)
+        self.start_edit.dateChanged.connect(self.timer.start)
+        self.end_edit.dateChanged.connect(self.timer.start)
+        self.table.cellDoubleClicked.connect(self.on_result_activated)
+
+    def on_range_toggled(self):
+        enabled = self.range_checkbox.isChecked()
+        self.start_edit.setEnabled(enabled)
+        self.end_edit.setEnabled(enabled)
+        self.timer.start()
+
+    def request_search(self):
+        state = self.state_combo.currentText()
+        start = end = None
+        if self.range_checkbox.isChecked():
+            start = self.start_edit.date().toString("yyyy-MM-dd")
+            end = self.end_edit.date().toString("yyyy-MM-dd")
+        self.search_requested.emit(self.query_input.text(), None if state == "All" else state, start, end)
+
+    def show_results(self, hits, elapsed_ms, limit):
+        # hits: [SearchHit, ...]
+        self.table.setRowCount(len(hits))
+        for row, hit in enumerate(hits):
+            t = hit.task
+            values = [hit.date_str, t.text, t.state, "" if t.attr_ratio is None else f"{t.attr_ratio}%"]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+        more = "+" if len(hits) >= limit else ""
+        self.status_label.setText(f"{len(hits)}{more} hits ({elapsed_ms:.1f} ms)")
+
+    def on_result_activated(self, row, column):
+        item = self.table.item(row, 0)
+        if item is not None:
+            self.date_activated.emit(item.text())
@@ -0,0 +1,36 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QListWidget
+
+
+# 集計パネル: 選択中の日付を含む月・週・四半期の集計を表示
+class PyQtStatsPanel(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+
+        self.month_label = QLabel("", self)
+        layout.addWidget(self.month_label)
+
+        layout.addWidget(QLabel("Weekly:", self))
+        self.week_list = QListWidget(self)
+        layout.addWidget(self.week_list)
+
+        layout.addWidget(QLabel("Avg attr_ratio per task (quarter):", self))
+        self.ratio_list = QListWidget(self)
+        layout.addWidget(self.ratio_list)
+
+        self.setLayout(layout)
+
+    @staticmethod
+    def _format_counts(summary):
+        return f"Planned {summary['Planned']} / Working {summary['Working']} / Closed {summary['Closed']}"
+
+    def show_stats(self, month_label, month_summary, weekly, ratio_by_task):
+        # weekly: [(週の初日, summary), ...]  ratio_by_task: {text: 平均}
+        self.month_label.setText(
+            f"{month_label}: {month_summary['hours']:g} h, " + self._format_counts(month_summary))
+        self.week_list.clear()
+        for week_start, s in weekly:
+            self.week_list.addItem(f"{week_start}~  {s['hours']:g} h  " + self._format_counts(s))
+        self.ratio_list.clear()
+        for text, avg in sorted(ratio_by_task.items()):
+            self.ratio_list.addItem(f"{text}: {avg:.2f}%")
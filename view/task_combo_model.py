@@ -0,0 +1,132 @@
+import heapq
+from datetime import date
+from functools import lru_cache
+from PyQt5.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex
+from .task_list_model import TEXT_ROLE
+
+ATTR_ROLE = Qt.UserRole + 4
+FREE_ATTR = "Free"
+# 曜日を問わずすべて表示するバケット
+ALL_BUCKET = "*"
+WEEKDAY_ATTRS = {1: "Mon", 2: "Tue", 3: "Wed", 4: "Thu", 5: "Fri"}
+
+
+@lru_cache(maxsize=64)
+def weekday_attr(date_str):
+    # "yyyy-MM-dd" → "Mon".."Fri" (土日はNone)
+    try:
+        return WEEKDAY_ATTRS.get(date.fromisoformat(date_str).isoweekday())
+    except ValueError:
+        return None
+
+
+# マスターリスト全体のモデル(attrごとの行番号をマスター変更時に1回だけ作る)
+class MasterTaskListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._master = []
+        self.rows_by_attr = {}  # {attr: [row, ...]} 行番号は昇順
+
+    def set_master_list(self, task_master_list):
+        self.beginResetModel()
+        self._master = task_master_list
+        self.rows_by_attr = {}
+        for row, t in enumerate(task_master_list):
+            self.rows_by_attr.setdefault(t["attr"], []).append(row)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._master)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._master)):
+            return None
+        t = self._master[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{t['text']} ({t['attr']})"
+        if role == TEXT_ROLE:
+            return t["text"]
+        if role == ATTR_ROLE:
+            return t["attr"]
+        return None
+
+
+# 曜日バケットで絞り込むプロキシ
+# 日付変更時は表示する行番号リストを差し替えるだけで、項目は作り直さない
+class WeekdayBucketProxyModel(QAbstractProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._bucket = None
+        self._rows = []
+        self._positions = {}  # {source_row: proxy_row}
+        self._bucket_cache = {}  # {bucket: (rows, positions)}
+
+    def setSourceModel(self, source_model):
+        super().setSourceModel(source_model)
+        source_model.modelReset.connect(self._on_source_reset)
+        self._on_source_reset()
+
+    def _on_source_reset(self):
+        self.beginResetModel()
+        self._bucket_cache = {}
+        self._rows, self._positions = self._bucket_rows(self._bucket)
+        self.endResetModel()
+
+    def _bucket_rows(self, bucket):
+        cached = self._bucket_cache.get(bucket)
+        if cached is not None:
+            return cached
+        source = self.sourceModel()
+        if source is None:
+            return [], {}
+        by_attr = source.rows_by_attr
+        if bucket == ALL_BUCKET:
+            rows = list(range(source.rowCount()))
+        elif bucket is None or bucket == FREE_ATTR:
+            rows = list(by_attr.get(FREE_ATTR, []))
+        else:
+            # Free と その曜日 の行をマスターリストの順序のまま併合
+            rows = list(heapq.merge(by_attr.get(FREE_ATTR, []), by_attr.get(bucket, [])))
+        cached = (rows, {r: i for i, r in enumerate(rows)})
+        self._bucket_cache[bucket] = cached
+        return cached
+
+    def set_bucket(self, bucket):
+        # bucket: "Mon".."Fri" / None(Freeのみ) / ALL_BUCKET
+        if bucket == self._bucket:
+            return
+        self.beginResetModel()
+        self._bucket = bucket
+        self._rows, self._positions = self._bucket_rows(bucket)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not (0 <= row < len(self._rows)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or not (0 <= proxy_index.row() < len(self._rows)):
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], 0)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = self._positions.get(source_index.row())
+        if row is None:
+            return QModelIndex()
+        return self.index(row, 0)
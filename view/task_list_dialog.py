@@ -0,0 +1,57 @@
+from PyQt5.QtWidgets import (
+    QVBoxLayout, QListWidget, QLineEdit, QPushButton, QHBoxLayout, QComboBox, QDialog
+)
+from PyQt5.QtCore import pyqtSignal
+
+class TaskListDialog(QDialog):
+    # タスク追加・削除要求のシグナル
+    task_added = pyqtSignal(str, str)  # (text, attr)
+    task_deleted = pyqtSignal(int)
+
+    def __init__(self, task_master_list):
+        super().__init__()
+        self.setWindowTitle("Task List")
+        self.setGeometry(200, 200, 400, 400)
+        self.task_master_list = task_master_list  # TextIndexedList([{text, attr}, ...])
+
+        layout = QVBoxLayout()
+
+        self.list_widget = QListWidget(self)
+        self.refresh_list()
+        layout.addWidget(self.list_widget)
+
+        input_layout = QHBoxLayout()
+        self.input_line = QLineEdit(self)
+        input_layout.addWidget(self.input_line)
+        self.attr_combo = QComboBox(self)
+        self.attr_combo.addItems(["Free", "Mon", "Tue", "Wed", "Thu", "Fri"])
+        input_layout.addWidget(self.attr_combo)
+        self.add_button = QPushButton("Add", self)
+        input_layout.addWidget(self.add_button)
+        layout.addLayout(input_layout)
+
+        self.delete_button = QPushButton("Delete Selected", self)
+        layout.addWidget(self.delete_button)
+
+        self.setLayout(layout)
+
+        self.add_button.clicked.connect(self.on_add)
+        self.delete_button.clicked.connect(self.on_delete)
+
+    def refresh_list(self):
+        self.list_widget.clear()
+        for t in self.task_master_list:
+            self.list_widget.addItem(f"{t['text']} ({t['attr']})")
+
+    def on_add(self):
+        # 追加はController経由でModelに反映し、master_list_changedで再表示される
+        text = self.input_line.text()
+        attr = self.attr_combo.currentText()
+        if text and not self.task_master_list.contains_text(text):
+            self.input_line.clear()
+            self.task_added.emit(text, attr)
+
+    def on_delete(self):
+        row = self.list_widget.currentRow()
+        if 0 <= row < len(self.task_master_list):
+            self.task_deleted.emit(row)
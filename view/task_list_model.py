@@ -0,0 +1,75 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+# 表示文字列を解析せずに値を取り出すためのロール
+TEXT_ROLE = Qt.UserRole + 1
+STATE_ROLE = Qt.UserRole + 2
+RATIO_ROLE = Qt.UserRole + 3
+# 繰り返しタスクならルールのID(それ以外はNone)
+RULE_ROLE = Qt.UserRole + 4
+
+
+# 選択中日付のタスクリストをそのまま参照するリストモデル
+# 変更は行単位のシグナル(rowsInserted/rowsRemoved/dataChanged)で通知する
+class TaskListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = []
+        # 参照先のリストは通知前に書き換わるので、ビューが知っている行数を別に持つ
+        self._count = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._count
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        if not index.isValid() or not (0 <= row < self._count) or row >= len(self._tasks):
+            return None
+        t = self._tasks[row]
+        if role == Qt.DisplayRole:
+            # 状態とattr_ratioを表示に含める(表示する行だけ都度作る)
+            ratio_str = ""
+            if t.attr_ratio is not None:
+                ratio_str = f" ({t.attr_ratio}%)"
+            # 繰り返しタスクには印を付ける
+            prefix = "\u21bb " if getattr(t, "rule_id", None) else ""
+            return f"{prefix}{t.text} [{t.state}]" + ratio_str
+        if role == TEXT_ROLE:
+            return t.text
+        if role == STATE_ROLE:
+            return t.state
+        if role == RATIO_ROLE:
+            return t.attr_ratio
+        if role == RULE_ROLE:
+            return getattr(t, "rule_id", None)
+        return None
+
+    def task_at(self, row):
+        if 0 <= row < self._count:
+            return self._tasks[row]
+        return None
+
+    def set_tasks(self, tasks):
+        # 日付切り替えなどリスト全体が入れ替わる場合
+        self.beginResetModel()
+        self._tasks = tasks
+        self._count = len(tasks)
+        self.endResetModel()
+
+    def task_inserted(self, tasks, row):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._tasks = tasks
+        self._count += 1
+        self.endInsertRows()
+
+    def task_removed(self, tasks, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._tasks = tasks
+        self._count -= 1
+        self.endRemoveRows()
+
+    def task_changed(self, tasks, row):
+        self._tasks = tasks
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx)